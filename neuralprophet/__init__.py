@@ -16,5 +16,15 @@ f_handler.setFormatter(f_format)
 log.addHandler(c_handler)
 log.addHandler(f_handler)
 
-from .forecaster import NeuralProphet
-from .utils import set_random_seed
+
+def __getattr__(name):
+    # imported on first use, such that modules without torch, like inference, can be imported without it
+    if name == "NeuralProphet":
+        from .forecaster import NeuralProphet
+
+        return NeuralProphet
+    if name == "set_random_seed":
+        from .utils import set_random_seed
+
+        return set_random_seed
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
@@ -80,6 +80,7 @@ class AllSeason:
     yearly_arg: (str, bool, int) = "auto"
     weekly_arg: (str, bool, int) = "auto"
     daily_arg: (str, bool, int) = "auto"
+    from_time: bool = False  # Fourier features computed by the model from the days since epoch
     periods: OrderedDict = field(init=False)  # contains SeasonConfig objects
 
     def __post_init__(self):
@@ -115,6 +115,7 @@ def normalize(df, data_params):
     """Apply data scales.
 
     Applies data scaling factors to df using data_params.
+    Normalized columns are float32, the dtype of all model inputs.
 
     Args:
         df (pd.DataFrame): with columns 'ds', 'y', (and potentially more regressors)
@@ -131,7 +132,7 @@ def normalize(df, data_params):
             new_name = "t"
         if name == "y":
             new_name = "y_scaled"
-        df[new_name] = df[name].sub(data_params[name].shift).div(data_params[name].scale)
+        df[new_name] = df[name].sub(data_params[name].shift).div(data_params[name].scale).astype(np.float32)
     return df
 
 
@@ -0,0 +1,584 @@
+from collections import OrderedDict
+import dataclasses
+import inspect
+import json
+import logging
+import math
+from typing import Dict, List, Tuple
+import numpy as np
+import torch
+import torch.nn as nn
+from neuralprophet import time_net
+
+log = logging.getLogger("nprophet.export")
+
+
+class InferenceNet(nn.Module):
+    """Inference-only copy of a fitted TimeNet with a fixed, typed input signature.
+
+    The model configuration is resolved once when created: the weights are stored as tensors
+    and the column layout of the packed inputs as lists. Thus, the forward pass contains
+    no dict lookups of inputs and no branching on configs, and it can be compiled with TorchScript.
+    Inputs are the packed inputs of the TimeNet, with dense event features, see inference_inputs.
+    """
+
+    season_names: List[str]
+    season_starts: List[int]
+    season_stops: List[int]
+    season_params: List[torch.Tensor]
+    season_periods: List[float]
+    season_resolutions: List[int]
+    days_columns: List[int]
+    lagged_names: List[str]
+    lagged_group_sizes: List[int]
+    lagged_group_inputs: List[int]
+    lagged_group_channels: List[torch.Tensor]
+    lagged_weights: List[torch.Tensor]
+    lagged_biases: List[torch.Tensor]
+    event_names: List[str]
+    event_multiplicative: List[bool]
+    event_indices: List[torch.Tensor]
+    regressor_names: List[str]
+    regressor_columns: List[int]
+    regressor_multiplicative: List[bool]
+    regressor_params: List[torch.Tensor]
+
+    def __init__(self, model):
+        """
+        Args:
+            model (TimeNet): fitted model, its current weights are copied
+        """
+        super(InferenceNet, self).__init__()
+        schema = model.feature_schema
+        with torch.no_grad():
+            self.time_column = schema.features[("time", None)].start
+
+            # Trend, as slope and offset (including bias) of each segment between changepoints
+            if model.config_trend.growth == "off":
+                changepoints, slopes, offsets = torch.zeros(0), torch.zeros(1), torch.zeros(1)
+            elif int(model.config_trend.n_changepoints) == 0:
+                changepoints, slopes, offsets = torch.zeros(0), model.trend_k0.clone(), torch.zeros(1)
+            else:
+                changepoints = model.trend_changepoints_t[1:].clone()
+                slopes, offsets = model._trend_segment_tables()
+            self.register_buffer("trend_changepoints", changepoints)
+            self.register_buffer("trend_slopes", slopes.detach().clone())
+            self.register_buffer("trend_offsets", (offsets + model.bias).detach())
+
+            # Seasonalities
+            self.season_multiplicative = (
+                model.config_season is not None and model.config_season.mode == "multiplicative"
+            )
+            self.season_names, self.season_starts, self.season_stops, self.season_params = [], [], [], []
+            # if computed from time, the Fourier features of each seasonality, see TimeNet.seasonal_features_from_days
+            self.season_from_time = model.season_dims is not None and model.config_season.from_time
+            self.season_periods, self.season_resolutions, self.days_columns = [], [], []
+            if self.season_from_time:
+                self.days_columns = [schema.features[("days", part)].start for part in ["high", "low"]]
+            if model.season_dims is not None:
+                for name, params in model.season_params.items():
+                    self.season_names.append(name)
+                    if self.season_from_time:
+                        period, resolution = model.season_periods[name]
+                        self.season_periods.append(period)
+                        self.season_resolutions.append(resolution)
+                        self.season_starts.append(0)
+                        self.season_stops.append(0)
+                    else:
+                        columns = schema.features[("seasonalities", name)]
+                        self.season_starts.append(columns.start)
+                        self.season_stops.append(columns.stop)
+                    self.season_params.append(params.detach().clone())
+
+            # AR and covariate nets, grouped by number of inputs and stacked for batched matmuls
+            groups = OrderedDict({})
+            for (key, name), (channel, n_inputs) in schema.lagged.items():
+                if key == "lags":
+                    groups.setdefault(n_inputs, []).append(("ar", channel, model.ar_net, model.ar_lag_indices))
+                else:
+                    component = "lagged_regressor_{}".format(name)
+                    net, lag_indices = model.covar_nets[name], model.covar_lag_indices.get(name)
+                    groups.setdefault(n_inputs, []).append((component, channel, net, lag_indices))
+            self.n_layers = model.num_hidden_layers + 1
+            self.lagged_names, self.lagged_group_sizes, self.lagged_group_inputs = [], [], []
+            self.lagged_group_channels, self.lagged_weights, self.lagged_biases = [], [], []
+            for n_inputs, nets in groups.items():
+                self.lagged_names.extend(component for component, _, _, _ in nets)
+                self.lagged_group_sizes.append(len(nets))
+                self.lagged_group_inputs.append(n_inputs)
+                self.lagged_group_channels.append(torch.tensor([channel for _, channel, _, _ in nets]))
+                for i in range(self.n_layers):
+                    # quantized layers are exported with their dequantized weights
+                    params = [time_net.linear_params(net[i]) for _, _, net, _ in nets]
+                    weights = [weight for weight, _ in params]
+                    if i == 0:
+                        # pruned lags with zero weights
+                        weights = [
+                            time_net.expand_lag_weights(weight, lag_indices, n_inputs)
+                            for weight, (_, _, _, lag_indices) in zip(weights, nets)
+                        ]
+                    self.lagged_weights.append(torch.stack([weight.t() for weight in weights]))
+                    biases = [torch.zeros(weight.shape[0]) if bias is None else bias for weight, bias in params]
+                    self.lagged_biases.append(torch.stack(biases).unsqueeze(1))
+
+            # Events, input as separate dense features
+            self.event_names, self.event_multiplicative, self.event_indices = [], [], []
+            self.has_additive_events = False
+            self.has_multiplicative_events = False
+            if model.events_dims is not None:
+                self.register_buffer("event_weights_additive", model.event_params["additive"].detach().clone())
+                self.register_buffer(
+                    "event_weights_multiplicative", model.event_params["multiplicative"].detach().clone()
+                )
+                self.has_additive_events = self.event_weights_additive.shape[0] > 0
+                self.has_multiplicative_events = self.event_weights_multiplicative.shape[0] > 0
+                for event, configs in model.events_dims.items():
+                    self.event_names.append(event)
+                    self.event_multiplicative.append(configs["mode"] == "multiplicative")
+                    self.event_indices.append(torch.tensor(configs["event_indices"], dtype=torch.long))
+            else:
+                self.register_buffer("event_weights_additive", torch.zeros(0))
+                self.register_buffer("event_weights_multiplicative", torch.zeros(0))
+
+            # Regressors, in packed features
+            self.regressor_names, self.regressor_columns = [], []
+            self.regressor_multiplicative, self.regressor_params = [], []
+            self.regressor_starts = [0, 0]
+            self.regressor_stops = [0, 0]
+            regressor_weights = [torch.zeros(0), torch.zeros(0)]
+            if model.config_regressors is not None:
+                for i, mode in enumerate(["additive", "multiplicative"]):
+                    columns = schema.features.get(("regressors", mode), slice(0, 0))
+                    self.regressor_starts[i], self.regressor_stops[i] = columns.start, columns.stop
+                    regressor_weights[i] = model.regressor_params[mode].detach().clone()
+                for regressor, configs in model.regressors_dims.items():
+                    mode = configs["mode"]
+                    index = configs["regressor_index"]
+                    self.regressor_names.append(regressor)
+                    self.regressor_columns.append(schema.features[("regressors", mode)].start + index)
+                    self.regressor_multiplicative.append(mode == "multiplicative")
+                    self.regressor_params.append(model.regressor_params[mode][index].detach().clone())
+            self.register_buffer("regressor_weights_additive", regressor_weights[0])
+            self.register_buffer("regressor_weights_multiplicative", regressor_weights[1])
+
+    def forward(
+        self,
+        features: torch.Tensor,
+        lagged: torch.Tensor,
+        events_additive: torch.Tensor,
+        events_multiplicative: torch.Tensor,
+    ) -> Tuple[torch.Tensor, Dict[str, torch.Tensor]]:
+        """Compute the forecast together with the values of each model component.
+
+        Args:
+            features (torch tensor, float): all per-step features, as described by the feature schema of the TimeNet
+                dims: (batch, n_forecasts, n_features)
+            lagged (torch tensor, float): all lagged series, as described by the feature schema of the TimeNet
+                dims: (batch, n_lags, n_lagged), (batch, 0, 0) if no lagged inputs
+            events_additive (torch tensor, float): dense additive event features
+                dims: (batch, n_forecasts, n_additive_events), (batch, n_forecasts, 0) if none
+            events_multiplicative (torch tensor, float): dense multiplicative event features
+                dims: (batch, n_forecasts, n_multiplicative_events), (batch, n_forecasts, 0) if none
+
+        Returns:
+            forecast of dims (batch, n_forecasts)
+            dict of forecast_component: value, identical to TimeNet.compute_components
+                with elements of dims (batch, n_forecasts)
+        """
+        t = features[:, :, self.time_column]
+        components: Dict[str, torch.Tensor] = {}
+        segment_id = self._trend_segment_ids(t)
+        trend = self.trend_slopes[segment_id] * t + self.trend_offsets[segment_id]
+        components["trend"] = trend
+        additive = torch.zeros_like(t)
+        multiplicative = torch.zeros_like(t)
+
+        for i in range(len(self.season_names)):
+            if self.season_from_time:
+                season_features = self._fourier_features(features, i)
+            else:
+                season_features = features[:, :, self.season_starts[i] : self.season_stops[i]]
+            season = torch.matmul(season_features, self.season_params[i])
+            components["season_" + self.season_names[i]] = season
+            if self.season_multiplicative:
+                multiplicative = multiplicative + season
+            else:
+                additive = additive + season
+
+        name_index = 0
+        for group in range(len(self.lagged_group_sizes)):
+            n_inputs = self.lagged_group_inputs[group]
+            # dims: (n_nets, batch, n_inputs)
+            x = lagged[:, lagged.shape[1] - n_inputs :, :].index_select(2, self.lagged_group_channels[group])
+            x = x.permute(2, 0, 1)
+            for i in range(self.n_layers):
+                if i > 0:
+                    x = torch.relu(x)
+                layer = group * self.n_layers + i
+                x = torch.baddbmm(self.lagged_biases[layer], x, self.lagged_weights[layer])
+            for k in range(self.lagged_group_sizes[group]):
+                components[self.lagged_names[name_index]] = x[k]
+                name_index += 1
+            additive = additive + torch.sum(x, dim=0)
+
+        if self.has_additive_events:
+            effect = torch.matmul(events_additive, self.event_weights_additive)
+            components["events_additive"] = effect
+            additive = additive + effect
+        if self.has_multiplicative_events:
+            effect = torch.matmul(events_multiplicative, self.event_weights_multiplicative)
+            components["events_multiplicative"] = effect
+            multiplicative = multiplicative + effect
+        for i in range(len(self.event_names)):
+            indices = self.event_indices[i]
+            if self.event_multiplicative[i]:
+                event_features, weights = events_multiplicative, self.event_weights_multiplicative
+            else:
+                event_features, weights = events_additive, self.event_weights_additive
+            components["event_" + self.event_names[i]] = torch.matmul(
+                event_features.index_select(2, indices), weights.index_select(0, indices)
+            )
+
+        if self.regressor_stops[0] > self.regressor_starts[0]:
+            regressors = features[:, :, self.regressor_starts[0] : self.regressor_stops[0]]
+            effect = torch.matmul(regressors, self.regressor_weights_additive)
+            components["future_regressors_additive"] = effect
+            additive = additive + effect
+        if self.regressor_stops[1] > self.regressor_starts[1]:
+            regressors = features[:, :, self.regressor_starts[1] : self.regressor_stops[1]]
+            effect = torch.matmul(regressors, self.regressor_weights_multiplicative)
+            components["future_regressors_multiplicative"] = effect
+            multiplicative = multiplicative + effect
+        for i in range(len(self.regressor_names)):
+            effect = features[:, :, self.regressor_columns[i]] * self.regressor_params[i]
+            components["future_regressor_" + self.regressor_names[i]] = effect
+
+        out = trend + additive + trend * multiplicative
+        return out, components
+
+    def _trend_segment_ids(self, t: torch.Tensor) -> torch.Tensor:
+        return torch.bucketize(t, self.trend_changepoints, right=True)
+
+    def _fourier_features(self, features: torch.Tensor, i: int) -> torch.Tensor:
+        days = features[:, :, self.days_columns[0]].double() + features[:, :, self.days_columns[1]].double()
+        resolution = self.season_resolutions[i]
+        phase = torch.remainder(days / self.season_periods[i], 1.0)
+        harmonics = torch.arange(1, resolution + 1, dtype=torch.double)
+        angle = 2.0 * math.pi * torch.unsqueeze(phase, dim=-1) * harmonics
+        out = torch.stack((torch.sin(angle), torch.cos(angle)), dim=-1)
+        return out.reshape(days.shape[0], days.shape[1], 2 * resolution).float()
+
+
+def inference_inputs(model, inputs):
+    """Convert packed model inputs to the input signature of InferenceNet.
+
+    Args:
+        model (TimeNet): model of the inputs
+        inputs (dict): packed model inputs, as from a TimeDataset with packed=True.
+            Features of deduplicated timestamps are expanded to the steps of each sample.
+
+    Returns:
+        features (torch tensor, float), dims: (batch, n_forecasts, n_features)
+        lagged (torch tensor, float), dims: (batch, n_lags, n_lagged), (batch, 0, 0) if no lagged inputs
+        events_additive (torch tensor, float), dims: (batch, n_forecasts, n_additive_events)
+        events_multiplicative (torch tensor, float), dims: (batch, n_forecasts, n_multiplicative_events)
+    """
+    features = inputs["features"]
+    if "steps" in inputs:
+        features = features[inputs["steps"]]
+    batch, n_forecasts = features.shape[:2]
+    lagged = inputs["lagged"] if "lagged" in inputs else torch.zeros(batch, 0, 0)
+    events = []
+    for mode in ["additive", "multiplicative"]:
+        if "events" in inputs and mode in inputs["events"]:
+            mode_events = inputs["events"][mode]
+            events.append(mode_events.to_dense() if mode_events.is_sparse else mode_events)
+        elif ("events", mode) in model.feature_schema.features:
+            events.append(features[:, :, model.feature_schema.features[("events", mode)]])
+        else:
+            events.append(torch.zeros(batch, n_forecasts, 0))
+    return features, lagged, events[0], events[1]
+
+
+def to_torchscript(model):
+    """Compile a fitted TimeNet for inference with TorchScript.
+
+    Args:
+        model (TimeNet): fitted model, its current weights are copied
+
+    Returns:
+        torch.jit.ScriptModule of InferenceNet, to be called with the outputs of inference_inputs.
+            Can be saved with torch.jit.save and loaded without neuralprophet.
+    """
+    return torch.jit.script(InferenceNet(model).eval())
+
+
+# attributes of InferenceNet written by to_numpy, other than its buffers
+_NUMPY_ATTRIBUTES = [
+    "time_column",
+    "season_multiplicative",
+    "season_from_time",
+    "season_periods",
+    "season_resolutions",
+    "days_columns",
+    "season_names",
+    "season_starts",
+    "season_stops",
+    "n_layers",
+    "lagged_names",
+    "lagged_group_sizes",
+    "lagged_group_inputs",
+    "event_names",
+    "event_multiplicative",
+    "has_additive_events",
+    "has_multiplicative_events",
+    "regressor_names",
+    "regressor_columns",
+    "regressor_multiplicative",
+    "regressor_starts",
+    "regressor_stops",
+]
+_NUMPY_TENSOR_LISTS = [
+    "season_params",
+    "lagged_group_channels",
+    "lagged_weights",
+    "lagged_biases",
+    "event_indices",
+    "regressor_params",
+]
+
+
+def to_numpy(model, path, data_params=None):
+    """Write the weights of a fitted TimeNet for inference with NumPy only, see inference.NumpyNet.
+
+    Args:
+        model (TimeNet): fitted model, its current weights are copied
+        path (str): file to write, in the .npz format of numpy.savez
+        data_params (OrderedDict): normalization parameters of the fitted NeuralProphet.
+            If given, NumpyNet.predict scales the forecast and components like NeuralProphet.predict,
+            and NumpyNet.predict_df normalizes dataframes.
+    """
+    net = InferenceNet(model)
+    arrays = OrderedDict({})
+    for name, buffer in net.named_buffers():
+        arrays[name] = buffer.numpy()
+    for name in _NUMPY_TENSOR_LISTS:
+        for i, value in enumerate(getattr(net, name)):
+            arrays["{}_{}".format(name, i)] = value.numpy()
+    meta = OrderedDict((name, getattr(net, name)) for name in _NUMPY_ATTRIBUTES)
+    # configs of tabular.tabularize_univariate_datetime, to build the inputs from dataframes
+    meta["input_configs"] = OrderedDict(
+        season_config=_config_to_json(model.config_season),
+        events_config=_config_to_json(model.config_events),
+        country_holidays_config=_config_to_json(model.config_holidays),
+        covar_config=_config_to_json(model.config_covar),
+        regressors_config=_config_to_json(model.config_regressors),
+        n_lags=model.n_lags,
+        n_forecasts=model.n_forecasts,
+    )
+    if data_params is not None:
+        meta["y_scale"] = float(data_params["y"].scale)
+        meta["y_shift"] = float(data_params["y"].shift)
+        # dates as strings of the shift timestamp and scale timedelta, which pandas parses without loss
+        meta["data_params"] = OrderedDict(
+            (
+                name,
+                [str(params.shift), str(params.scale)] if name == "ds" else [float(params.shift), float(params.scale)],
+            )
+            for name, params in data_params.items()
+        )
+    arrays["meta"] = np.array(json.dumps(meta))
+    with open(path, "wb") as f:
+        np.savez(f, **arrays)
+
+
+def _config_to_json(config):
+    # sets are sorted, such that the configs are written in a stable order
+    if dataclasses.is_dataclass(config):
+        return _config_to_json(dataclasses.asdict(config))
+    if isinstance(config, dict):
+        return OrderedDict((key, _config_to_json(value)) for key, value in config.items())
+    if isinstance(config, (set, frozenset)):
+        return sorted(config)
+    if isinstance(config, (list, tuple)):
+        return [_config_to_json(value) for value in config]
+    if isinstance(config, np.generic):
+        return config.item()
+    return config
+
+
+class _OnnxInferenceNet(InferenceNet):
+    """InferenceNet with only operators and outputs supported by ONNX.
+
+    The trend segments are counted by comparison with all changepoints, as ONNX has no bucketize operator.
+    Only the inputs used by the model are taken, the outputs are the forecast followed by each component.
+    """
+
+    def __init__(self, model, input_names):
+        """
+        Args:
+            model (TimeNet): fitted model, its current weights are copied
+            input_names (list of str): names of the used inputs of InferenceNet, in order
+        """
+        super(_OnnxInferenceNet, self).__init__(model)
+        self.input_names = input_names
+        self.n_changepoints = self.trend_changepoints.shape[0]
+        # columns of events packed into features
+        self.packed_events = OrderedDict({})
+        for mode in ["additive", "multiplicative"]:
+            if ("events", mode) in model.feature_schema.features:
+                self.packed_events["{}_events".format(mode)] = model.feature_schema.features[("events", mode)]
+
+    def forward(self, *inputs):
+        named = dict(zip(self.input_names, inputs))
+        features = named["features"]
+        for name, columns in self.packed_events.items():
+            named[name] = features[:, :, columns]
+        # unused inputs are never accessed, any tensor can be passed in their place
+        outputs = super(_OnnxInferenceNet, self).forward(
+            features,
+            named.get("lagged", features),
+            named.get("additive_events", features),
+            named.get("multiplicative_events", features),
+        )
+        predicted, components = outputs
+        return (predicted,) + tuple(components.values())
+
+    def _trend_segment_ids(self, t):
+        if self.n_changepoints == 0:
+            return torch.zeros_like(t, dtype=torch.long)
+        return torch.sum(torch.unsqueeze(t, dim=-1) >= self.trend_changepoints, dim=-1)
+
+
+def onnx_schema(model):
+    """Input and output layout of a TimeNet exported with to_onnx.
+
+    Args:
+        model (TimeNet): model to be exported
+
+    Returns:
+        schema (OrderedDict):
+            inputs (OrderedDict): by input name, OrderedDict of
+                dims (list): named dimensions of the input
+                columns (OrderedDict): position of each model input along the last dimension,
+                    as [start, stop) of the feature columns, or the channel of a lagged series.
+            outputs (list of str): names of the outputs, the forecast 'yhat' followed by each component
+                as named by TimeNet.compute_components, all of dims (batch, n_forecasts)
+    """
+    schema = model.feature_schema
+    inputs = OrderedDict({})
+    features = OrderedDict({})
+    for (key, name), columns in schema.features.items():
+        if columns.stop > columns.start:
+            label = key if name is None else "{}_{}".format(key, name)
+            features[label] = [columns.start, columns.stop]
+    inputs["features"] = OrderedDict(dims=["batch", "n_forecasts", "n_features"], columns=features)
+    if schema.n_lagged > 0:
+        lagged = OrderedDict({})
+        for (key, name), (channel, n_inputs) in schema.lagged.items():
+            lagged[key if name is None else "{}_{}".format(key, name)] = channel
+        inputs["lagged"] = OrderedDict(dims=["batch", "n_lags", "n_lagged"], columns=lagged)
+    for mode in ["additive", "multiplicative"]:
+        if "{}_events".format(mode) in _onnx_input_names(model):
+            events = OrderedDict({})
+            for event, configs in model.events_dims.items():
+                if configs["mode"] == mode:
+                    events["event_{}".format(event)] = list(configs["event_indices"])
+            inputs["{}_events".format(mode)] = OrderedDict(
+                dims=["batch", "n_forecasts", "n_{}_events".format(mode)], columns=events
+            )
+    net = InferenceNet(model)
+    with torch.no_grad():
+        dummy = torch.zeros(1, model.n_forecasts, schema.n_features)
+        n_lags = max(model.n_lags, 1)
+        _, components = net(
+            dummy,
+            torch.zeros(1, n_lags, max(schema.n_lagged, 1)),
+            torch.zeros(1, model.n_forecasts, net.event_weights_additive.shape[0]),
+            torch.zeros(1, model.n_forecasts, net.event_weights_multiplicative.shape[0]),
+        )
+    return OrderedDict(inputs=inputs, outputs=["yhat"] + list(components.keys()))
+
+
+def _onnx_input_names(model):
+    names = ["features"]
+    if model.feature_schema.n_lagged > 0:
+        names.append("lagged")
+    if model.events_dims is not None:
+        for mode in ["additive", "multiplicative"]:
+            # unless packed into features
+            if ("events", mode) not in model.feature_schema.features and model.event_params[mode].shape[0] > 0:
+                names.append("{}_events".format(mode))
+    return names
+
+
+def onnx_inputs(model, inputs):
+    """Convert packed model inputs to the inputs of a model exported with to_onnx.
+
+    Args:
+        model (TimeNet): exported model
+        inputs (dict): packed model inputs, as from a TimeDataset with packed=True
+
+    Returns:
+        inputs (OrderedDict): by input name, np.array of dims as described by onnx_schema
+    """
+    names = ["features", "lagged", "additive_events", "multiplicative_events"]
+    used = _onnx_input_names(model)
+    return OrderedDict(
+        (name, value.numpy()) for name, value in zip(names, inference_inputs(model, inputs)) if name in used
+    )
+
+
+def to_onnx(model, path, opset_version=11):
+    """Export a fitted TimeNet to an ONNX model, for inference without neuralprophet and torch.
+
+    The inputs are the packed inputs of a TimeDataset with packed=True, as from inference_inputs,
+    of which only those used by the model are included:
+        features (float32), dims: (batch, n_forecasts, n_features), per-step features (time, seasonalities,
+            regressors, and events unless sparse), at the columns of model.feature_schema
+        lagged (float32), dims: (batch, n_lags, n_lagged), if the model has AR or lagged regressors.
+            The lagged series (lags, covariates), one channel each.
+        additive_events, multiplicative_events (float32), dims: (batch, n_forecasts, n_events),
+            if the model has events of the mode which are not packed into features.
+            Dense event features, as from tabularize_univariate_datetime.
+    The outputs are the normalized forecast 'yhat' and all components, see onnx_schema.
+    The trend changepoints, seasonality parameters, AR and covariate nets and event and regressor
+    weights are stored in the graph as initializers.
+
+    Args:
+        model (TimeNet): fitted model
+        path (str): file to write the ONNX model to
+        opset_version (int): ONNX opset
+
+    Returns:
+        schema (OrderedDict): layout of inputs and outputs, see onnx_schema
+    """
+    schema = onnx_schema(model)
+    input_names = list(schema["inputs"].keys())
+    net = _OnnxInferenceNet(model, input_names).eval()
+    batch = 2
+    dummy_inputs = []
+    for name in input_names:
+        if name == "lagged":
+            dummy_inputs.append(torch.zeros(batch, model.n_lags, model.feature_schema.n_lagged))
+        elif name == "features":
+            dummy_inputs.append(torch.zeros(batch, model.n_forecasts, model.feature_schema.n_features))
+        else:
+            n_events = getattr(net, "event_weights_{}".format(name.split("_")[0])).shape[0]
+            dummy_inputs.append(torch.zeros(batch, model.n_forecasts, n_events))
+    kwargs = {}
+    if "dynamo" in inspect.signature(torch.onnx.export).parameters:
+        # the TorchScript-based exporter, as in torch versions before the dynamo-based exporter
+        kwargs["dynamo"] = False
+    torch.onnx.export(
+        net,
+        tuple(dummy_inputs),
+        path,
+        input_names=input_names,
+        output_names=schema["outputs"],
+        dynamic_axes={name: {0: "batch"} for name in input_names + schema["outputs"]},
+        opset_version=opset_version,
+        **kwargs,
+    )
+    log.debug("Exported model to ONNX {}".format(path))
+    return schema
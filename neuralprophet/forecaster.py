@@ -4,7 +4,6 @@ from attrdict import AttrDict
 import numpy as np
 import pandas as pd
 import torch
-from torch.utils.data import DataLoader
 from torch import optim
 import logging
 from tqdm import tqdm
@@ -18,6 +17,7 @@ from neuralprophet import utils
 from neuralprophet.plot_forecast import plot, plot_components
 from neuralprophet.plot_model_parameters import plot_parameters
 from neuralprophet import metrics
+from neuralprophet import export
 from neuralprophet.utils import set_logger_level
 
 log = logging.getLogger("nprophet")
@@ -44,6 +44,7 @@ class NeuralProphet:
         daily_seasonality="auto",
         seasonality_mode="additive",
         seasonality_reg=0,
+        seasonality_from_time=False,
         n_forecasts=1,
         n_lags=0,
         num_hidden_layers=0,
@@ -56,6 +57,7 @@ class NeuralProphet:
         train_speed=None,
         normalize="auto",
         impute_missing=True,
+        dataset_cache_dir=None,
         log_level=None,
     ):
         """
@@ -90,6 +92,8 @@ class NeuralProphet:
                 Smaller values (~0.1-1) allow the model to fit larger seasonal fluctuations,
                 larger values (~1-100) dampen the seasonality.
                 default: None, no regularization
+            seasonality_from_time (bool): compute the Fourier features of the seasonalities in the model,
+                from the days since epoch in float64. Model inputs then contain no seasonal features.
 
             ## AR Config
             n_lags (int): Previous time series steps to include in auto-regression. Aka AR-order
@@ -127,6 +131,11 @@ class NeuralProphet:
                 'soft' scales minimum to 0.1 and the 90th quantile to 0.9
             impute_missing (bool): whether to automatically impute missing dates/values
                 imputation follows a linear method up to 10 missing values, more are filled with trend.
+            dataset_cache_dir (str): directory in which tabularized training datasets are cached
+                as memory-mapped files. Only the most recently used entries are kept,
+                see time_dataset.tabularize_cached.
+                default: None, datasets are tabularized anew for each fit.
+                Useful when repeatedly fitting the same long history.
 
             ## General Config
             log_level (str): The log level of the logger objects used for printing procedure status
@@ -147,6 +156,7 @@ class NeuralProphet:
         self.impute_missing = impute_missing
         self.impute_limit_linear = 5
         self.impute_rolling = 20
+        self.dataset_cache_dir = dataset_cache_dir
 
         # Training
         self.config_train = configure.from_kwargs(configure.Train, kwargs)
@@ -185,6 +195,7 @@ class NeuralProphet:
             yearly_arg=yearly_seasonality,
             weekly_arg=weekly_seasonality,
             daily_arg=daily_seasonality,
+            from_time=seasonality_from_time,
         )
         self.config_train.reg_lambda_season = self.season_config.reg_lambda
 
@@ -202,6 +213,8 @@ class NeuralProphet:
         # Set during _train()
         self.fitted = False
         self.data_params = None
+        self.train_dataset = None
+        self.scripted_model = None
         self.optimizer = None
         self.scheduler = None
         self.model = None
@@ -212,6 +225,16 @@ class NeuralProphet:
         self.highlight_forecast_step_n = None
         self.true_ar_weights = None
 
+    def __getstate__(self):
+        """State for pickling, without the training dataset kept for appending and the compiled model.
+
+        The TorchScript model can not be pickled, it is compiled again when needed.
+        """
+        state = self.__dict__.copy()
+        state["train_dataset"] = None
+        state["scripted_model"] = None
+        return state
+
     def _init_model(self):
         """Build Pytorch model with configured hyperparamters.
 
@@ -229,11 +252,12 @@ class NeuralProphet:
             n_lags=self.n_lags,
             num_hidden_layers=self.config_model.num_hidden_layers,
             d_hidden=self.config_model.d_hidden,
+            sparse_events=True,
         )
         log.debug(self.model)
         return self.model
 
-    def _create_dataset(self, df, predict_mode):
+    def _create_dataset(self, df, predict_mode, lazy=False, cached=False):
         """Construct dataset from dataframe.
 
         (Configured Hyperparameters can be overridden by explicitly supplying them.
@@ -243,11 +267,15 @@ class NeuralProphet:
             df (pd.DataFrame): containing original and normalized columns 'ds', 'y', 't', 'y_scaled'
             predict_mode (bool): False includes target values.
                 True does not include targets but includes entire dataset as input
+            lazy (bool): whether to slice sample windows on demand instead of materializing them
+            cached (bool): whether to use the dataset cache in self.dataset_cache_dir, only for training data
         Returns:
             TimeDataset
         """
         return time_dataset.TimeDataset(
             df,
+            lazy=lazy,
+            cache_dir=self.dataset_cache_dir if cached else None,
             season_config=self.season_config,
             events_config=self.events_config,
             country_holidays_config=self.country_holidays_config,
@@ -256,6 +284,9 @@ class NeuralProphet:
             predict_mode=predict_mode,
             covar_config=self.config_covar,
             regressors_config=self.regressors_config,
+            packed=True,
+            sparse_events=True,
+            dedup_steps=True,
         )
 
     def _handle_missing_data(self, df, predicting=False, allow_missing_dates="auto"):
@@ -375,7 +406,7 @@ class NeuralProphet:
                 raise ValueError("Name {name!r} already used for an added regressor.".format(name=name))
 
     def _lr_range_test(self, dataset, skip_start=10, skip_end=10, plot=False):
-        lrtest_loader = DataLoader(dataset, batch_size=self.config_train.batch_size, shuffle=True)
+        lrtest_loader = time_dataset.make_loader(dataset, batch_size=self.config_train.batch_size, shuffle=True)
         lrtest_optimizer = optim.Adam(self.model.parameters(), lr=1e-7, weight_decay=1e-2)
         with utils.HiddenPrints():
             lr_finder = LRFinder(self.model, lrtest_optimizer, self.config_train.loss_func)
@@ -408,11 +439,14 @@ class NeuralProphet:
             lr_finder.reset()  # to reset the model and optimizer to their initial state
         return max_lr
 
-    def _init_train_loader(self, df):
+    def _init_train_loader(self, df, lazy_dataset=False, append=False, keep_dataset=False):
         """Executes data preparation steps and initiates training procedure.
 
         Args:
             df (pd.DataFrame): containing column 'ds', 'y' with training data
+            lazy_dataset (bool): whether to slice sample windows on demand instead of materializing them
+            append (bool): whether to append df to the training dataset of the previous fit
+            keep_dataset (bool): whether to keep the training dataset, to append to it in later fits
 
         Returns:
             torch DataLoader
@@ -438,10 +472,21 @@ class NeuralProphet:
                 self.country_holidays_config["holiday_names"] = utils.get_holidays_from_country(
                     self.country_holidays_config["country"], df["ds"]
                 )
-        self.config_train.set_auto_batch_epoch(n_data=len(df))
+        if append:
+            last_date = self.train_dataset.df_tail["ds"].iloc[-1]
+            if df["ds"].iloc[0] != last_date + pd.tseries.frequencies.to_offset(self.data_freq):
+                raise ValueError(
+                    "Appended data must directly follow the training data, which ends at {}.".format(last_date)
+                )
+            dataset = self.train_dataset
+            dataset.append(df)
+        else:
+            # needs to be called after set_auto_seasonalities
+            dataset = self._create_dataset(df, predict_mode=False, lazy=lazy_dataset, cached=True)
+            self.train_dataset = dataset if keep_dataset else None
+        self.config_train.set_auto_batch_epoch(n_data=dataset.n_rows)
         self.config_train.apply_train_speed()
-        dataset = self._create_dataset(df, predict_mode=False)  # needs to be called after set_auto_seasonalities
-        loader = DataLoader(dataset, batch_size=self.config_train.batch_size, shuffle=True)
+        loader = time_dataset.make_loader(dataset, batch_size=self.config_train.batch_size, shuffle=True)
         if not self.fitted:
             self.model = self._init_model()  # needs to be called after set_auto_seasonalities
         if self.config_train.learning_rate is None:
@@ -456,18 +501,19 @@ class NeuralProphet:
         )
         return loader
 
-    def _init_val_loader(self, df):
+    def _init_val_loader(self, df, lazy_dataset=False):
         """Executes data preparation steps and initiates evaluation procedure.
 
         Args:
             df (pd.DataFrame): containing column 'ds', 'y' with validation data
+            lazy_dataset (bool): whether to slice sample windows on demand instead of materializing them
 
         Returns:
             torch DataLoader
         """
         df = df_utils.normalize(df, self.data_params)
-        dataset = self._create_dataset(df, predict_mode=False)
-        loader = DataLoader(dataset, batch_size=min(1024, len(dataset)), shuffle=False, drop_last=False)
+        dataset = self._create_dataset(df, predict_mode=False, lazy=lazy_dataset)
+        loader = time_dataset.make_loader(dataset, batch_size=min(1024, len(dataset)), shuffle=False, drop_last=False)
         return loader
 
     def _train_epoch(self, e, loader):
@@ -567,7 +613,16 @@ class NeuralProphet:
             val_metrics = val_metrics.compute(save=True)
         return val_metrics
 
-    def _train(self, df, df_val=None, use_tqdm=True, plot_live_loss=False):
+    def _train(
+        self,
+        df,
+        df_val=None,
+        use_tqdm=True,
+        plot_live_loss=False,
+        lazy_dataset=False,
+        append=False,
+        keep_dataset=False,
+    ):
         """Execute model training procedure for a configured number of epochs.
 
         Args:
@@ -576,6 +631,9 @@ class NeuralProphet:
             use_tqdm (bool): display updating progress bar
             plot_live_loss (bool): plot live training loss,
                 requires [live] install or livelossplot package installed.
+            lazy_dataset (bool): whether to slice sample windows on demand instead of materializing them
+            append (bool): whether to append df to the training dataset of the previous fit
+            keep_dataset (bool): whether to keep the training dataset, to append to it in later fits
         Returns:
             df with metrics
         """
@@ -591,7 +649,7 @@ class NeuralProphet:
                     exc_info=True,
                 )
 
-        loader = self._init_train_loader(df)
+        loader = self._init_train_loader(df, lazy_dataset=lazy_dataset, append=append, keep_dataset=keep_dataset)
         val = df_val is not None
         ## Metrics
         if self.highlight_forecast_step_n is not None:
@@ -599,7 +657,7 @@ class NeuralProphet:
         if not self.normalize == "off":
             self.metrics.set_shift_scale((self.data_params["y"].shift, self.data_params["y"].scale))
         if val:
-            val_loader = self._init_val_loader(df_val)
+            val_loader = self._init_val_loader(df_val, lazy_dataset=lazy_dataset)
             val_metrics = metrics.MetricsCollection([m.new() for m in self.metrics.batch_metrics])
 
         ## Run
@@ -717,7 +775,19 @@ class NeuralProphet:
         )
         return df_train, df_val
 
-    def fit(self, df, freq, epochs=None, validate_each_epoch=False, valid_p=0.2, use_tqdm=True, plot_live_loss=False):
+    def fit(
+        self,
+        df,
+        freq,
+        epochs=None,
+        validate_each_epoch=False,
+        valid_p=0.2,
+        use_tqdm=True,
+        plot_live_loss=False,
+        lazy_dataset=False,
+        append=False,
+        keep_dataset=False,
+    ):
         """Train, and potentially evaluate model.
 
         Args:
@@ -731,6 +801,14 @@ class NeuralProphet:
             use_tqdm (bool): display updating progress bar
             plot_live_loss (bool): plot live training loss,
                 requires [live] install or livelossplot package installed.
+            lazy_dataset (bool): slice the sample windows from the time series on demand
+                instead of materializing all of them. Reduces memory for large n_lags and n_forecasts.
+            append (bool): df contains only new observations, directly following the data of the previous fit.
+                Their samples are appended to the training dataset of the previous fit,
+                instead of tabularizing all data again. Requires a previous fit with keep_dataset.
+                Not possible with validate_each_epoch.
+            keep_dataset (bool): keep the training dataset on the model, to append observations in later fits.
+                The dataset stays in memory until the next fit without keep_dataset or append, and is not pickled.
         Returns:
             metrics with training and potentially evaluation metrics
         """
@@ -741,27 +819,44 @@ class NeuralProphet:
         if epochs is not None:
             default_epochs = self.config_train.epochs
             self.config_train.epochs = epochs
-        if self.fitted is True:
+        if append and (self.train_dataset is None or validate_each_epoch):
+            raise ValueError("Appending requires a previous fit with keep_dataset and without validate_each_epoch.")
+        if self.model is not None and self.model.quantized:
+            raise ValueError("Quantized models can not be fitted further.")
+        if self.fitted is True and not append:
             log.warning("Model has already been fitted. Re-fitting will produce different results.")
         df = df_utils.check_dataframe(
             df, check_y=True, covariates=self.config_covar, regressors=self.regressors_config, events=self.events_config
         )
         df = self._handle_missing_data(df)
-        if validate_each_epoch:
+        if append:
+            metrics_df = self._train(df, use_tqdm=use_tqdm, plot_live_loss=plot_live_loss, append=True)
+        elif validate_each_epoch:
             df_train, df_val = df_utils.split_df(df, n_lags=self.n_lags, n_forecasts=self.n_forecasts, valid_p=valid_p)
-            metrics_df = self._train(df_train, df_val, use_tqdm=use_tqdm, plot_live_loss=plot_live_loss)
+            metrics_df = self._train(
+                df_train, df_val, use_tqdm=use_tqdm, plot_live_loss=plot_live_loss, lazy_dataset=lazy_dataset
+            )
         else:
-            metrics_df = self._train(df, use_tqdm=use_tqdm, plot_live_loss=plot_live_loss)
+            metrics_df = self._train(
+                df,
+                use_tqdm=use_tqdm,
+                plot_live_loss=plot_live_loss,
+                lazy_dataset=lazy_dataset,
+                keep_dataset=keep_dataset,
+            )
         if epochs is not None:
             self.config_train.epochs = default_epochs
         self.fitted = True
+        # compiled again with the new weights when needed
+        self.scripted_model = None
         return metrics_df
 
-    def test(self, df):
+    def test(self, df, lazy_dataset=False):
         """Evaluate model on holdout data.
 
         Args:
             df (pd.DataFrame): containing column 'ds', 'y' with holdout data
+            lazy_dataset (bool): slice the sample windows from the time series on demand
         Returns:
             df with evaluation metrics
         """
@@ -769,10 +864,54 @@ class NeuralProphet:
             log.warning("Model has not been fitted. Test results will be random.")
         df = df_utils.check_dataframe(df, check_y=True, covariates=self.config_covar, events=self.events_config)
         df = self._handle_missing_data(df)
-        loader = self._init_val_loader(df)
+        loader = self._init_val_loader(df, lazy_dataset=lazy_dataset)
         val_metrics_df = self._evaluate(loader)
         return val_metrics_df
 
+    def quantize(self, dtype=torch.qint8):
+        """Quantize the AR-Net and covariate nets of the fitted model for faster inference.
+
+        Their linear layers store integer weights and quantize activations dynamically.
+        Check the accuracy impact with test. The quantized model can not be fitted further.
+
+        Args:
+            dtype (torch.dtype): quantized type of the weights, torch.qint8 (default) or torch.float16
+
+        Returns:
+            NeuralProphet object
+        """
+        if self.fitted is False:
+            raise ValueError("Model must be fitted before quantization.")
+        if self.model.quantized:
+            raise ValueError("Model is already quantized.")
+        self.model.quantize(dtype=dtype)
+        self.model.eval()
+        # compiled again with the new weights when needed
+        self.scripted_model = None
+        return self
+
+    def prune_lags(self, threshold):
+        """Remove the lags without relevant weights from the AR-Net and covariate nets of the fitted model.
+
+        Intended for models fitted with ar_sparsity, which drives most AR weights towards zero.
+        Input weights below threshold are set to zero, and lags with only zero weights are no longer evaluated.
+        Check the accuracy impact with test.
+
+        Args:
+            threshold (float): smallest absolute value of a kept weight
+
+        Returns:
+            NeuralProphet object
+        """
+        if self.fitted is False:
+            raise ValueError("Model must be fitted before pruning.")
+        n_kept = self.model.prune_lags(threshold)
+        for name, n in n_kept.items():
+            log.info("Pruned {}: {} lags kept".format(name, n))
+        # compiled again with the new weights when needed
+        self.scripted_model = None
+        return self
+
     def make_future_dataframe(self, df, events_df=None, regressors_df=None, periods=None, n_historic_predictions=0):
         df = df.copy(deep=True)
         if events_df is not None:
@@ -895,13 +1034,20 @@ class NeuralProphet:
 
         return df_out.reset_index(drop=True)
 
-    def predict(self, df):
+    def predict(self, df, lazy_dataset=False, torchscript=False, fft_lags=False):
         """Runs the model to make predictions.
 
         and compute stats (MSE, MAE)
         Args:
             df (pandas DataFrame): Dataframe with columns 'ds' datestamps, 'y' time series values and
                 other external variables
+            lazy_dataset (bool): slice the sample windows from the time series on demand
+                instead of materializing all of them. Reduces memory for large n_lags and n_forecasts.
+            torchscript (bool): run the model compiled with TorchScript, see export.to_torchscript.
+                The model is compiled once after each fit. Reduces Python overhead for small batches.
+            fft_lags (bool): compute the AR and lagged regressor components with FFT convolutions over the
+                whole series, see TimeNet.lagged_linear_components. Only for num_hidden_layers=0.
+                Takes O(N log N) time instead of O(N n_lags), and no lag windows are created.
 
         Returns:
             df_forecast (pandas DataFrame): columns 'ds', 'y', 'trend' and ['yhat<i>']
@@ -909,17 +1055,32 @@ class NeuralProphet:
         # TODO: Implement data sanity checks?
         if self.fitted is False:
             log.warning("Model has not been fitted. Predictions will be random.")
-        dataset = self._create_dataset(df, predict_mode=True)
-        loader = DataLoader(dataset, batch_size=min(1024, len(df)), shuffle=False, drop_last=False)
+        lagged = None
+        if fft_lags and self.n_lags > 0:
+            if self.model.num_hidden_layers > 0:
+                raise ValueError("fft_lags requires a model without hidden layers, num_hidden_layers=0.")
+            if torchscript:
+                raise ValueError("fft_lags can not be combined with torchscript.")
+            dataset = self._create_dataset(df, predict_mode=True, lazy=True)
+            lagged = dataset.pop_lagged()
+        else:
+            dataset = self._create_dataset(df, predict_mode=True, lazy=lazy_dataset)
+        loader = time_dataset.make_loader(dataset, batch_size=min(1024, len(df)), shuffle=False, drop_last=False)
 
+        if torchscript:
+            if self.scripted_model is None:
+                self.scripted_model = export.to_torchscript(self.model)
+            scripted_model = self.scripted_model
         predicted_vectors = list()
         component_vectors = None
         with torch.no_grad():
             self.model.eval()
             for inputs, _ in loader:
-                predicted = self.model.forward(inputs)
+                if torchscript:
+                    predicted, components = scripted_model(*export.inference_inputs(self.model, inputs))
+                else:
+                    predicted, components = self.model.forward_with_components(inputs)
                 predicted_vectors.append(predicted.detach().numpy())
-                components = self.model.compute_components(inputs)
                 if component_vectors is None:
                     component_vectors = {name: [value.detach().numpy()] for name, value in components.items()}
                 else:
@@ -927,6 +1088,11 @@ class NeuralProphet:
                         component_vectors[name].append(value.detach().numpy())
         components = {name: np.concatenate(value) for name, value in component_vectors.items()}
         predicted = np.concatenate(predicted_vectors)
+        if lagged is not None:
+            with torch.no_grad():
+                for name, value in self.model.lagged_linear_components(lagged).items():
+                    components[name] = value.numpy()
+                    predicted = predicted + components[name]
 
         scale_y, shift_y = self.data_params["y"].scale, self.data_params["y"].shift
         predicted = predicted * scale_y + shift_y
@@ -1023,13 +1189,17 @@ class NeuralProphet:
             # n_forecasts=1,
             predict_mode=True,
         )
-        loader = DataLoader(dataset, batch_size=min(4096, len(df)), shuffle=False, drop_last=False)
+        loader = time_dataset.make_loader(dataset, batch_size=min(4096, len(df)), shuffle=False, drop_last=False)
         predicted = OrderedDict()
         for name in self.season_config.periods:
             predicted[name] = list()
         for inputs, _ in loader:
+            if self.season_config.from_time:
+                seasonalities = self.model.seasonal_features_from_days(self.model.days_from_inputs(inputs))
+            else:
+                seasonalities = inputs["seasonalities"]
             for name in self.season_config.periods:
-                features = inputs["seasonalities"][name]
+                features = seasonalities[name]
                 y_season = torch.squeeze(self.model.seasonality(features=features, name=name))
                 predicted[name].append(y_season.data.numpy())
 
@@ -0,0 +1,258 @@
+"""Inference of fitted models with NumPy only.
+
+This module does not import torch, so that forecasting workers can start without loading it.
+Models are written with export.to_numpy. Inputs are built from dataframes with tabular, which is torch-free too.
+"""
+
+from collections import OrderedDict
+import json
+import logging
+import numpy as np
+import pandas as pd
+from attrdict import AttrDict
+from neuralprophet import df_utils
+from neuralprophet import tabular
+from neuralprophet import utils
+
+log = logging.getLogger("nprophet.inference")
+
+
+class NumpyNet:
+    """Inference-only copy of a fitted TimeNet, evaluated with NumPy.
+
+    Computes the same forecast and components as export.InferenceNet, from the same inputs.
+    """
+
+    def __init__(self, arrays):
+        """
+        Args:
+            arrays (dict): np.array by name, as written by export.to_numpy
+        """
+        meta = json.loads(str(arrays["meta"]))
+        for name, value in meta.items():
+            setattr(self, name, value)
+        self.y_scale = meta.get("y_scale")
+        self.y_shift = meta.get("y_shift")
+        self.data_params = None
+        if "data_params" in meta:
+            self.data_params = OrderedDict({})
+            for name, (shift, scale) in meta["data_params"].items():
+                if name == "ds":
+                    shift, scale = pd.Timestamp(shift), pd.Timedelta(scale)
+                self.data_params[name] = df_utils.ShiftScale(shift, scale)
+        self.input_configs = OrderedDict(
+            (name, _json_to_config(value)) for name, value in meta["input_configs"].items()
+        )
+        # events are included in the packed features of dataframes, after all other columns,
+        # thus the columns of the other features are identical to those of the exported model
+        self.feature_schema = utils.feature_schema_from_configs(
+            season_config=self.input_configs["season_config"],
+            events_config=self.input_configs["events_config"],
+            country_holidays_config=self.input_configs["country_holidays_config"],
+            covar_config=self.input_configs["covar_config"],
+            regressors_config=self.input_configs["regressors_config"],
+            n_lags=self.input_configs["n_lags"],
+        )
+
+        self.trend_changepoints = arrays["trend_changepoints"]
+        self.trend_slopes = arrays["trend_slopes"]
+        self.trend_offsets = arrays["trend_offsets"]
+        self.season_params = [arrays["season_params_{}".format(i)] for i in range(len(self.season_names))]
+        n_groups = len(self.lagged_group_sizes)
+        self.lagged_group_channels = [arrays["lagged_group_channels_{}".format(i)] for i in range(n_groups)]
+        self.lagged_weights = [arrays["lagged_weights_{}".format(i)] for i in range(n_groups * self.n_layers)]
+        self.lagged_biases = [arrays["lagged_biases_{}".format(i)] for i in range(n_groups * self.n_layers)]
+        self.event_weights_additive = arrays["event_weights_additive"]
+        self.event_weights_multiplicative = arrays["event_weights_multiplicative"]
+        self.event_indices = [arrays["event_indices_{}".format(i)] for i in range(len(self.event_names))]
+        self.regressor_weights_additive = arrays["regressor_weights_additive"]
+        self.regressor_weights_multiplicative = arrays["regressor_weights_multiplicative"]
+        self.regressor_params = [arrays["regressor_params_{}".format(i)] for i in range(len(self.regressor_names))]
+
+    @classmethod
+    def load(cls, path):
+        """Load a model written with export.to_numpy.
+
+        Args:
+            path (str): .npz file
+
+        Returns:
+            NumpyNet
+        """
+        with np.load(path, allow_pickle=False) as arrays:
+            return cls({name: arrays[name] for name in arrays.files})
+
+    def forward(self, features, lagged=None, additive_events=None, multiplicative_events=None):
+        """Compute the forecast together with the values of each model component.
+
+        Args:
+            features (np.array, float): all per-step features, as described by the feature schema of the TimeNet
+                dims: (batch, n_forecasts, n_features)
+            lagged (np.array, float): all lagged series, as described by the feature schema of the TimeNet
+                dims: (batch, n_lags, n_lagged), None if no lagged inputs
+            additive_events (np.array, float): dense additive event features
+                dims: (batch, n_forecasts, n_additive_events), None if none
+            multiplicative_events (np.array, float): dense multiplicative event features
+                dims: (batch, n_forecasts, n_multiplicative_events), None if none
+
+        Returns:
+            forecast of dims (batch, n_forecasts)
+            OrderedDict of forecast_component: value, identical to TimeNet.compute_components
+                with elements of dims (batch, n_forecasts)
+        """
+        t = features[:, :, self.time_column]
+        components = OrderedDict({})
+        segment_id = np.searchsorted(self.trend_changepoints, t, side="right")
+        trend = self.trend_slopes[segment_id] * t + self.trend_offsets[segment_id]
+        components["trend"] = trend
+        additive = np.zeros_like(t)
+        multiplicative = np.zeros_like(t)
+
+        for i, (name, start, stop, params) in enumerate(
+            zip(self.season_names, self.season_starts, self.season_stops, self.season_params)
+        ):
+            if self.season_from_time:
+                season_features = self._fourier_features(features, i)
+            else:
+                season_features = features[:, :, start:stop]
+            season = np.matmul(season_features, params)
+            components["season_" + name] = season
+            if self.season_multiplicative:
+                multiplicative += season
+            else:
+                additive += season
+
+        name_index = 0
+        for group, (n_nets, n_inputs) in enumerate(zip(self.lagged_group_sizes, self.lagged_group_inputs)):
+            # dims: (n_nets, batch, n_inputs)
+            x = lagged[:, lagged.shape[1] - n_inputs :, self.lagged_group_channels[group]].transpose(2, 0, 1)
+            for i in range(self.n_layers):
+                if i > 0:
+                    x = np.maximum(x, 0)
+                layer = group * self.n_layers + i
+                x = np.matmul(x, self.lagged_weights[layer]) + self.lagged_biases[layer]
+            for k in range(n_nets):
+                components[self.lagged_names[name_index]] = x[k]
+                name_index += 1
+            additive += np.sum(x, axis=0)
+
+        if self.has_additive_events:
+            effect = np.matmul(additive_events, self.event_weights_additive)
+            components["events_additive"] = effect
+            additive += effect
+        if self.has_multiplicative_events:
+            effect = np.matmul(multiplicative_events, self.event_weights_multiplicative)
+            components["events_multiplicative"] = effect
+            multiplicative += effect
+        for name, is_multiplicative, indices in zip(self.event_names, self.event_multiplicative, self.event_indices):
+            if is_multiplicative:
+                event_features, weights = multiplicative_events, self.event_weights_multiplicative
+            else:
+                event_features, weights = additive_events, self.event_weights_additive
+            components["event_" + name] = np.matmul(event_features[:, :, indices], weights[indices])
+
+        if self.regressor_stops[0] > self.regressor_starts[0]:
+            regressors = features[:, :, self.regressor_starts[0] : self.regressor_stops[0]]
+            effect = np.matmul(regressors, self.regressor_weights_additive)
+            components["future_regressors_additive"] = effect
+            additive += effect
+        if self.regressor_stops[1] > self.regressor_starts[1]:
+            regressors = features[:, :, self.regressor_starts[1] : self.regressor_stops[1]]
+            effect = np.matmul(regressors, self.regressor_weights_multiplicative)
+            components["future_regressors_multiplicative"] = effect
+            multiplicative += effect
+        for name, column, params in zip(self.regressor_names, self.regressor_columns, self.regressor_params):
+            components["future_regressor_" + name] = features[:, :, column] * params
+
+        out = trend + additive + trend * multiplicative
+        return out, components
+
+    def _fourier_features(self, features, i):
+        high, low = self.days_columns
+        days = features[:, :, high].astype(np.float64) + features[:, :, low].astype(np.float64)
+        resolution = self.season_resolutions[i]
+        phase = np.mod(days / self.season_periods[i], 1.0)
+        angle = 2.0 * np.pi * phase[..., np.newaxis] * np.arange(1, resolution + 1)
+        out = np.stack((np.sin(angle), np.cos(angle)), axis=-1)
+        return out.reshape(days.shape + (2 * resolution,)).astype(np.float32)
+
+    def predict(self, features, lagged=None, additive_events=None, multiplicative_events=None):
+        """Compute the forecast and components in the scale of the data, like NeuralProphet.predict.
+
+        Args:
+            see forward
+
+        Returns:
+            forecast of dims (batch, n_forecasts)
+            OrderedDict of forecast_component: value, with elements of dims (batch, n_forecasts)
+                multiplicative components are relative to the trend and not rescaled
+        """
+        if self.y_scale is None:
+            raise ValueError("Model was exported without data_params, see export.to_numpy.")
+        predicted, components = self.forward(features, lagged, additive_events, multiplicative_events)
+        predicted = predicted * self.y_scale + self.y_shift
+        multiplicative_events = set(
+            name for name, is_multiplicative in zip(self.event_names, self.event_multiplicative) if is_multiplicative
+        )
+        for name, value in components.items():
+            if "multiplicative" in name:
+                continue
+            elif name.startswith("event_") and name[len("event_") :] in multiplicative_events:
+                continue
+            elif name.startswith("season_") and self.season_multiplicative:
+                continue
+            components[name] = value * self.y_scale
+            if name == "trend":
+                components[name] += self.y_shift
+        return predicted, components
+
+    def inputs_from_df(self, df):
+        """Build the inputs of forward from a dataframe, like NeuralProphet.predict does for the TimeNet.
+
+        Args:
+            df (pd.DataFrame): original values of columns 'ds', 'y' and of the lagged regressors, regressors
+                and events, without missing dates, as passed to NeuralProphet.make_future_dataframe.
+                Other columns are ignored.
+
+        Returns:
+            features, lagged, additive_events, multiplicative_events: see forward
+        """
+        if self.data_params is None:
+            raise ValueError("Model was exported without data_params, see export.to_numpy.")
+        configs = self.input_configs
+        df = df_utils.check_dataframe(
+            df.loc[:, [name for name in df.columns if name in self.data_params]].copy(),
+            check_y=configs["n_lags"] > 0,
+            covariates=configs["covar_config"],
+            regressors=configs["regressors_config"],
+            events=configs["events_config"],
+        )
+        df = df_utils.normalize(df, self.data_params)
+        inputs, _ = tabular.tabularize_univariate_datetime(df, predict_mode=True, packed=True, **configs)
+        features = inputs["features"]
+        batch, n_forecasts = features.shape[:2]
+        events = []
+        for mode in ["additive", "multiplicative"]:
+            if ("events", mode) in self.feature_schema.features:
+                events.append(features[:, :, self.feature_schema.features[("events", mode)]])
+            else:
+                events.append(np.zeros((batch, n_forecasts, 0), dtype=np.float32))
+        return features, inputs.get("lagged"), events[0], events[1]
+
+    def predict_df(self, df):
+        """Compute the forecast and components of a dataframe, like NeuralProphet.predict.
+
+        Args:
+            df (pd.DataFrame): see inputs_from_df
+
+        Returns:
+            see predict, with one sample per forecast origin in df
+        """
+        return self.predict(*self.inputs_from_df(df))
+
+
+def _json_to_config(value):
+    # configs as written by export.to_numpy, with attribute access like the configs of NeuralProphet
+    if isinstance(value, dict):
+        return AttrDict((key, _json_to_config(item)) for key, item in value.items())
+    return value
@@ -4,7 +4,7 @@ import numpy as np
 import pandas as pd
 import logging
 import torch
-from neuralprophet import time_dataset
+from neuralprophet import tabular
 from neuralprophet.utils import set_y_as_percent
 
 log = logging.getLogger("nprophet.plotting")
@@ -363,9 +363,7 @@ def plot_lagged_weights(weights, comp_name, focus=None, ax=None, figsize=(10, 6)
 def predict_one_season(m, name, n_steps=100):
     config = m.season_config.periods[name]
     t_i = np.arange(n_steps + 1) / float(n_steps)
-    features = time_dataset.fourier_series_t(
-        t=t_i * config.period, period=config.period, series_order=config.resolution
-    )
+    features = tabular.fourier_series_t(t=t_i * config.period, period=config.period, series_order=config.resolution)
     features = torch.from_numpy(np.expand_dims(features, 1))
     predicted = m.model.seasonality(features=features, name=name)
     predicted = predicted.squeeze().detach().numpy()
@@ -376,8 +374,8 @@ def predict_one_season(m, name, n_steps=100):
 
 def predict_season_from_dates(m, dates, name):
     config = m.season_config.periods[name]
-    features = time_dataset.fourier_series(dates=dates, period=config.period, series_order=config.resolution)
-    features = torch.from_numpy(np.expand_dims(features, 1))
+    features = tabular.fourier_series(dates=dates, period=config.period, series_order=config.resolution)
+    features = torch.tensor(np.expand_dims(features, 1))
     predicted = m.model.seasonality(features=features, name=name)
     predicted = predicted.squeeze().detach().numpy()
     if m.season_config.mode == "additive":
@@ -0,0 +1,765 @@
+"""Tabularization of time series into model inputs, with NumPy only.
+
+This module does not import torch, such that the inputs of exported models can be built without it,
+see inference.NumpyNet.predict_df.
+"""
+
+from collections import OrderedDict, defaultdict
+from datetime import datetime
+import threading
+import pandas as pd
+import numpy as np
+from neuralprophet import utils
+import logging
+
+log = logging.getLogger("nprophet.tabular")
+
+
+def tabularize_univariate_datetime(
+    df,
+    season_config=None,
+    n_lags=0,
+    n_forecasts=1,
+    events_config=None,
+    country_holidays_config=None,
+    covar_config=None,
+    regressors_config=None,
+    predict_mode=False,
+    packed=False,
+    sparse_events=False,
+):
+    """Create a tabular dataset from univariate timeseries for supervised forecasting.
+
+    Note: data must be clean and have no gaps.
+
+    Args:
+        df (pd.DataFrame): Sequence of observations
+            with original 'ds', 'y' and normalized 't', 'y_scaled' columns.
+        season_config (configure.Season): configuration for seasonalities.
+        n_lags (int): number of lagged values of series to include as model inputs. Aka AR-order
+        n_forecasts (int): number of steps to forecast into future.
+        events_config (OrderedDict): user specified events, each with their
+            upper, lower windows (int) and regularization
+        country_holidays_config (OrderedDict): Configurations (holiday_names, upper, lower windows,
+            regularization) for country specific holidays
+        covar_config (OrderedDict<configure.Covar>): configuration for covariates
+        regressors_config (OrderedDict): configuration for regressors
+        predict_mode (bool): False (default) includes target values.
+            True does not include targets but includes entire dataset as input
+        packed (bool): False (default) returns each model input separately.
+            True packs all inputs into 'features' and 'lagged',
+            with the column layout of utils.feature_schema_from_configs.
+        sparse_events (bool): False (default) returns dense event features.
+            True returns the event features as SparseWindows, which are not included in packed features.
+
+    Returns:
+        inputs (OrderedDict): model inputs, each of len(df) but with varying dimensions
+            time (np.array, float), dims: (num_samples, 1)
+            seasonalities (OrderedDict), named seasonalities, each with features
+                (np.array, float) of dims: (num_samples, n_features[name])
+                or if season_config.from_time, instead
+            days (OrderedDict), days since epoch as 'high' and 'low' float32 parts, which sum to the float64 days
+                each (np.array, float) of dims: (num_samples, 1)
+            lags (np.array, float), dims: (num_samples, n_lags)
+            covariates (OrderedDict), named covariates, each with features
+                (np.array, float) of dims: (num_samples, n_lags)
+            events (OrderedDict), events, each with features
+                (np.array, float) of dims: (num_samples, n_lags)
+                or if sparse_events, each as SparseWindows
+            regressors (OrderedDict), regressors, each with features
+                (np.array, float) of dims: (num_samples, n_lags)
+            if packed, instead:
+            features (np.array, float), all per-step features, dims: (num_samples, n_forecasts, n_features)
+            lagged (np.array, float), all lagged series, dims: (num_samples, n_lags, n_lagged)
+            events (OrderedDict), only if sparse_events, as above
+        targets (np.array, float): targets to be predicted of same length as each of the model inputs,
+            dims: (num_samples, n_forecasts)
+    """
+    n_samples = len(df) - n_lags + 1 - n_forecasts
+    if n_lags == 0:
+        assert n_forecasts == 1
+
+    def _stride_time_features_for_forecasts(x):
+        # for n_lags == 0, this is equivalent to expanding x at dim=1
+        return _stride_windows(x, start=n_lags, size=n_forecasts, n_samples=n_samples)
+
+    def _stride_lagged_features(x, feature_dims):
+        # only for case where n_lags > 0
+        return _stride_windows(x, start=n_lags - feature_dims, size=feature_dims, n_samples=n_samples)
+
+    def _check_lagged_nan(series, feature_dims, name):
+        # only check the values which end up in a window
+        start = n_lags - feature_dims
+        if np.isnan(series[start : start + n_samples + feature_dims - 1]).any():
+            raise ValueError("Input lags contain NaN values in {}.".format(name))
+
+    # per-timestamp features are stored in OrderedDict, each of len(df) at dim=0
+    features = OrderedDict({})
+
+    # time is the time at each forecast step
+    t = df.loc[:, "t"].values
+    features["time"] = t
+
+    if season_config is not None and season_config.from_time:
+        # exact float64 days, as the sum of float32 high and low parts, which fit into the float32 inputs
+        days = days_since_epoch(df["ds"])
+        high = days.astype(np.float32)
+        features["days"] = OrderedDict({"high": high, "low": (days - high).astype(np.float32)})
+    elif season_config is not None:
+        features["seasonalities"] = seasonal_features_from_dates(df["ds"], season_config)
+
+    if n_lags > 0 and "y" in df.columns:
+        features["lags"] = df.loc[:, "y_scaled"].values
+        _check_lagged_nan(features["lags"], feature_dims=n_lags, name="y")
+
+    if covar_config is not None and n_lags > 0:
+        covariates = OrderedDict({})
+        for covar, configs in covar_config.items():
+            covariates[covar] = df.loc[:, covar].values
+            _check_lagged_nan(covariates[covar], feature_dims=1 if configs.as_scalar else n_lags, name=covar)
+        features["covariates"] = covariates
+
+    # get the regressors features
+    if regressors_config is not None:
+        additive_regressors, multiplicative_regressors = make_regressors_features(df, regressors_config)
+        regressors = OrderedDict({})
+        if additive_regressors is not None:
+            regressors["additive"] = additive_regressors
+        if multiplicative_regressors is not None:
+            regressors["multiplicative"] = multiplicative_regressors
+        features["regressors"] = regressors
+
+    # get the events features
+    if events_config is not None or country_holidays_config is not None:
+        additive_events, multiplicative_events = make_events_features(
+            df, events_config, country_holidays_config, sparse=sparse_events
+        )
+        events = OrderedDict({})
+        if additive_events is not None:
+            events["additive"] = additive_events
+        if multiplicative_events is not None:
+            events["multiplicative"] = multiplicative_events
+        features["events"] = events
+
+    # data is stored in OrderedDict
+    inputs = OrderedDict({})
+    if sparse_events and "events" in features:
+        # stride into num_forecast at dim=1 for each sample, just like time
+        inputs["events"] = OrderedDict({})
+        for mode, sparse_features in features.pop("events").items():
+            inputs["events"][mode] = sparse_features.window(start=n_lags, size=n_forecasts, n_samples=n_samples)
+    if packed:
+        schema = utils.feature_schema_from_configs(
+            season_config=season_config,
+            events_config=None if sparse_events else events_config,
+            country_holidays_config=None if sparse_events else country_holidays_config,
+            covar_config=covar_config,
+            regressors_config=regressors_config,
+            n_lags=n_lags,
+        )
+        packed_features = schema.pack(features)
+        # stride into num_forecast at dim=1 for each sample, all features at once
+        inputs["features"] = _stride_time_features_for_forecasts(packed_features["features"])
+        if "lagged" in packed_features:
+            # scalar covariates are sliced from the full lag window by the model
+            inputs["lagged"] = _stride_lagged_features(packed_features["lagged"], feature_dims=n_lags)
+    else:
+        for key, value in features.items():
+            if key == "lags":
+                inputs[key] = _stride_lagged_features(value, feature_dims=n_lags)
+            elif key == "covariates":
+                inputs[key] = OrderedDict({})
+                for covar, series in value.items():
+                    window = 1 if covar_config[covar].as_scalar else n_lags
+                    inputs[key][covar] = _stride_lagged_features(series, feature_dims=window)
+            elif isinstance(value, OrderedDict):
+                # stride into num_forecast at dim=1 for each sample, just like time
+                inputs[key] = OrderedDict({})
+                for name, value_features in value.items():
+                    inputs[key][name] = _stride_time_features_for_forecasts(value_features)
+            else:
+                inputs[key] = _stride_time_features_for_forecasts(value)
+
+    if predict_mode:
+        targets = _stride_time_features_for_forecasts(np.empty_like(t))
+    else:
+        targets = _stride_time_features_for_forecasts(df["y_scaled"].values)
+
+    tabularized_input_shapes_str = ""
+    for key, value in inputs.items():
+        if key in ["seasonalities", "covariates", "events", "regressors", "days"]:
+            for name, period_features in value.items():
+                tabularized_input_shapes_str += ("    {} {} {}\n").format(name, key, period_features.shape)
+        else:
+            tabularized_input_shapes_str += ("    {} {} \n").format(key, value.shape)
+    log.debug("Tabularized inputs shapes: \n{}".format(tabularized_input_shapes_str))
+
+    return inputs, targets
+
+
+def _stride_windows(x, start, size, n_samples):
+    """Create a read-only view of overlapping windows along the first dimension of x.
+
+    Window i covers x[start + i : start + i + size]. No data is copied,
+    all windows share the memory of x.
+
+    Args:
+        x (np.array): array to be windowed, dims: (len, ...)
+        start (int): position of first element of first window
+        size (int): length of each window
+        n_samples (int): number of windows
+
+    Returns:
+        windows (np.array), dims: (n_samples, size, ...)
+    """
+    x = np.asarray(x)
+    n_samples = max(n_samples, 0)
+    if n_samples > 0:
+        assert start >= 0 and start + n_samples + size - 1 <= x.shape[0]
+    return np.lib.stride_tricks.as_strided(
+        x[start:],
+        shape=(n_samples, size) + x.shape[1:],
+        strides=(x.strides[0],) + x.strides,
+        writeable=False,
+    )
+
+
+def _event_window_extents(events_config=None, country_holidays_config=None):
+    """Largest number of rows by which event features precede and follow their events.
+
+    Args:
+        events_config (OrderedDict): user specified events, each with their upper, lower windows (int)
+        country_holidays_config (OrderedDict): Configurations (holiday_names, upper, lower windows)
+            for country specific holidays
+
+    Returns:
+        lead (int): number of rows preceding an event within its lower window
+        lag (int): number of rows following an event within its upper window
+    """
+    windows = []
+    if events_config is not None:
+        windows.extend((configs.lower_window, configs.upper_window) for configs in events_config.values())
+    if country_holidays_config is not None:
+        windows.append((country_holidays_config["lower_window"], country_holidays_config["upper_window"]))
+    lead = max([-lower for lower, _ in windows] + [0])
+    lag = max([upper for _, upper in windows] + [0])
+    return lead, lag
+
+
+class FourierCache:
+    """LRU cache of Fourier feature matrices of regularly spaced dates.
+
+    Entries are keyed by (start, end, step) of the dates and the period and order of the series.
+    A lookup hits any entry with the same step, period and order whose dates cover the requested dates,
+    and returns the matching rows of its matrix as a read-only view.
+    The least recently used entries are evicted once the cached matrices exceed max_bytes.
+    Lookups and insertions are guarded by a lock, so the cache can be shared between threads.
+    """
+
+    def __init__(self, max_bytes=4 * 2**20):
+        """
+        Args:
+            max_bytes (int): maximum total size of cached matrices in bytes, 0 disables caching
+        """
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.entries = OrderedDict({})
+        self.n_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, dates, period, series_order):
+        """Get Fourier features of dates, computing and caching them if not cached.
+
+        Args:
+            dates (pd.Series): containing timestamps.
+            period (float): Number of days of the period.
+            series_order (int): Number of fourier components.
+
+        Returns:
+            Matrix with seasonality features, read-only.
+        """
+        ns = dates.values.astype("datetime64[ns]").astype(np.int64)
+        if len(ns) == 0 or self.max_bytes <= 0:
+            return _fourier_series(dates, period, series_order)
+        # a single date matches entries of any step
+        step = ns[1] - ns[0] if len(ns) > 1 else None
+        if step is not None and (step <= 0 or not (np.diff(ns) == step).all()):
+            # irregular dates can not be located in cached ranges
+            with self.lock:
+                self.misses += 1
+            return _fourier_series(dates, period, series_order)
+        start, end = ns[0], ns[-1]
+        with self.lock:
+            for key, features in self.entries.items():
+                entry_start, entry_end, entry_step, entry_period, entry_order = key
+                if (entry_period, entry_order) != (period, series_order) or step not in (None, entry_step):
+                    continue
+                if entry_start <= start and end <= entry_end and (start - entry_start) % entry_step == 0:
+                    self.hits += 1
+                    self.entries.move_to_end(key)
+                    offset = (start - entry_start) // entry_step
+                    return features[offset : offset + len(ns)]
+            self.misses += 1
+        # computed outside of the lock, a concurrent miss of the same dates computes them again
+        features = _fourier_series(dates, period, series_order)
+        features.flags.writeable = False
+        if step is None:
+            return features
+        with self.lock:
+            self._put((start, end, step, period, series_order), features)
+        return features
+
+    def _put(self, key, features):
+        # requires self.lock
+        if features.nbytes > self.max_bytes:
+            return
+        # drop entries covered by the new entry
+        for old_key in list(self.entries.keys()):
+            if old_key[2:] == key[2:] and key[0] <= old_key[0] and old_key[1] <= key[1]:
+                self.n_bytes -= self.entries.pop(old_key).nbytes
+        self.entries[key] = features
+        self.n_bytes += features.nbytes
+        while self.n_bytes > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.n_bytes -= evicted.nbytes
+            self.evictions += 1
+
+    def info(self):
+        """Statistics of the cache usage.
+
+        Returns:
+            OrderedDict with number of hits, misses, evictions, entries and total bytes of cached matrices
+        """
+        with self.lock:
+            return OrderedDict(
+                {
+                    "hits": self.hits,
+                    "misses": self.misses,
+                    "evictions": self.evictions,
+                    "entries": len(self.entries),
+                    "bytes": self.n_bytes,
+                    "max_bytes": self.max_bytes,
+                }
+            )
+
+    def clear(self):
+        """Remove all entries and reset statistics."""
+        with self.lock:
+            self.entries.clear()
+            self.n_bytes = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+
+# process-wide cache used by fourier_series, of a few years of daily seasonal features
+fourier_cache = FourierCache()
+
+
+def fourier_series(dates, period, series_order):
+    """Provides Fourier series components with the specified frequency and order.
+
+    Note: Identical to OG Prophet. Results are cached in fourier_cache.
+
+    Args:
+        dates (pd.Series): containing timestamps.
+        period (float): Number of days of the period.
+        series_order (int): Number of fourier components.
+
+    Returns:
+        Matrix with seasonality features, read-only.
+    """
+    return fourier_cache.get(dates, period, series_order)
+
+
+def _fourier_series(dates, period, series_order):
+    return fourier_series_t(days_since_epoch(dates), period, series_order)
+
+
+def days_since_epoch(dates):
+    """Time of dates as days since 1970-01-01.
+
+    Args:
+        dates (pd.Series): containing timestamps
+
+    Returns:
+        np.array, float64, as float32 can not resolve minutes over decades
+    """
+    return (dates - datetime(1970, 1, 1)).dt.total_seconds().to_numpy(dtype=np.float64) / (3600 * 24.0)
+
+
+def fourier_series_t(t, period, series_order, out=None):
+    """Provides Fourier series components with the specified frequency and order.
+
+    Note: Equivalent to OG Prophet, up to float32 precision.
+    Only the base harmonic is evaluated with sin and cos,
+    higher harmonics are derived with the angle-addition recurrence.
+
+    Args:
+        t (pd.Series, float): containing time as floating point number of days.
+        period (float): Number of days of the period.
+        series_order (int): Number of fourier components.
+        out (np.array, float32): optional preallocated output, dims: (len(t), 2 * series_order)
+
+    Returns:
+        Matrix with seasonality features, columns alternating sin and cos of each harmonic,
+            dims: (len(t), 2 * series_order)
+    """
+    t = np.asarray(t, dtype=np.float64)
+    if out is None:
+        out = np.empty((t.shape[0], 2 * series_order), dtype=np.float32)
+    assert out.shape == (t.shape[0], 2 * series_order)
+    # rows are processed in chunks which fit into the CPU cache
+    chunk_size = 2**14
+    for start in range(0, t.shape[0], chunk_size):
+        chunk = out[start : start + chunk_size]
+        # reduce time to the phase within the period before taking the angle
+        angle = 2.0 * np.pi * np.mod(t[start : start + chunk_size] / period, 1.0)
+        sin_1, cos_1 = np.sin(angle), np.cos(angle)
+        sin_k, cos_k = sin_1, cos_1
+        for k in range(series_order):
+            if k > 0:
+                # sin((k+1)x) = sin(kx)cos(x) + cos(kx)sin(x), cos((k+1)x) = cos(kx)cos(x) - sin(kx)sin(x)
+                sin_k, cos_k = sin_k * cos_1 + cos_k * sin_1, cos_k * cos_1 - sin_k * sin_1
+            chunk[:, 2 * k] = sin_k
+            chunk[:, 2 * k + 1] = cos_k
+    return out
+
+
+def make_country_specific_holidays_df(year_list, country):
+    """
+    Make dataframe of country specific holidays for given years and countries
+
+    Args:
+        year_list (list): a list of years
+        country (string): country name
+
+    Returns:
+        pd.DataFrame with 'ds' and 'holiday'.
+    """
+
+    dates, names = utils.holiday_calendar.get(country, year_list)
+    country_specific_holidays_dict = defaultdict(list)
+    for date, holiday in zip(pd.to_datetime(dates), names):
+        country_specific_holidays_dict[holiday].append(date)
+    return country_specific_holidays_dict
+
+
+def make_events_features(df, events_config=None, country_holidays_config=None, sparse=False):
+    """
+    Construct arrays of all event features
+
+    The rows at which each event occurs are located once,
+    all offset features are then scattered into the feature matrices at once.
+
+    Args:
+        df (pd.DataFrame): dataframe with all values including the user specified events (provided by user)
+        events_config (OrderedDict): user specified events, each with their
+            upper, lower windows (int), regularization
+        country_holidays_config (OrderedDict): Configurations (holiday_names, upper, lower windows, regularization)
+            for country specific holidays
+        sparse (bool): False (default) returns dense arrays.
+            True returns SparseWindows, with a window of size 1 for each row.
+
+    Returns:
+        additive_events (np.array): all additive event features (both user specified and country specific)
+        multiplicative_events (np.array): all multiplicative event features (both user specified and country specific)
+    """
+    # offset features of each mode, by name: (rows of event occurrences, event values, offset)
+    additive_events = OrderedDict({})
+    multiplicative_events = OrderedDict({})
+
+    # create all user specified events
+    if events_config is not None:
+        for event, configs in events_config.items():
+            if event not in df.columns:
+                df[event] = 0.0
+            values = df[event].values
+            rows = np.flatnonzero(values)
+            mode_events = additive_events if configs["mode"] == "additive" else multiplicative_events
+            # create lower and upper window features
+            for offset in range(configs.lower_window, configs.upper_window + 1):
+                key = utils.create_event_names_for_offsets(event, offset)
+                mode_events[key] = (rows, values[rows], offset)
+
+    # create all country specific holidays
+    if country_holidays_config is not None:
+        lw = country_holidays_config["lower_window"]
+        uw = country_holidays_config["upper_window"]
+        mode_events = additive_events if country_holidays_config["mode"] == "additive" else multiplicative_events
+        year_list = list(df["ds"].dt.year.unique())
+        country_holidays_dict = make_country_specific_holidays_df(year_list, country_holidays_config["country"])
+        holiday_rows = _holiday_rows(df["ds"], country_holidays_config["holiday_names"], country_holidays_dict)
+        for holiday in country_holidays_config["holiday_names"]:
+            rows = holiday_rows[holiday]
+            for offset in range(lw, uw + 1):
+                key = utils.create_event_names_for_offsets(holiday, offset)
+                mode_events[key] = (rows, np.ones(len(rows), dtype=np.float32), offset)
+
+    return (
+        _scatter_event_features(additive_events, len(df), sparse),
+        _scatter_event_features(multiplicative_events, len(df), sparse),
+    )
+
+
+def _holiday_rows(dates, holiday_names, country_holidays_dict):
+    """Locate the rows at which each holiday occurs.
+
+    Args:
+        dates (pd.Series): dates of all rows
+        holiday_names (iterable): names of holidays to locate
+        country_holidays_dict (dict): dates of each holiday, as from make_country_specific_holidays_df
+
+    Returns:
+        rows (dict): sorted rows (np.array, int) at which each holiday occurs
+    """
+    dates = pd.Index(dates)
+    holiday_dates = [pd.DatetimeIndex(country_holidays_dict.get(holiday, [])) for holiday in holiday_names]
+    rows = {}
+    if len(holiday_dates) == 0:
+        return rows
+    if not dates.is_unique:
+        for holiday, hdates in zip(holiday_names, holiday_dates):
+            rows[holiday] = np.flatnonzero(dates.isin(hdates))
+        return rows
+    # look up the dates of all holidays at once
+    positions = dates.get_indexer(pd.DatetimeIndex(np.concatenate([hdates.values for hdates in holiday_dates])))
+    splits = np.cumsum([len(hdates) for hdates in holiday_dates])[:-1]
+    for holiday, holiday_positions in zip(holiday_names, np.split(positions, splits)):
+        rows[holiday] = np.unique(holiday_positions[holiday_positions >= 0])
+    return rows
+
+
+def _scatter_event_features(events, length, sparse=False):
+    """Scatter offset event features into one matrix, with columns sorted by name.
+
+    Args:
+        events (OrderedDict): offset features by name, each a tuple of
+            rows (np.array, int) at which the event occurs, values (np.array, float) of the event at these rows
+            and offset (int) by which the event is shifted
+        length (int): number of rows of the feature matrix
+        sparse (bool): whether to return the matrix as SparseWindows, with a window of size 1 for each row
+
+    Returns:
+        features (np.array, float): dims (length, len(events)), None if no events
+    """
+    if len(events) == 0:
+        return None
+    rows, columns, values = [], [], []
+    # Make sure column order is consistent
+    for column, key in enumerate(sorted(events.keys())):
+        event_rows, event_values, offset = events[key]
+        shifted = event_rows + offset
+        valid = (shifted >= 0) & (shifted < length)
+        rows.append(shifted[valid])
+        columns.append(np.full(np.count_nonzero(valid), column))
+        values.append(event_values[valid])
+    rows, columns = np.concatenate(rows), np.concatenate(columns)
+    values = np.concatenate(values).astype(np.float32, copy=False)
+    if sparse:
+        return SparseWindows.from_coo(rows, columns, values, shape=(length, len(events)))
+    features = np.zeros((length, len(events)), dtype=np.float32)
+    features[rows, columns] = values
+    return features
+
+
+class SparseWindows:
+    """Overlapping windows on sparse per-timestamp features.
+
+    The features are stored in compressed sparse row format, with one row per timestamp.
+    Thus, memory scales with the number of nonzero features rather than with the number of windows and columns.
+    Window i covers rows start + i to start + i + size - 1.
+    """
+
+    def __init__(self, row_ptr, columns, values, n_columns, start=0, size=1, n_samples=None):
+        """
+        Args:
+            row_ptr (np.array, int): position of first nonzero feature of each row in columns and values,
+                dims: (n_rows + 1)
+            columns (np.array, int): column of each nonzero feature, dims: (nnz)
+            values (np.array, float): value of each nonzero feature, dims: (nnz)
+            n_columns (int): number of feature columns
+            start (int): row of first element of first window
+            size (int): number of rows in each window
+            n_samples (int): number of windows
+                default: None, as many windows as fit into the rows
+        """
+        self.row_ptr = row_ptr
+        self.columns = columns
+        self.values = values
+        self.n_columns = n_columns
+        self.start = start
+        self.size = size
+        if n_samples is None:
+            n_samples = len(row_ptr) - 1 - start - size + 1
+        self.n_samples = max(n_samples, 0)
+        if self.n_samples > 0:
+            assert start >= 0 and start + self.n_samples + size - 1 <= len(row_ptr) - 1
+
+    @classmethod
+    def from_coo(cls, rows, columns, values, shape):
+        """Create from nonzero features in coordinate format, with a window of size 1 for each row.
+
+        Args:
+            rows (np.array, int): row of each nonzero feature
+            columns (np.array, int): column of each nonzero feature
+            values (np.array, float): value of each nonzero feature
+            shape (tuple): number of rows and columns
+
+        Returns:
+            SparseWindows
+        """
+        order = np.lexsort((columns, rows))
+        row_ptr = np.concatenate([[0], np.cumsum(np.bincount(rows, minlength=shape[0]))])
+        return cls(row_ptr, columns[order], values[order], n_columns=shape[1])
+
+    @classmethod
+    def from_dense(cls, x):
+        """Create from dense features, with a window of size 1 for each row.
+
+        Args:
+            x (np.array, float): features, dims: (n_rows, n_columns)
+
+        Returns:
+            SparseWindows
+        """
+        rows, columns = np.nonzero(x)
+        return cls.from_coo(rows, columns, x[rows, columns], shape=x.shape)
+
+    def window(self, start, size, n_samples):
+        """Create windows on the same rows.
+
+        Args:
+            start (int): row of first element of first window, relative to the rows of windows of size 1
+            size (int): number of rows in each window
+            n_samples (int): number of windows
+
+        Returns:
+            SparseWindows, sharing memory with self
+        """
+        return SparseWindows(
+            self.row_ptr, self.columns, self.values, self.n_columns, start=start, size=size, n_samples=n_samples
+        )
+
+    @property
+    def shape(self):
+        return (self.n_samples, self.size, self.n_columns)
+
+    def __len__(self):
+        return self.n_samples
+
+    def gather(self, index):
+        """Gather the nonzero features of windows in coordinate format.
+
+        Args:
+            index (int, np.array): window location, or batch of window locations
+
+        Returns:
+            indices (np.array, int): position of each nonzero feature, dims: (index.ndim + 2, nnz)
+            values (np.array, float): value of each nonzero feature, dims: (nnz)
+            shape (tuple): (size, n_columns) or (batch, size, n_columns)
+        """
+        index = np.asarray(index)
+        rows = np.expand_dims(index, -1) + self.start + np.arange(self.size)
+        row_start = self.row_ptr[rows].ravel()
+        counts = self.row_ptr[rows + 1].ravel() - row_start
+        # position of each gathered feature in the flattened (batch, size) windows
+        positions = np.repeat(np.arange(len(counts)), counts)
+        source = np.arange(len(positions)) + np.repeat(row_start - (np.cumsum(counts) - counts), counts)
+        indices = np.stack(np.unravel_index(positions, rows.shape) + (self.columns[source],))
+        return indices, np.ascontiguousarray(self.values[source]), rows.shape + (self.n_columns,)
+
+    def __getitem__(self, index):
+        """Gather the nonzero features of windows.
+
+        Args:
+            index (int, torch tensor): window location, or batch of window locations
+
+        Returns:
+            sparse torch tensor, dims: (size, n_columns) or (batch, size, n_columns)
+        """
+        # imported on first use, such that dense features can be tabularized without torch
+        import torch
+
+        indices, values, shape = self.gather(index)
+        return torch.sparse_coo_tensor(torch.from_numpy(indices), torch.from_numpy(values), size=shape)
+
+    def to_dense(self):
+        """Dense windows.
+
+        Returns:
+            windows (np.array, float), dims: (n_samples, size, n_columns)
+        """
+        indices, values, shape = self.gather(np.arange(self.n_samples))
+        windows = np.zeros(shape, dtype=self.values.dtype)
+        windows[tuple(indices)] = values
+        return windows
+
+
+def make_regressors_features(df, regressors_config):
+    """Construct arrays of all scalar regressor features
+
+    Args:
+        df (pd.DataFrame): dataframe with all values including the user specified regressors
+        regressors_config (OrderedDict): user specified regressors config
+
+    Returns:
+        additive_regressors (np.array): all additive regressor features
+        multiplicative_regressors (np.array): all multiplicative regressor features
+
+    """
+    additive_regressors = pd.DataFrame()
+    multiplicative_regressors = pd.DataFrame()
+
+    for reg in df.columns:
+        if reg in regressors_config:
+            mode = regressors_config[reg]["mode"]
+            if mode == "additive":
+                additive_regressors[reg] = df[reg]
+            else:
+                multiplicative_regressors[reg] = df[reg]
+
+    if not additive_regressors.empty:
+        additive_regressors = additive_regressors[sorted(additive_regressors.columns.tolist())]
+        additive_regressors = additive_regressors.values
+    else:
+        additive_regressors = None
+    if not multiplicative_regressors.empty:
+        multiplicative_regressors = multiplicative_regressors[sorted(multiplicative_regressors.columns.tolist())]
+        multiplicative_regressors = multiplicative_regressors.values
+    else:
+        multiplicative_regressors = None
+
+    return additive_regressors, multiplicative_regressors
+
+
+def seasonal_features_from_dates(dates, season_config):
+    """Dataframe with seasonality features.
+
+    Includes seasonality features, holiday features, and added regressors.
+
+    Args:
+        dates (pd.Series): with dates for computing seasonality features
+        season_config (Season): configuration from NeuralProphet
+
+    Returns:
+         Dictionary with keys for each period name containing an np.array with the respective regression features.
+            each with dims: (len(dates), 2*fourier_order)
+    """
+    assert len(dates.shape) == 1
+    seasonalities = OrderedDict({})
+    # Seasonality features
+    for name, period in season_config.periods.items():
+        if period.resolution > 0:
+            if season_config.computation == "fourier":
+                features = fourier_series(
+                    dates=dates,
+                    period=period.period,
+                    series_order=period.resolution,
+                )
+            else:
+                raise NotImplementedError
+            seasonalities[name] = features
+    return seasonalities
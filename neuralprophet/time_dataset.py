@@ -1,14 +1,20 @@
 from collections import OrderedDict
-from datetime import datetime
+import dataclasses
+import hashlib
+import json
+import os
+import shutil
+import tempfile
 import pandas as pd
 import numpy as np
 import torch
+from torch.utils.data import DataLoader
 from torch.utils.data.dataset import Dataset
-from neuralprophet import hdays as hdays_part2
-import holidays as hdays_part1
-from collections import defaultdict
+from torch.utils.data.sampler import Sampler
 from neuralprophet import utils
+from neuralprophet.tabular import tabularize_univariate_datetime, SparseWindows, _stride_windows, _event_window_extents
 import logging
+import warnings
 
 log = logging.getLogger("nprophet.time_dataset")
 
@@ -16,18 +22,50 @@ log = logging.getLogger("nprophet.time_dataset")
 class TimeDataset(Dataset):
     """Create a PyTorch dataset of a tabularized time-series"""
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, df, lazy=False, cache_dir=None, dedup_steps=False, **kwargs):
         """Initialize Timedataset from time-series df.
 
         Args:
-            *args (): identical to tabularize_univariate_datetime
+            df (pd.DataFrame): identical to tabularize_univariate_datetime
+            lazy (bool): False (default) materializes all sample windows as tensors.
+                True keeps only the per-timestamp feature arrays and
+                slices the sample windows from them when a sample is requested.
+            cache_dir (str): directory of the on-disk cache of tabularized datasets, see tabularize_cached.
+                default: None, tabularizes without caching.
+                If set, the dataset is lazy and reads its windows from memory-mapped files.
+            dedup_steps (bool): False (default) returns the per-step features of each sample.
+                True, only with packed=True, stores the per-step features once per timestamp and returns the
+                features of the unique timestamps of a batch together with 'steps', the index of the
+                timestamp of each step of each sample. The model evaluates them once per timestamp.
             **kwargs (): identical to tabularize_univariate_datetime
         """
         self.length = None
         self.inputs = None
         self.targets = None
-        self.two_level_inputs = ["seasonalities", "covariates"]
-        inputs, targets = tabularize_univariate_datetime(*args, **kwargs)
+        self.lazy = lazy or cache_dir is not None
+        self.dedup_steps = dedup_steps
+        self.two_level_inputs = ["seasonalities", "covariates", "days"]
+        self.inputs_dtype = {
+            "time": torch.float,
+            "days": torch.float,
+            # "changepoints": torch.bool,
+            "seasonalities": torch.float,
+            "events": torch.float,
+            "lags": torch.float,
+            "covariates": torch.float,
+            "regressors": torch.float,
+            "features": torch.float,
+            "lagged": torch.float,
+        }
+        self.targets_dtype = torch.float
+        # kept to tabularize appended observations, see append
+        self.tabularize_kwargs = kwargs
+        self.n_rows = len(df)
+        self.df_tail = df.iloc[-self._n_context_rows() :].reset_index(drop=True)
+        if cache_dir is not None:
+            inputs, targets = tabularize_cached(cache_dir, df, **kwargs)
+        else:
+            inputs, targets = tabularize_univariate_datetime(df, **kwargs)
         self.init_after_tabularized(inputs, targets)
 
     def init_after_tabularized(self, inputs, targets=None):
@@ -37,33 +75,173 @@ class TimeDataset(Dataset):
             inputs (ordered dict): identical to returns from tabularize_univariate_datetime
             targets (np.array, float): identical to returns from tabularize_univariate_datetime
         """
-        inputs_dtype = {
-            "time": torch.float,
-            # "changepoints": torch.bool,
-            "seasonalities": torch.float,
-            "events": torch.float,
-            "lags": torch.float,
-            "covariates": torch.float,
-            "regressors": torch.float,
+        self.length = inputs["features" if "features" in inputs else "time"].shape[0]
+        # per-timestamp arrays of each input, from which the windows are created, by (key, name)
+        self.sources = OrderedDict({})
+        for key, data in inputs.items():
+            if isinstance(data, OrderedDict):
+                for name, features in data.items():
+                    self.sources[(key, name)] = self._make_source(key, features)
+            else:
+                self.sources[(key, None)] = self._make_source(key, data)
+        self.sources[("targets", None)] = self._make_source("targets", targets)
+        self._init_tensors()
+
+    def _make_source(self, key, windows):
+        """Keep the per-timestamp array spanned by windows, in growable storage.
+
+        Args:
+            key (str): input key, or 'targets'
+            windows (np.array, SparseWindows): windows as returned from tabularize_univariate_datetime
+
+        Returns:
+            source (dict): growable arrays, window size and row of the first window in the dataframe.
+                Unless lazy, also the materialized windows.
+        """
+        if isinstance(windows, SparseWindows):
+            source = {
+                "row_ptr": _GrowableArray(windows.row_ptr),
+                "columns": _GrowableArray(windows.columns),
+                "values": _GrowableArray(windows.values),
+                "sparse": windows,
+            }
+            return source
+        size = windows.shape[1]
+        lagged = key in ["lags", "lagged", "covariates"]
+        n_lags = self.tabularize_kwargs.get("n_lags", 0)
+        source = {
+            "base": _GrowableArray(_unstride_windows(windows)),
+            "start": n_lags - size if lagged else n_lags,
+            "size": size,
         }
-        targets_dtype = torch.float
-        self.length = inputs["time"].shape[0]
+        if not self.lazy and not (self.dedup_steps and key == "features"):
+            source["windows"] = _GrowableArray(self._materialize(key, windows))
+        return source
+
+    def _materialize(self, key, windows):
+        dtype = self.targets_dtype if key == "targets" else self.inputs_dtype[key]
+        return torch.tensor(windows, dtype=dtype).numpy()
 
+    def _init_tensors(self):
+        """Create the inputs and targets tensors from the sources."""
         self.inputs = OrderedDict({})
-        for key, data in inputs.items():
-            if key in self.two_level_inputs or key == "events" or key == "regressors":
-                self.inputs[key] = OrderedDict({})
-                for name, features in data.items():
-                    self.inputs[key][name] = torch.from_numpy(features).type(inputs_dtype[key])
+        for (key, name), source in self.sources.items():
+            if "sparse" in source:
+                # gathered into sparse tensors when samples are requested
+                tensor = source["sparse"]
+            elif "windows" not in source:
+                # converted to dtype when samples are requested
+                windows = _stride_windows(source["base"].array, start=0, size=source["size"], n_samples=self.length)
+                with warnings.catch_warnings():
+                    # windows are read-only views, they are never written to.
+                    warnings.simplefilter("ignore", category=UserWarning)
+                    tensor = torch.from_numpy(windows)
+            else:
+                tensor = torch.from_numpy(source["windows"].array)
+            if key == "targets":
+                self.targets = tensor
+            elif name is None:
+                self.inputs[key] = tensor
             else:
-                self.inputs[key] = torch.from_numpy(data).type(inputs_dtype[key])
-        self.targets = torch.from_numpy(targets).type(targets_dtype)
+                self.inputs.setdefault(key, OrderedDict({}))[name] = tensor
+
+    def _n_context_rows(self):
+        """Number of last rows of the dataframe needed to tabularize appended observations."""
+        lead, lag = _event_window_extents(
+            self.tabularize_kwargs.get("events_config"), self.tabularize_kwargs.get("country_holidays_config")
+        )
+        return self.tabularize_kwargs.get("n_lags", 0) + self.tabularize_kwargs.get("n_forecasts", 1) + lead + lag
+
+    def append(self, df):
+        """Extend the dataset with the samples of observations appended to its time series.
+
+        Only the appended rows are tabularized, together with the last rows of the series needed for
+        their lags and event windows. The new per-timestamp features are appended to the arrays
+        of the dataset, which grow with spare capacity. Thus, the cost is proportional to the number of
+        appended rows, except for a one-time copy of arrays which are shared with the original dataframe
+        or memory-mapped from a cache.
+        Rows preceding the appended rows within the lower window of an event are updated.
+
+        Args:
+            df (pd.DataFrame): observations directly following the series of the dataset,
+                with the same original and normalized columns.
+        """
+        if len(df) == 0:
+            return
+        lead, _ = _event_window_extents(
+            self.tabularize_kwargs.get("events_config"), self.tabularize_kwargs.get("country_holidays_config")
+        )
+        context = pd.concat([self.df_tail, df], ignore_index=True)
+        # row of the first context row in the series
+        offset = self.n_rows - len(self.df_tail)
+        # the features of earlier rows are not affected by the new rows
+        first_changed = max(self.n_rows - lead, 0)
+        inputs, targets = tabularize_univariate_datetime(context, **self.tabularize_kwargs)
+        self.n_rows += len(df)
+        n_lags, n_forecasts = self.tabularize_kwargs.get("n_lags", 0), self.tabularize_kwargs.get("n_forecasts", 1)
+        self.length = max(self.n_rows - n_lags + 1 - n_forecasts, 0)
+        self.df_tail = context.iloc[-self._n_context_rows() :].reset_index(drop=True)
+        for key, name in self.sources.keys():
+            if key == "targets":
+                windows = targets
+            else:
+                windows = inputs[key] if name is None else inputs[key][name]
+            self._append_to_source(key, self.sources[(key, name)], windows, offset, first_changed)
+        self._init_tensors()
+
+    def _append_to_source(self, key, source, windows, offset, first_changed):
+        """Replace the rows of a source from first_changed on by the rows of windows on the context.
+
+        Args:
+            key (str): input key, or 'targets'
+            source (dict): as from _make_source
+            windows (np.array, SparseWindows): windows tabularized from the context rows
+            offset (int): row of the first context row in the series
+            first_changed (int): first row of the series whose features changed
+        """
+        if "sparse" in source:
+            # the compressed rows cover the whole series
+            row_ptr, columns, values = source["row_ptr"], source["columns"], source["values"]
+            nnz = row_ptr.array[first_changed]
+            for part in [row_ptr, columns, values]:
+                part.truncate(first_changed + 1 if part is row_ptr else nnz)
+            context_start = windows.row_ptr[first_changed - offset]
+            row_ptr.extend(windows.row_ptr[first_changed - offset + 1 :] - context_start + nnz)
+            columns.extend(windows.columns[context_start:])
+            values.extend(windows.values[context_start:])
+            source["sparse"] = SparseWindows(
+                row_ptr.array,
+                columns.array,
+                values.array,
+                windows.n_columns,
+                start=windows.start,
+                size=windows.size,
+                n_samples=self.length,
+            )
+            return
+        base, start, size = source["base"], source["start"], source["size"]
+        # rows of the series before row were already tabularized and are unchanged
+        row = max(min(start + len(base), first_changed), start)
+        base.truncate(row - start)
+        base.extend(_unstride_windows(windows)[row - offset - start :])
+        if "windows" in source:
+            # re-materialize all windows containing a new or changed row
+            first_window = max(row - start - size + 1, 0)
+            source["windows"].truncate(first_window)
+            source["windows"].extend(
+                self._materialize(
+                    key, _stride_windows(base.array, first_window, size, n_samples=self.length - first_window)
+                )
+            )
 
     def __getitem__(self, index):
         """Overrides parent class method to get an item at index.
 
+        A whole batch can be fetched at once by passing a tensor of indices,
+        in which case each returned tensor has an additional leading batch dimension.
+
         Args:
-            index (int): sample location in dataset
+            index (int, torch tensor): sample location in dataset, or batch of sample locations
 
         Returns:
             sample (OrderedDict): model inputs
@@ -75,404 +253,374 @@ class TimeDataset(Dataset):
                     (np.array, float) of dims: (n_lags)
                 events (OrderedDict), all events both additive and multiplicative,
                     each with features (np.array, float) of dims: (n_lags)
+                    sparse torch tensors, if tabularized with sparse_events
                 regressors (OrderedDict), all regressors both additive and multiplicative,
                     each with features (np.array, float) of dims: (n_lags)
+                if packed, instead features, lagged and sparse events, see tabularize_univariate_datetime.
+                if dedup_steps, features of dims (n_unique, n_features) and steps, see _gather_steps.
             targets (torch tensor, float): targets to be predicted, dims: (n_forecasts)
         """
-        # Future TODO: vectorize
         sample = OrderedDict({})
         for key, data in self.inputs.items():
             if key in self.two_level_inputs:
                 sample[key] = OrderedDict({})
                 for name, period_features in self.inputs[key].items():
-                    sample[key][name] = period_features[index]
+                    sample[key][name] = period_features[index].type(self.inputs_dtype[key])
             elif key == "events" or key == "regressors":
                 sample[key] = OrderedDict({})
                 for mode, features in self.inputs[key].items():
-                    sample[key][mode] = features[index, :, :]
+                    if isinstance(features, SparseWindows):
+                        sample[key][mode] = features[index].type(self.inputs_dtype[key])
+                    else:
+                        sample[key][mode] = features[index, :, :].type(self.inputs_dtype[key])
+            elif key == "features" and self.dedup_steps:
+                sample["features"], sample["steps"] = self._gather_steps(index)
             else:
-                sample[key] = data[index]
-        targets = self.targets[index]
+                sample[key] = data[index].type(self.inputs_dtype[key])
+        targets = self.targets[index].type(self.targets_dtype)
         return sample, targets
 
+    def _gather_steps(self, index):
+        """Gather the per-step features of the unique timestamps of samples.
+
+        Args:
+            index (int, torch tensor): sample location in dataset, or batch of sample locations
+
+        Returns:
+            features (torch tensor, float), dims: (n_unique, n_features)
+            steps (torch tensor, long): row in features of each step of each sample
+                dims: (batch, n_forecasts), or (n_forecasts) for a single sample
+        """
+        source = self.sources[("features", None)]
+        # sample i covers the timestamps i to i + n_forecasts - 1 of the per-step features
+        positions = torch.unsqueeze(torch.as_tensor(index), dim=-1) + torch.arange(source["size"])
+        unique, steps = torch.unique(positions, return_inverse=True)
+        features = torch.from_numpy(source["base"].array[unique.numpy()])
+        return features.type(self.inputs_dtype["features"]), steps
+
+    def pop_lagged(self):
+        """Stop returning the packed lagged inputs with the samples, only with packed=True.
+
+        Used to compute the lagged components from the series instead of the windows of each sample,
+        see TimeNet.lagged_linear_components.
+
+        Returns:
+            lagged (np.array, float): all lagged series, one row per timestamp
+                dims: (len(self) + n_lags - 1, n_lagged), sample i has the lags of the rows i to i + n_lags - 1
+        """
+        if "lagged" not in self.inputs:
+            raise ValueError("Dataset has no packed lagged inputs.")
+        self.inputs.pop("lagged")
+        return self.sources[("lagged", None)]["base"].array
+
     def __len__(self):
         """Overrides Parent class method to get data length."""
         return self.length
 
 
-def tabularize_univariate_datetime(
-    df,
-    season_config=None,
-    n_lags=0,
-    n_forecasts=1,
-    events_config=None,
-    country_holidays_config=None,
-    covar_config=None,
-    regressors_config=None,
-    predict_mode=False,
-):
-    """Create a tabular dataset from univariate timeseries for supervised forecasting.
+class BatchSampler(Sampler):
+    """Samples batches of indices, each to be gathered at once from a TimeDataset."""
+
+    def __init__(self, n_samples, batch_size, shuffle=False, drop_last=False):
+        """
+        Args:
+            n_samples (int): number of samples in dataset
+            batch_size (int): number of samples per batch
+            shuffle (bool): whether to reshuffle the samples at every epoch
+            drop_last (bool): whether to drop the last batch if it is incomplete
+        """
+        self.n_samples = n_samples
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.drop_last = drop_last
+
+    def __iter__(self):
+        if self.shuffle:
+            indices = torch.randperm(self.n_samples)
+        else:
+            indices = torch.arange(self.n_samples)
+        for batch in torch.split(indices, self.batch_size):
+            if self.drop_last and len(batch) < self.batch_size:
+                break
+            yield batch
+
+    def __len__(self):
+        if self.drop_last:
+            return self.n_samples // self.batch_size
+        return (self.n_samples + self.batch_size - 1) // self.batch_size
+
 
-    Note: data must be clean and have no gaps.
+def make_loader(dataset, batch_size, shuffle=False, drop_last=False):
+    """Create a DataLoader which fetches each batch from the dataset with a single indexing operation.
 
     Args:
-        df (pd.DataFrame): Sequence of observations
-            with original 'ds', 'y' and normalized 't', 'y_scaled' columns.
-        season_config (configure.Season): configuration for seasonalities.
-        n_lags (int): number of lagged values of series to include as model inputs. Aka AR-order
-        n_forecasts (int): number of steps to forecast into future.
-        events_config (OrderedDict): user specified events, each with their
-            upper, lower windows (int) and regularization
-        country_holidays_config (OrderedDict): Configurations (holiday_names, upper, lower windows,
-            regularization) for country specific holidays
-        covar_config (OrderedDict<configure.Covar>): configuration for covariates
-        regressors_config (OrderedDict): configuration for regressors
-        predict_mode (bool): False (default) includes target values.
-            True does not include targets but includes entire dataset as input
+        dataset (TimeDataset): dataset supporting indexing by a tensor of indices
+        batch_size (int): number of samples per batch
+        shuffle (bool): whether to reshuffle the samples at every epoch
+        drop_last (bool): whether to drop the last batch if it is incomplete
 
     Returns:
-        inputs (OrderedDict): model inputs, each of len(df) but with varying dimensions
-            time (np.array, float), dims: (num_samples, 1)
-            seasonalities (OrderedDict), named seasonalities, each with features
-                (np.array, float) of dims: (num_samples, n_features[name])
-            lags (np.array, float), dims: (num_samples, n_lags)
-            covariates (OrderedDict), named covariates, each with features
-                (np.array, float) of dims: (num_samples, n_lags)
-            events (OrderedDict), events, each with features
-                (np.array, float) of dims: (num_samples, n_lags)
-            regressors (OrderedDict), regressors, each with features
-                (np.array, float) of dims: (num_samples, n_lags)
-        targets (np.array, float): targets to be predicted of same length as each of the model inputs,
-            dims: (num_samples, n_forecasts)
+        torch DataLoader, yielding (inputs, targets) batches
     """
-    n_samples = len(df) - n_lags + 1 - n_forecasts
-    # data is stored in OrderedDict
-    inputs = OrderedDict({})
+    sampler = BatchSampler(len(dataset), batch_size=batch_size, shuffle=shuffle, drop_last=drop_last)
+    # batch_size=None disables automatic batching: the dataset returns complete batches.
+    return DataLoader(dataset, batch_size=None, sampler=sampler)
 
-    def _stride_time_features_for_forecasts(x):
-        # only for case where n_lags > 0
-        return np.array([x[n_lags + i : n_lags + i + n_forecasts] for i in range(n_samples)])
 
-    # time is the time at each forecast step
-    t = df.loc[:, "t"].values
-    if n_lags == 0:
-        assert n_forecasts == 1
-        time = np.expand_dims(t, 1)
-    else:
-        time = _stride_time_features_for_forecasts(t)
-    inputs["time"] = time
-
-    if season_config is not None:
-        seasonalities = seasonal_features_from_dates(df["ds"], season_config)
-        for name, features in seasonalities.items():
-            if n_lags == 0:
-                seasonalities[name] = np.expand_dims(features, axis=1)
-            else:
-                # stride into num_forecast at dim=1 for each sample, just like we did with time
-                seasonalities[name] = _stride_time_features_for_forecasts(features)
-        inputs["seasonalities"] = seasonalities
-
-    def _stride_lagged_features(df_col_name, feature_dims):
-        # only for case where n_lags > 0
-        series = df.loc[:, df_col_name].values
-        return np.array([series[i + n_lags - feature_dims : i + n_lags] for i in range(n_samples)])
-
-    if n_lags > 0 and "y" in df.columns:
-        inputs["lags"] = _stride_lagged_features(df_col_name="y_scaled", feature_dims=n_lags)
-        if np.isnan(inputs["lags"]).any():
-            raise ValueError("Input lags contain NaN values in y.")
-
-    if covar_config is not None and n_lags > 0:
-        covariates = OrderedDict({})
-        for covar in df.columns:
-            if covar in covar_config:
-                assert n_lags > 0
-                window = n_lags
-                if covar_config[covar].as_scalar:
-                    window = 1
-                covariates[covar] = _stride_lagged_features(df_col_name=covar, feature_dims=window)
-                if np.isnan(covariates[covar]).any():
-                    raise ValueError("Input lags contain NaN values in ", covar)
-
-        inputs["covariates"] = covariates
-
-    # get the regressors features
-    if regressors_config is not None:
-        additive_regressors, multiplicative_regressors = make_regressors_features(df, regressors_config)
-
-        regressors = OrderedDict({})
-        if n_lags == 0:
-            if additive_regressors is not None:
-                regressors["additive"] = np.expand_dims(additive_regressors, axis=1)
-            if multiplicative_regressors is not None:
-                regressors["multiplicative"] = np.expand_dims(multiplicative_regressors, axis=1)
-        else:
-            if additive_regressors is not None:
-                additive_regressor_feature_windows = []
-                for i in range(0, additive_regressors.shape[1]):
-                    # stride into num_forecast at dim=1 for each sample, just like we did with time
-                    additive_regressor_feature_windows.append(
-                        _stride_time_features_for_forecasts(additive_regressors[:, i])
-                    )
-                additive_regressors = np.dstack(additive_regressor_feature_windows)
-                regressors["additive"] = additive_regressors
-
-            if multiplicative_regressors is not None:
-                multiplicative_regressor_feature_windows = []
-                for i in range(0, multiplicative_regressors.shape[1]):
-                    # stride into num_forecast at dim=1 for each sample, just like we did with time
-                    multiplicative_regressor_feature_windows.append(
-                        _stride_time_features_for_forecasts(multiplicative_regressors[:, i])
-                    )
-                multiplicative_regressors = np.dstack(multiplicative_regressor_feature_windows)
-                regressors["multiplicative"] = multiplicative_regressors
-
-        inputs["regressors"] = regressors
-
-    # get the events features
-    if events_config is not None or country_holidays_config is not None:
-        additive_events, multiplicative_events = make_events_features(df, events_config, country_holidays_config)
-
-        events = OrderedDict({})
-        if n_lags == 0:
-            if additive_events is not None:
-                events["additive"] = np.expand_dims(additive_events, axis=1)
-            if multiplicative_events is not None:
-                events["multiplicative"] = np.expand_dims(multiplicative_events, axis=1)
-        else:
-            if additive_events is not None:
-                additive_event_feature_windows = []
-                for i in range(0, additive_events.shape[1]):
-                    # stride into num_forecast at dim=1 for each sample, just like we did with time
-                    additive_event_feature_windows.append(_stride_time_features_for_forecasts(additive_events[:, i]))
-                additive_events = np.dstack(additive_event_feature_windows)
-                events["additive"] = additive_events
-
-            if multiplicative_events is not None:
-                multiplicative_event_feature_windows = []
-                for i in range(0, multiplicative_events.shape[1]):
-                    # stride into num_forecast at dim=1 for each sample, just like we did with time
-                    multiplicative_event_feature_windows.append(
-                        _stride_time_features_for_forecasts(multiplicative_events[:, i])
-                    )
-                multiplicative_events = np.dstack(multiplicative_event_feature_windows)
-                events["multiplicative"] = multiplicative_events
-
-        inputs["events"] = events
-
-    if predict_mode:
-        targets = np.empty_like(time)
-    else:
-        targets = _stride_time_features_for_forecasts(df["y_scaled"].values)
+class _GrowableArray:
+    """Array with spare capacity along the first dimension, to which rows are appended in place.
 
-    tabularized_input_shapes_str = ""
-    for key, value in inputs.items():
-        if key in ["seasonalities", "covariates", "events", "regressors"]:
-            for name, period_features in value.items():
-                tabularized_input_shapes_str += ("    {} {} {}\n").format(name, key, period_features.shape)
-        else:
-            tabularized_input_shapes_str += ("    {} {} \n").format(key, value.shape)
-    log.debug("Tabularized inputs shapes: \n{}".format(tabularized_input_shapes_str))
+    The capacity is doubled when exceeded, thus appending costs amortized constant time per row.
+    The initial array is never written to, it is copied into owned storage on the first modification.
+    """
 
-    return inputs, targets
+    def __init__(self, array):
+        """
+        Args:
+            array (np.array): initial rows
+        """
+        self.buffer = array
+        self.length = array.shape[0]
+        self.owned = False
 
+    @property
+    def array(self):
+        """View of the valid rows."""
+        return self.buffer[: self.length]
 
-def fourier_series(dates, period, series_order):
-    """Provides Fourier series components with the specified frequency and order.
+    def __len__(self):
+        return self.length
 
-    Note: Identical to OG Prophet.
+    def truncate(self, length):
+        """Drop all rows from position length on.
 
-    Args:
-        dates (pd.Series): containing timestamps.
-        period (float): Number of days of the period.
-        series_order (int): Number of fourier components.
+        Args:
+            length (int): number of rows to keep
+        """
+        assert 0 <= length <= self.length
+        self.length = length
 
-    Returns:
-        Matrix with seasonality features.
-    """
-    # convert to days since epoch
-    t = np.array((dates - datetime(1970, 1, 1)).dt.total_seconds().astype(np.float)) / (3600 * 24.0)
-    return fourier_series_t(t, period, series_order)
+    def extend(self, rows):
+        """Append rows.
+
+        Args:
+            rows (np.array): rows with the same trailing dimensions, dims: (n_rows, ...)
+        """
+        needed = self.length + rows.shape[0]
+        if not self.owned or needed > self.buffer.shape[0]:
+            capacity = max(needed, 2 * self.buffer.shape[0])
+            buffer = np.empty((capacity,) + self.buffer.shape[1:], dtype=self.buffer.dtype)
+            buffer[: self.length] = self.buffer[: self.length]
+            self.buffer = buffer
+            self.owned = True
+        self.buffer[self.length : needed] = rows
+        self.length = needed
+
+
+CACHE_FORMAT_VERSION = 1
+# entries kept in a cache directory, the least recently used entries beyond are removed
+CACHE_MAX_ENTRIES = 8
 
 
-def fourier_series_t(t, period, series_order):
-    """Provides Fourier series components with the specified frequency and order.
+def tabularize_cached(cache_dir, *args, max_entries=CACHE_MAX_ENTRIES, **kwargs):
+    """Tabularize a dataset, reusing previously tabularized arrays from an on-disk cache.
 
-    Note: Identical to OG Prophet.
+    Each cache entry is a subdirectory of cache_dir, named by the fingerprint of the
+    normalized dataframe and all tabularization arguments.
+    Windowed arrays are stored as their underlying per-timestamp arrays in .npy files,
+    which are memory-mapped and re-strided into windows when loaded.
+    Thus, no data is read into memory until the windows are accessed.
+    After writing an entry, the least recently used entries beyond max_entries are removed, see prune_cache.
 
     Args:
-        t (pd.Series, float): containing time as floating point number of days.
-        period (float): Number of days of the period.
-        series_order (int): Number of fourier components.
+        cache_dir (str): directory containing the cache entries, created if missing
+        *args (): identical to tabularize_univariate_datetime
+        max_entries (int): maximum number of entries kept in cache_dir
+        **kwargs (): identical to tabularize_univariate_datetime
 
     Returns:
-        Matrix with seasonality features.
+        inputs (OrderedDict): identical to returns from tabularize_univariate_datetime,
+            but with read-only windows on memory-mapped arrays
+        targets (np.array, float): identical to returns from tabularize_univariate_datetime,
+            but a read-only window on a memory-mapped array
     """
-    features = np.column_stack(
-        [fun((2.0 * (i + 1) * np.pi * t / period)) for i in range(series_order) for fun in (np.sin, np.cos)]
-    )
-    return features
+    entry_dir = os.path.join(cache_dir, dataset_fingerprint(*args, **kwargs))
+    if os.path.isdir(entry_dir):
+        log.debug("Loading tabularized dataset from cache {}".format(entry_dir))
+        # marks the entry as recently used
+        os.utime(entry_dir)
+    else:
+        inputs, targets = tabularize_univariate_datetime(*args, **kwargs)
+        _save_tabularized(cache_dir, entry_dir, inputs, targets)
+        log.debug("Saved tabularized dataset to cache {}".format(entry_dir))
+        prune_cache(cache_dir, max_entries=max_entries, keep=entry_dir)
+    return _load_tabularized(entry_dir)
 
 
-def make_country_specific_holidays_df(year_list, country):
+def prune_cache(cache_dir, max_entries=0, keep=None):
+    """Remove the least recently used entries of a dataset cache.
+
+    Datasets already loaded from removed entries stay valid on platforms which allow
+    removing memory-mapped files, and are otherwise removed later.
+
+    Args:
+        cache_dir (str): directory containing the cache entries, see tabularize_cached
+        max_entries (int): number of most recently used entries to keep. default: 0 removes all entries
+        keep (str): directory of an entry which is never removed
     """
-    Make dataframe of country specific holidays for given years and countries
+    if not os.path.isdir(cache_dir):
+        return
+    entries = []
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        if os.path.isfile(os.path.join(path, "index.json")) and path != keep:
+            entries.append((os.path.getmtime(path), path))
+    n_remove = len(entries) - max(0, max_entries - (keep is not None))
+    for _, path in sorted(entries)[: max(0, n_remove)]:
+        log.debug("Removing tabularized dataset from cache {}".format(path))
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def dataset_fingerprint(df, **kwargs):
+    """Compute a fingerprint identifying a tabularized dataset.
 
     Args:
-        year_list (list): a list of years
-        country (string): country name
+        df (pd.DataFrame): containing original and normalized columns 'ds', 'y', 't', 'y_scaled'
+        **kwargs (): configs, identical to tabularize_univariate_datetime
 
     Returns:
-        pd.DataFrame with 'ds' and 'holiday'.
+        fingerprint (str): hex digest of the data, column names and configs,
+            and of the holiday definitions if country holidays are configured
     """
+    hasher = hashlib.sha1()
+    hasher.update(str(CACHE_FORMAT_VERSION).encode())
+    hasher.update(json.dumps(list(df.columns)).encode())
+    hasher.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    hasher.update(repr(_config_to_hashable(kwargs)).encode())
+    if kwargs.get("country_holidays_config") is not None:
+        hasher.update(_holidays_version().encode())
+    return hasher.hexdigest()
 
-    try:
-        country_specific_holidays = getattr(hdays_part2, country)(years=year_list)
-    except AttributeError:
-        try:
-            country_specific_holidays = getattr(hdays_part1, country)(years=year_list)
-        except AttributeError:
-            raise AttributeError("Holidays in {} are not currently supported!".format(country))
-    country_specific_holidays_dict = defaultdict(list)
-    for date, holiday in country_specific_holidays.items():
-        country_specific_holidays_dict[holiday].append(pd.to_datetime(date))
-    return country_specific_holidays_dict
-
-
-def make_events_features(df, events_config=None, country_holidays_config=None):
-    """
-    Construct arrays of all event features
 
-    Args:
-        df (pd.DataFrame): dataframe with all values including the user specified events (provided by user)
-        events_config (OrderedDict): user specified events, each with their
-            upper, lower windows (int), regularization
-        country_holidays_config (OrderedDict): Configurations (holiday_names, upper, lower windows, regularization)
-            for country specific holidays
+def _holidays_version():
+    """Version of the holiday definitions, from which the country holiday features are computed.
 
     Returns:
-        additive_events (np.array): all additive event features (both user specified and country specific)
-        multiplicative_events (np.array): all multiplicative event features (both user specified and country specific)
+        version (str): version of the installed holidays package and digest of the neuralprophet hdays module
     """
+    with open(utils.hdays_part2.__file__, "rb") as f:
+        hdays_digest = hashlib.sha1(f.read()).hexdigest()
+    return "{}:{}".format(getattr(utils.hdays_part1, "__version__", ""), hdays_digest)
 
-    additive_events = pd.DataFrame()
-    multiplicative_events = pd.DataFrame()
-
-    # create all user specified events
-    if events_config is not None:
-        for event, configs in events_config.items():
-            if event not in df.columns:
-                df[event] = 0.0
-            feature = df[event]
-            lw = configs.lower_window
-            uw = configs.upper_window
-            mode = configs["mode"]
-            # create lower and upper window features
-            for offset in range(lw, uw + 1):
-                key = utils.create_event_names_for_offsets(event, offset)
-                offset_feature = feature.shift(periods=offset, fill_value=0)
-                if mode == "additive":
-                    additive_events[key] = offset_feature
-                else:
-                    multiplicative_events[key] = offset_feature
-
-    # create all country specific holidays
-    if country_holidays_config is not None:
-        lw = country_holidays_config["lower_window"]
-        uw = country_holidays_config["upper_window"]
-        mode = country_holidays_config["mode"]
-        year_list = list({x.year for x in df.ds})
-        country_holidays_dict = make_country_specific_holidays_df(year_list, country_holidays_config["country"])
-        for holiday in country_holidays_config["holiday_names"]:
-            feature = pd.Series([0.0] * df.shape[0])
-            if holiday in country_holidays_dict.keys():
-                dates = country_holidays_dict[holiday]
-                feature[df.ds.isin(dates)] = 1.0
-            for offset in range(lw, uw + 1):
-                key = utils.create_event_names_for_offsets(holiday, offset)
-                offset_feature = feature.shift(periods=offset, fill_value=0)
-                if mode == "additive":
-                    additive_events[key] = offset_feature
-                else:
-                    multiplicative_events[key] = offset_feature
-
-    # Make sure column order is consistent
-    if not additive_events.empty:
-        additive_events = additive_events[sorted(additive_events.columns.tolist())]
-        additive_events = additive_events.values
-    else:
-        additive_events = None
-    if not multiplicative_events.empty:
-        multiplicative_events = multiplicative_events[sorted(multiplicative_events.columns.tolist())]
-        multiplicative_events = multiplicative_events.values
-    else:
-        multiplicative_events = None
 
-    return additive_events, multiplicative_events
+def _config_to_hashable(config):
+    # sets are sorted, their iteration order is not stable across processes.
+    if dataclasses.is_dataclass(config):
+        return _config_to_hashable(dataclasses.asdict(config))
+    if isinstance(config, dict):
+        return [(key, _config_to_hashable(value)) for key, value in config.items()]
+    if isinstance(config, (set, frozenset)):
+        return sorted(_config_to_hashable(value) for value in config)
+    if isinstance(config, (list, tuple)):
+        return [_config_to_hashable(value) for value in config]
+    if isinstance(config, np.ndarray):
+        return config.tolist()
+    return config
 
 
-def make_regressors_features(df, regressors_config):
-    """Construct arrays of all scalar regressor features
+def _save_tabularized(cache_dir, entry_dir, inputs, targets):
+    """Write tabularized arrays to a cache entry.
 
-    Args:
-        df (pd.DataFrame): dataframe with all values including the user specified regressors
-        regressors_config (OrderedDict): user specified regressors config
-
-    Returns:
-        additive_regressors (np.array): all additive regressor features
-        multiplicative_regressors (np.array): all multiplicative regressor features
+    The entry is first written to a temporary directory, which is then renamed,
+    so that a partially written entry is never loaded.
 
+    Args:
+        cache_dir (str): directory containing the cache entries
+        entry_dir (str): directory of the cache entry to be written
+        inputs (OrderedDict): identical to returns from tabularize_univariate_datetime
+        targets (np.array, float): identical to returns from tabularize_univariate_datetime
     """
-    additive_regressors = pd.DataFrame()
-    multiplicative_regressors = pd.DataFrame()
-
-    for reg in df.columns:
-        if reg in regressors_config:
-            mode = regressors_config[reg]["mode"]
-            if mode == "additive":
-                additive_regressors[reg] = df[reg]
-            else:
-                multiplicative_regressors[reg] = df[reg]
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=cache_dir)
+    arrays = [("targets", None, targets)]
+    for key, value in inputs.items():
+        if isinstance(value, OrderedDict):
+            arrays.extend((key, name, features) for name, features in value.items())
+        else:
+            arrays.append((key, None, value))
+    index = []
+    for i, (key, name, windows) in enumerate(arrays):
+        filename = "{}.npy".format(i)
+        entry = {"key": key, "name": name, "file": filename, "size": windows.shape[1]}
+        if isinstance(windows, SparseWindows):
+            # the compressed rows are stored in three files
+            entry["file"] = ["{}_{}.npy".format(i, part) for part in ["row_ptr", "columns", "values"]]
+            entry.update({"start": windows.start, "n_columns": windows.n_columns})
+            for part_file, part in zip(entry["file"], [windows.row_ptr, windows.columns, windows.values]):
+                np.save(os.path.join(tmp_dir, part_file), part)
+        else:
+            np.save(os.path.join(tmp_dir, filename), _unstride_windows(windows))
+        index.append(entry)
+    with open(os.path.join(tmp_dir, "index.json"), "w") as f:
+        json.dump({"n_samples": targets.shape[0], "arrays": index}, f)
+    try:
+        os.rename(tmp_dir, entry_dir)
+    except OSError:
+        # entry written concurrently by another process
+        shutil.rmtree(tmp_dir, ignore_errors=True)
 
-    if not additive_regressors.empty:
-        additive_regressors = additive_regressors[sorted(additive_regressors.columns.tolist())]
-        additive_regressors = additive_regressors.values
-    else:
-        additive_regressors = None
-    if not multiplicative_regressors.empty:
-        multiplicative_regressors = multiplicative_regressors[sorted(multiplicative_regressors.columns.tolist())]
-        multiplicative_regressors = multiplicative_regressors.values
-    else:
-        multiplicative_regressors = None
 
-    return additive_regressors, multiplicative_regressors
+def _load_tabularized(entry_dir):
+    """Load tabularized arrays from a cache entry as windows on memory-mapped arrays.
 
+    Args:
+        entry_dir (str): directory of the cache entry
+
+    Returns:
+        inputs (OrderedDict): identical to returns from tabularize_univariate_datetime
+        targets (np.array, float): identical to returns from tabularize_univariate_datetime
+    """
+    with open(os.path.join(entry_dir, "index.json")) as f:
+        index = json.load(f)
+    n_samples = index["n_samples"]
+    inputs = OrderedDict({})
+    targets = None
+    for entry in index["arrays"]:
+        if "n_columns" in entry:
+            row_ptr, columns, values = [np.load(os.path.join(entry_dir, f), mmap_mode="r") for f in entry["file"]]
+            windows = SparseWindows(
+                row_ptr, columns, values, entry["n_columns"], entry["start"], entry["size"], n_samples
+            )
+        else:
+            x = np.load(os.path.join(entry_dir, entry["file"]), mmap_mode="r")
+            windows = _stride_windows(x, start=0, size=entry["size"], n_samples=n_samples)
+        if entry["key"] == "targets":
+            targets = windows
+        elif entry["name"] is None:
+            inputs[entry["key"]] = windows
+        else:
+            inputs.setdefault(entry["key"], OrderedDict({}))[entry["name"]] = windows
+    return inputs, targets
 
-def seasonal_features_from_dates(dates, season_config):
-    """Dataframe with seasonality features.
 
-    Includes seasonality features, holiday features, and added regressors.
+def _unstride_windows(windows):
+    """Recover the array spanned by overlapping windows, as created by _stride_windows.
 
     Args:
-        dates (pd.Series): with dates for computing seasonality features
-        season_config (Season): configuration from NeuralProphet
+        windows (np.array): windows, dims: (n_samples, size, ...)
 
     Returns:
-         Dictionary with keys for each period name containing an np.array with the respective regression features.
-            each with dims: (len(dates), 2*fourier_order)
+        x (np.array): array spanned by all windows, dims: (n_samples + size - 1, ...)
     """
-    assert len(dates.shape) == 1
-    seasonalities = OrderedDict({})
-    # Seasonality features
-    for name, period in season_config.periods.items():
-        if period.resolution > 0:
-            if season_config.computation == "fourier":
-                features = fourier_series(
-                    dates=dates,
-                    period=period.period,
-                    series_order=period.resolution,
-                )
-            else:
-                raise NotImplementedError
-            seasonalities[name] = features
-    return seasonalities
+    n_samples, size = windows.shape[:2]
+    if n_samples == 0:
+        return np.empty((0,) + windows.shape[2:], dtype=windows.dtype)
+    if windows.strides[0] != windows.strides[1]:
+        # not overlapping windows, copy each non-overlapping step
+        return np.concatenate([windows[:, 0], windows[-1, 1:]], axis=0)
+    return np.lib.stride_tricks.as_strided(
+        windows,
+        shape=(n_samples + size - 1,) + windows.shape[2:],
+        strides=windows.strides[1:],
+        writeable=False,
+    )
@@ -7,6 +7,7 @@ from neuralprophet.utils import (
     season_config_to_model_dims,
     regressors_config_to_model_dims,
     events_config_to_model_dims,
+    feature_schema_from_configs,
 )
 
 log = logging.getLogger("nprophet.time_net")
@@ -27,6 +28,65 @@ def new_param(dims):
         return nn.Parameter(torch.nn.init.xavier_normal_(torch.randn([1] + dims)).squeeze(0), requires_grad=True)
 
 
+def linear_params(layer):
+    """Weight and bias of a linear layer, dequantized if the layer is quantized.
+
+    Args:
+        layer (nn.Linear or dynamically quantized Linear)
+
+    Returns:
+        weight (torch tensor, float), dims: (out_features, in_features)
+        bias (torch tensor, float), dims: (out_features), None if the layer has no bias
+    """
+    if isinstance(layer.weight, torch.Tensor):
+        return layer.weight, layer.bias
+    # quantized layers hold packed parameters, returned by methods
+    return layer.weight().dequantize(), layer.bias()
+
+
+def expand_lag_weights(weight, lag_indices, n_inputs):
+    """Weights of a pruned input layer, expanded to all lags with zeros for the pruned lags.
+
+    Args:
+        weight (torch tensor, float): weights of the kept lags, dims: (out_features, n_kept)
+        lag_indices (torch tensor, long): kept lags, dims: (n_kept), None if not pruned
+        n_inputs (int): number of lags before pruning
+
+    Returns:
+        weight (torch tensor, float), dims: (out_features, n_inputs)
+    """
+    if lag_indices is None:
+        return weight
+    return torch.zeros(weight.shape[0], n_inputs).index_copy(1, lag_indices, weight)
+
+
+def lagged_linear_filter(series, weight, bias=None):
+    """Apply a linear layer to all windows of a series, as a convolution computed with FFTs.
+
+    Identical to applying the layer to the stacked windows series[i : i + n_inputs],
+    in O(n_steps log n_steps) instead of O(n_steps * n_inputs) time per output.
+
+    Args:
+        series (np.array, float): dims: (n_steps)
+        weight (np.array, float): dims: (out_features, n_inputs)
+        bias (np.array, float): dims: (out_features), None if the layer has no bias
+
+    Returns:
+        np.array, float64, outputs of each window, dims: (n_steps - n_inputs + 1, out_features)
+    """
+    n_inputs = weight.shape[1]
+    n_windows = len(series) - n_inputs + 1
+    # length of the full convolution, rounded up to a power of two for fast FFTs
+    n_fft = 2 ** int(np.ceil(np.log2(len(series) + n_inputs - 1)))
+    spectrum = np.fft.rfft(series.astype(np.float64), n=n_fft)
+    # convolution with the reversed weights is the correlation with the weights
+    spectrum = spectrum * np.fft.rfft(weight[:, ::-1].astype(np.float64), n=n_fft, axis=1)
+    out = np.fft.irfft(spectrum, n=n_fft, axis=1)[:, n_inputs - 1 : n_inputs - 1 + n_windows].T
+    if bias is not None:
+        out = out + bias
+    return out
+
+
 class TimeNet(nn.Module):
     """Linear time regression fun and some not so linear fun.
 
@@ -53,6 +113,7 @@ class TimeNet(nn.Module):
         n_lags=0,
         num_hidden_layers=0,
         d_hidden=None,
+        sparse_events=False,
     ):
         """
         Args:
@@ -69,6 +130,8 @@ class TimeNet(nn.Module):
                 0 (default): no hidden layers, corresponds to classic Auto-Regression
             d_hidden (int): dimensionality of hidden layers  (for AR-Net). ignored if no hidden layers.
                 None (default): sets to n_lags + n_forecasts
+            sparse_events (bool): whether event features are input as sparse tensors,
+                separately from packed inputs.
         """
         super(TimeNet, self).__init__()
         # General
@@ -112,10 +175,17 @@ class TimeNet(nn.Module):
             self.season_params = nn.ParameterDict(
                 {name: new_param(dims=[dim]) for name, dim in self.season_dims.items()}
             )
+            if self.config_season.from_time:
+                # per seasonality: period in days and number of harmonics
+                self.season_periods = OrderedDict(
+                    (name, (self.config_season.periods[name].period, self.config_season.periods[name].resolution))
+                    for name in self.season_dims.keys()
+                )
             # self.season_params_vec = torch.cat([self.season_params[name] for name in self.season_params.keys()])
 
         # Events
         self.config_events = config_events
+        self.config_holidays = config_holidays
         self.events_dims = events_config_to_model_dims(config_events, config_holidays)
         if self.events_dims is not None:
             self.event_params = nn.ParameterDict({})
@@ -136,8 +206,10 @@ class TimeNet(nn.Module):
             self.event_params["multiplicative"] = new_param(dims=[n_multiplicative_event_params])
         else:
             self.config_events = None
+            self.config_holidays = None
 
             # Autoregression
+        self.quantized = False
         self.n_lags = n_lags
         self.num_hidden_layers = num_hidden_layers
         self.d_hidden = n_lags + n_forecasts if d_hidden is None else d_hidden
@@ -150,6 +222,8 @@ class TimeNet(nn.Module):
             self.ar_net.append(nn.Linear(d_inputs, self.n_forecasts, bias=False))
             for lay in self.ar_net:
                 nn.init.kaiming_normal_(lay.weight, mode="fan_in")
+            # kept lags of a pruned net, see prune_lags
+            self.ar_net.register_buffer("lag_indices", None)
 
         # Covariates
         self.config_covar = config_covar
@@ -167,6 +241,7 @@ class TimeNet(nn.Module):
                 covar_net.append(nn.Linear(d_inputs, self.n_forecasts, bias=False))
                 for lay in covar_net:
                     nn.init.kaiming_normal_(lay.weight, mode="fan_in")
+                covar_net.register_buffer("lag_indices", None)
                 self.covar_nets[covar] = covar_net
 
         ## Regressors
@@ -193,6 +268,56 @@ class TimeNet(nn.Module):
         else:
             self.config_regressors = None
 
+        # Packed inputs
+        self.sparse_events = sparse_events
+        self.feature_schema = feature_schema_from_configs(
+            season_config=self.config_season,
+            events_config=None if sparse_events else self.config_events,
+            country_holidays_config=None if sparse_events else config_holidays,
+            covar_config=self.config_covar,
+            regressors_config=self.config_regressors,
+            n_lags=self.n_lags,
+        )
+        # assigns each packed feature column to the additive (0) or multiplicative (1) components
+        self.feature_modes = torch.zeros(self.feature_schema.n_features, 2)
+        for (key, name), columns in self.feature_schema.features.items():
+            if key == "seasonalities":
+                self.feature_modes[columns, int(self.config_season.mode == "multiplicative")] = 1.0
+            elif key in ["events", "regressors"]:
+                self.feature_modes[columns, int(name == "multiplicative")] = 1.0
+
+        # named component of each event and regressor param, for the attribution of their effects
+        if self.events_dims is not None:
+            self.event_segments = self._component_segments(self.events_dims, self.event_params, "event_indices")
+        if self.regressors_dims is not None:
+            self.regressor_segments = self._component_segments(
+                self.regressors_dims, self.regressor_params, "regressor_index"
+            )
+
+    @staticmethod
+    def _component_segments(dims, params, indices_key):
+        """Assign the params of each mode to the named components they belong to.
+
+        Args:
+            dims (OrderedDict): events_dims or regressors_dims
+            params (nn.ParameterDict): additive and multiplicative params of the events or regressors
+            indices_key (str): key of the param indices of a component in its dims
+
+        Returns:
+            OrderedDict by mode of
+                names (list of str): names of the components of this mode
+                segment_ids (torch tensor, long): component of each param, as position in names
+                    dims: (n_params)
+        """
+        segments = OrderedDict({})
+        for mode in ["additive", "multiplicative"]:
+            names = [name for name, configs in dims.items() if configs["mode"] == mode]
+            segment_ids = torch.zeros(params[mode].shape[0], dtype=torch.long)
+            for k, name in enumerate(names):
+                segment_ids[dims[name][indices_key]] = k
+            segments[mode] = (names, segment_ids)
+        return segments
+
     @property
     def get_trend_deltas(self):
         """trend deltas for regularization.
@@ -208,11 +333,103 @@ class TimeNet(nn.Module):
     @property
     def ar_weights(self):
         """sets property auto-regression weights for regularization. Update if AR is modelled differently"""
-        return self.ar_net[0].weight
+        return expand_lag_weights(linear_params(self.ar_net[0])[0], self.ar_lag_indices, self.n_lags)
 
     def get_covar_weights(self, name):
         """sets property auto-regression weights for regularization. Update if AR is modelled differently"""
-        return self.covar_nets[name][0].weight
+        return expand_lag_weights(
+            linear_params(self.covar_nets[name][0])[0], self.covar_lag_indices.get(name), self._covar_n_inputs(name)
+        )
+
+    def _covar_n_inputs(self, name):
+        return 1 if self.config_covar[name].as_scalar else self.n_lags
+
+    def prune_lags(self, threshold):
+        """Remove the lags without relevant weights from the AR-Net and covariate nets.
+
+        Weights of the input layers with an absolute value below threshold are set to zero.
+        Lags with only zero weights are removed from the input layers and not gathered from the inputs.
+
+        Args:
+            threshold (float): smallest absolute value of a kept weight
+
+        Returns:
+            number of kept lags (OrderedDict): by 'ar' or covariate name
+        """
+        if self.quantized:
+            raise ValueError("Quantized models can not be pruned.")
+        n_kept = OrderedDict({})
+        if self.n_lags > 0:
+            self._prune_input_layer(self.ar_net, threshold)
+            n_kept["ar"] = self.ar_net[0].in_features
+        if self.config_covar is not None:
+            for name, net in self.covar_nets.items():
+                self._prune_input_layer(net, threshold)
+                n_kept[name] = net[0].in_features
+        return n_kept
+
+    @staticmethod
+    def _prune_input_layer(net, threshold):
+        layer = net[0]
+        lag_indices = net.lag_indices
+        if lag_indices is None:
+            lag_indices = torch.arange(layer.in_features)
+        with torch.no_grad():
+            weight = torch.where(torch.abs(layer.weight) < threshold, torch.zeros_like(layer.weight), layer.weight)
+            kept = torch.nonzero(torch.sum(torch.abs(weight), dim=0) > 0, as_tuple=False).squeeze(1)
+            pruned = nn.Linear(len(kept), layer.out_features, bias=layer.bias is not None)
+            pruned.weight.copy_(weight[:, kept])
+            if layer.bias is not None:
+                pruned.bias.copy_(layer.bias)
+        net[0] = pruned
+        # a buffer, such that the kept lags are part of the state_dict
+        net.lag_indices = lag_indices[kept]
+
+    @property
+    def ar_lag_indices(self):
+        """kept lags of the pruned AR-Net, None if not pruned"""
+        return self.ar_net.lag_indices if self.n_lags > 0 else None
+
+    @property
+    def covar_lag_indices(self):
+        """kept lags of the pruned covariate nets, by covariate name"""
+        if self.config_covar is None:
+            return OrderedDict({})
+        return OrderedDict(
+            (name, net.lag_indices) for name, net in self.covar_nets.items() if net.lag_indices is not None
+        )
+
+    def _load_from_state_dict(self, state_dict, prefix, *args, **kwargs):
+        # the input layers of pruned nets take only the kept lags, and are resized before their weights are loaded
+        nets = OrderedDict({})
+        if self.n_lags > 0:
+            nets["ar_net."] = self.ar_net
+        if self.config_covar is not None:
+            nets.update(("covar_nets.{}.".format(name), net) for name, net in self.covar_nets.items())
+        for net_prefix, net in nets.items():
+            lag_indices = state_dict.get(prefix + net_prefix + "lag_indices")
+            if lag_indices is None or self.quantized:
+                continue
+            layer = net[0]
+            if layer.in_features != len(lag_indices):
+                net[0] = nn.Linear(len(lag_indices), layer.out_features, bias=layer.bias is not None)
+            net.lag_indices = torch.zeros_like(lag_indices)
+        super(TimeNet, self)._load_from_state_dict(state_dict, prefix, *args, **kwargs)
+
+    def quantize(self, dtype=torch.qint8):
+        """Quantize the linear layers of the AR-Net and covariate nets for inference.
+
+        Weights are stored as integers and activations are quantized dynamically, batch by batch.
+        A quantized model can not be trained further.
+
+        Args:
+            dtype (torch.dtype): quantized type of the weights, torch.qint8 or torch.float16
+        """
+        if self.n_lags > 0:
+            self.ar_net = torch.quantization.quantize_dynamic(self.ar_net, {nn.Linear}, dtype=dtype)
+        if self.config_covar is not None:
+            self.covar_nets = torch.quantization.quantize_dynamic(self.covar_nets, {nn.Linear}, dtype=dtype)
+        self.quantized = True
 
     def get_event_weights(self, name):
         """
@@ -265,6 +482,10 @@ class TimeNet(nn.Module):
     def _piecewise_linear_trend(self, t):
         """Piecewise linear trend, computed segmentwise or with deltas.
 
+        The segment of each time is looked up among the sorted changepoints,
+        slopes and offsets are then gathered from per-segment tables.
+        Thus, each time costs O(log n_changepoints).
+
         Args:
             t (torch tensor, float): normalized time of
                 dimensions (batch, n_forecasts)
@@ -272,15 +493,22 @@ class TimeNet(nn.Module):
         Returns:
             Trend component, same dimensions as input t
         """
-        past_next_changepoint = t.unsqueeze(2) >= torch.unsqueeze(self.trend_changepoints_t[1:], dim=0)
-        segment_id = torch.sum(past_next_changepoint, dim=2)
-        current_segment = nn.functional.one_hot(segment_id, num_classes=self.config_trend.n_changepoints + 1)
+        segment_id = self._trend_segment_ids(t)
+        slopes, offsets = self._trend_segment_tables()
+        return slopes[segment_id] * t + offsets[segment_id]
 
-        k_t = torch.sum(current_segment * torch.unsqueeze(self.trend_deltas, dim=0), dim=2)
+    def _trend_segment_tables(self):
+        """Slope and offset of the piecewise linear trend in each segment.
 
-        if not self.segmentwise_trend:
-            previous_deltas_t = torch.sum(past_next_changepoint * torch.unsqueeze(self.trend_deltas[:-1], dim=0), dim=2)
-            k_t = k_t + previous_deltas_t
+        Returns:
+            slopes (torch tensor, float), dims: (n_changepoints + 1)
+            offsets (torch tensor, float), dims: (n_changepoints + 1)
+        """
+        if self.segmentwise_trend:
+            k = self.trend_deltas
+        else:
+            # the slope of a segment is the sum of the deltas of all segments up to it
+            k = torch.cumsum(self.trend_deltas, dim=0)
 
         if self.config_trend.growth != "discontinuous":
             if self.segmentwise_trend:
@@ -288,13 +516,30 @@ class TimeNet(nn.Module):
             else:
                 deltas = self.trend_deltas
             gammas = -self.trend_changepoints_t[1:] * deltas[1:]
-            m_t = torch.sum(past_next_changepoint * gammas, dim=2)
+            # the offset of a segment is the sum of the gammas of all changepoints before it
+            offsets = torch.cat((torch.zeros(1), torch.cumsum(gammas, dim=0)))
             if not self.segmentwise_trend:
-                m_t = m_t.detach()
+                offsets = offsets.detach()
         else:
-            m_t = torch.sum(current_segment * torch.unsqueeze(self.trend_m, dim=0), dim=2)
+            offsets = self.trend_m
+
+        return self.trend_k0 + k, offsets
+
+    def _trend_segment_ids(self, t):
+        """Index of the trend segment of each time, the number of changepoints (excluding zero) up to it.
+
+        Args:
+            t (torch tensor, float): normalized time of
+                dimensions (batch, n_forecasts)
 
-        return (self.trend_k0 + k_t) * t + m_t
+        Returns:
+            segment ids (torch tensor, long), same dimensions as input t
+        """
+        changepoints_t = self.trend_changepoints_t[1:]
+        if hasattr(torch, "bucketize"):
+            return torch.bucketize(t, changepoints_t, right=True)
+        # torch < 1.6
+        return torch.sum(t.unsqueeze(2) >= torch.unsqueeze(changepoints_t, dim=0), dim=2)
 
     def trend(self, t):
         """Computes trend based on model configuration.
@@ -315,6 +560,42 @@ class TimeNet(nn.Module):
             trend = self._piecewise_linear_trend(t)
         return self.bias + trend
 
+    def seasonal_features_from_days(self, days):
+        """Compute the Fourier features of all seasonalities from the days since epoch.
+
+        Identical to tabular.seasonal_features_from_dates of the dates, up to float32 precision.
+
+        Args:
+            days (torch tensor, double): days since 1970-01-01, see days_from_inputs
+                dims: (batch, n_forecasts)
+
+        Returns:
+            OrderedDict of named seasonalities with their features (torch tensor, float)
+                dims of each dict value: (batch, n_forecasts, 2 * resolution)
+        """
+        seasonalities = OrderedDict({})
+        for name, (period, resolution) in self.season_periods.items():
+            phase = torch.remainder(days / period, 1.0)
+            harmonics = torch.arange(1, resolution + 1, dtype=torch.double)
+            angle = 2.0 * np.pi * torch.unsqueeze(phase, dim=-1) * harmonics
+            # columns alternating sin and cos of each harmonic
+            features = torch.stack((torch.sin(angle), torch.cos(angle)), dim=-1)
+            seasonalities[name] = features.reshape(days.shape + (2 * resolution,)).float()
+        return seasonalities
+
+    @staticmethod
+    def days_from_inputs(inputs):
+        """Days since epoch in float64, from their float32 high and low parts in the inputs.
+
+        Args:
+            inputs (dict): model inputs with 'time' and 'days', see tabular.tabularize_univariate_datetime
+
+        Returns:
+            days (torch tensor, double), dims as inputs['time']
+        """
+        days = inputs["days"]["high"].double() + inputs["days"]["low"].double()
+        return days.reshape(inputs["time"].shape)
+
     def seasonality(self, features, name):
         """Compute single seasonality component.
 
@@ -328,20 +609,30 @@ class TimeNet(nn.Module):
         """
         return torch.sum(features * torch.unsqueeze(self.season_params[name], dim=0), dim=2)
 
-    def all_seasonalities(self, s):
+    def all_seasonalities(self, s, per_season=False):
         """Compute all seasonality components.
 
+        The features of all seasonalities are concatenated and evaluated with a single matmul.
+
         Args:
             s (dict(torch tensor, float)): dict of named seasonalities (keys) with their features (values)
                 dims of each dict value: (batch, n_forecasts, n_features)
+            per_season (bool): False (default) returns the sum of all seasonalities.
+                True returns each seasonality component separately.
 
         Returns:
-            forecast component of dims (batch, n_forecasts)
+            forecast component of dims (batch, n_forecasts),
+                or if per_season, OrderedDict of named forecast components of dims (batch, n_forecasts)
         """
-        x = torch.zeros(s[list(s.keys())[0]].shape[:2])
-        for name, features in s.items():
-            x = x + self.seasonality(features, name)
-        return x
+        features = torch.cat(list(s.values()), dim=2)
+        params = torch.cat([self.season_params[name] for name in s.keys()])
+        if not per_season:
+            return torch.matmul(features, params)
+        # assigns the params of each seasonality to its own column, like feature_modes
+        dims = torch.tensor([s[name].shape[2] for name in s.keys()])
+        season_columns = torch.repeat_interleave(torch.eye(len(s)), dims, dim=0)
+        components = torch.matmul(features, torch.unsqueeze(params, dim=1) * season_columns)
+        return OrderedDict((name, components[:, :, i]) for i, name in enumerate(s.keys()))
 
     def scalar_features_effects(self, features, params, indices=None):
         """
@@ -349,17 +640,80 @@ class TimeNet(nn.Module):
         Args:
             features (torch tensor, float): features (either additive or multiplicative) related to event component
                 dims: (batch, n_forecasts, n_features)
+                if sparse, the effect is a segment-sum over its nonzero features.
             params (nn.Parameter): params (either additive or multiplicative) related to events
             indices (list of int): indices in the feature tensors related to a particular event
         Returns:
             forecast component of dims (batch, n_forecasts)
         """
+        if features.is_sparse:
+            if indices is not None:
+                selected = torch.zeros_like(params)
+                selected[indices] = params[indices]
+                params = selected
+            feature_indices = features._indices()
+            effects = features._values() * params[feature_indices[-1]]
+            # sum the effects of all features at each position of (batch, n_forecasts)
+            positions = feature_indices[0]
+            for dim in range(1, feature_indices.shape[0] - 1):
+                positions = positions * features.shape[dim] + feature_indices[dim]
+            out = torch.zeros(int(np.prod(features.shape[:-1])), dtype=effects.dtype)
+            return out.index_add(0, positions, effects).view(features.shape[:-1])
+
         if indices is not None:
             features = features[:, :, indices]
             params = params[indices]
 
         return torch.sum(features * torch.unsqueeze(params, dim=0), dim=2)
 
+    def attributed_effects(self, features, params, segment_ids, n_segments):
+        """Computes the effects of scalar features, summed per component in a single pass.
+
+        Args:
+            features (torch tensor, float): features (either additive or multiplicative)
+                dims: (batch, n_forecasts, n_features), sparse or dense
+            params (nn.Parameter): params of the features
+                dims: (n_features)
+            segment_ids (torch tensor, long): component of each feature
+                dims: (n_features)
+            n_segments (int): number of components
+
+        Returns:
+            forecast components of dims (batch, n_forecasts, n_segments)
+        """
+        if features.is_sparse:
+            feature_indices = features._indices()
+            effects = features._values() * params[feature_indices[-1]]
+            # sum the effects at each position of (batch, n_forecasts, component)
+            positions = feature_indices[0]
+            for dim in range(1, feature_indices.shape[0] - 1):
+                positions = positions * features.shape[dim] + feature_indices[dim]
+            positions = positions * n_segments + segment_ids[feature_indices[-1]]
+            out = torch.zeros(int(np.prod(features.shape[:-1])) * n_segments, dtype=effects.dtype)
+            return out.index_add(0, positions, effects).view(features.shape[:-1] + (n_segments,))
+        effects = features * torch.unsqueeze(params, dim=0)
+        out = torch.zeros(features.shape[:-1] + (n_segments,), dtype=effects.dtype)
+        return out.index_add(2, segment_ids, effects)
+
+    def packed_linear_weights(self):
+        """Weights of all linear components in packed features.
+
+        Returns:
+            weights (torch tensor, float), dims: (n_features, 2)
+                first column for additive, second column for multiplicative components
+        """
+        params = []
+        for (key, name), columns in self.feature_schema.features.items():
+            if key == "seasonalities":
+                params.append(self.season_params[name])
+            elif key == "events":
+                params.append(self.event_params[name])
+            elif key == "regressors":
+                params.append(self.regressor_params[name])
+            else:
+                params.append(torch.zeros(columns.stop - columns.start))
+        return torch.unsqueeze(torch.cat(params), dim=1) * self.feature_modes
+
     def auto_regression(self, lags):
         """Computes auto-regessive model component AR-Net.
 
@@ -371,6 +725,8 @@ class TimeNet(nn.Module):
             forecast component of dims: (batch, n_forecasts)
         """
         x = lags
+        if self.ar_lag_indices is not None:
+            x = x.index_select(1, self.ar_lag_indices)
         for i in range(self.num_hidden_layers + 1):
             if i > 0:
                 x = nn.functional.relu(x)
@@ -388,29 +744,103 @@ class TimeNet(nn.Module):
         Returns:
             forecast component of dims (batch, n_forecasts)
         """
-        x = lags
+        x = self._covariate_inputs(lags, name)
         for i in range(self.num_hidden_layers + 1):
             if i > 0:
                 x = nn.functional.relu(x)
             x = self.covar_nets[name][i](x)
         return x
 
-    def all_covariates(self, covariates):
+    def _covariate_inputs(self, lags, name):
+        if name in self.covar_lag_indices:
+            return lags.index_select(1, self.covar_lag_indices[name])
+        return lags
+
+    def all_covariates(self, covariates, per_covariate=False):
         """Compute all covariate components.
 
+        Covariates with the same number of inputs are evaluated together,
+        with one batched matmul per layer over their stacked network weights.
+
         Args:
             covariates (dict(torch tensor, float)): dict of named covariates (keys) with their features (values)
                 dims of each dict value: (batch, n_lags)
+            per_covariate (bool): False (default) returns the sum of all covariate components.
+                True returns each covariate component separately.
 
         Returns:
-            forecast component of dims (batch, n_forecasts)
+            forecast component of dims (batch, n_forecasts),
+                or if per_covariate, OrderedDict of named forecast components of dims (batch, n_forecasts)
         """
-        for i, name in enumerate(covariates.keys()):
-            if i == 0:
-                x = self.covariate(lags=covariates[name], name=name)
-            if i > 0:
-                x = x + self.covariate(lags=covariates[name], name=name)
-        return x
+        if self.quantized:
+            # quantized layers hold packed weights, which can only be applied net by net
+            components = OrderedDict((name, self.covariate(lags, name)) for name, lags in covariates.items())
+            if per_covariate:
+                return components
+            return torch.sum(torch.stack(list(components.values())), dim=0)
+        # only the kept lags of pruned nets
+        covariates = OrderedDict((name, self._covariate_inputs(lags, name)) for name, lags in covariates.items())
+        groups = OrderedDict({})
+        for name in covariates.keys():
+            groups.setdefault(covariates[name].shape[-1], []).append(name)
+        x_sum = None
+        components = OrderedDict({})
+        for names in groups.values():
+            # dims: (n_covariates, batch, d_inputs)
+            x = torch.stack([covariates[name] for name in names])
+            for i in range(self.num_hidden_layers + 1):
+                if i > 0:
+                    x = nn.functional.relu(x)
+                layers = [self.covar_nets[name][i] for name in names]
+                weight = torch.stack([layer.weight for layer in layers]).transpose(1, 2)
+                if layers[0].bias is not None:
+                    bias = torch.stack([layer.bias for layer in layers]).unsqueeze(1)
+                    x = torch.baddbmm(bias, x, weight)
+                else:
+                    x = torch.bmm(x, weight)
+            if per_covariate:
+                components.update(zip(names, torch.unbind(x)))
+            else:
+                x = torch.sum(x, dim=0)
+                x_sum = x if x_sum is None else x_sum + x
+        if per_covariate:
+            return OrderedDict((name, components[name]) for name in covariates.keys())
+        return x_sum
+
+    def lagged_linear_components(self, lagged):
+        """Compute the AR and covariate components of all lag windows of the lagged series.
+
+        Only for linear nets (num_hidden_layers=0), whose components are linear filters of the series.
+        These are evaluated with FFT convolutions, see lagged_linear_filter, without creating the windows.
+
+        Args:
+            lagged (np.array, float): all lagged series, one row per timestamp,
+                with columns as described by self.feature_schema.lagged
+                dims: (n_steps, n_lagged)
+
+        Returns:
+            OrderedDict of forecast_component: value, as from forward_with_components
+                'ar' and 'lagged_regressor_<name>', with elements of dims (n_steps - n_lags + 1, n_forecasts)
+                window i has the lags of the rows i to i + n_lags - 1
+        """
+        if self.num_hidden_layers > 0:
+            raise ValueError("Lagged components can only be computed as filters for nets without hidden layers.")
+        n_windows = lagged.shape[0] - self.n_lags + 1
+        components = OrderedDict({})
+        for (key, name), (channel, n_inputs) in self.feature_schema.lagged.items():
+            if key == "lags":
+                component, layer, lag_indices = "ar", self.ar_net[0], self.ar_lag_indices
+            else:
+                component = "lagged_regressor_{}".format(name)
+                layer, lag_indices = self.covar_nets[name][0], self.covar_lag_indices.get(name)
+            weight, bias = linear_params(layer)
+            weight = expand_lag_weights(weight, lag_indices, n_inputs).detach().numpy()
+            bias = None if bias is None else bias.detach().numpy()
+            out = lagged_linear_filter(lagged[:, channel], weight, bias)
+            # the inputs of a window are its last n_inputs lags
+            start = self.n_lags - n_inputs
+            components[component] = torch.from_numpy(out[start : start + n_windows]).float()
+        return components
 
     def forward(self, inputs):
         """This method defines the model forward pass.
@@ -428,13 +858,33 @@ class TimeNet(nn.Module):
                     dims of each dict value: (batch, n_lags)
                 events (torch tensor, float): all event features
                     dims: (batch, n_forecasts, n_features)
+                    sparse tensors if self.sparse_events
                 regressors (torch tensor, float): all regressor features
                     dims: (batch, n_forecasts, n_features)
+                or alternatively, packed as described by self.feature_schema:
+                features (torch tensor, float): all per-step features
+                    dims: (batch, n_forecasts, n_features)
+                lagged (torch tensor, float): all lagged series
+                    dims: (batch, n_lags, n_lagged)
+                events, if self.sparse_events, as above
         Returns:
             forecast of dims (batch, n_forecasts)
         """
-        additive_components = torch.zeros_like(inputs["time"])
-        multiplicative_components = torch.zeros_like(inputs["time"])
+        packed = "features" in inputs
+        steps = inputs.get("steps")
+        if packed:
+            if steps is not None:
+                # features of unique timestamps, as a single sample
+                inputs = dict(inputs, features=torch.unsqueeze(inputs["features"], dim=0))
+            # all linear components of packed features in a single matmul
+            linear = self._expand_steps(torch.matmul(inputs["features"], self.packed_linear_weights()), steps)
+            # copied, as both are accumulated in-place below
+            additive_components = linear[:, :, 0].clone()
+            multiplicative_components = linear[:, :, 1].clone()
+            inputs = self.feature_schema.unpack(inputs)
+        else:
+            additive_components = torch.zeros_like(inputs["time"])
+            multiplicative_components = torch.zeros_like(inputs["time"])
 
         if "lags" in inputs:
             additive_components += self.auto_regression(lags=inputs["lags"])
@@ -443,14 +893,19 @@ class TimeNet(nn.Module):
         if "covariates" in inputs:
             additive_components += self.all_covariates(covariates=inputs["covariates"])
 
-        if "seasonalities" in inputs:
+        s = None
+        if self.season_dims is not None and self.config_season.from_time:
+            seasonalities = self.seasonal_features_from_days(self.days_from_inputs(inputs))
+            s = self._expand_steps(self.all_seasonalities(s=seasonalities), steps)
+        elif "seasonalities" in inputs and not packed:
             s = self.all_seasonalities(s=inputs["seasonalities"])
+        if s is not None:
             if self.config_season.mode == "additive":
                 additive_components += s
             elif self.config_season.mode == "multiplicative":
                 multiplicative_components += s
 
-        if "events" in inputs:
+        if "events" in inputs and (self.sparse_events or not packed):
             if "additive" in inputs["events"].keys():
                 additive_components += self.scalar_features_effects(
                     inputs["events"]["additive"], self.event_params["additive"]
@@ -460,7 +915,7 @@ class TimeNet(nn.Module):
                     inputs["events"]["multiplicative"], self.event_params["multiplicative"]
                 )
 
-        if "regressors" in inputs:
+        if "regressors" in inputs and not packed:
             if "additive" in inputs["regressors"].keys():
                 additive_components += self.scalar_features_effects(
                     inputs["regressors"]["additive"], self.regressor_params["additive"]
@@ -470,10 +925,25 @@ class TimeNet(nn.Module):
                     inputs["regressors"]["multiplicative"], self.regressor_params["multiplicative"]
                 )
 
-        trend = self.trend(t=inputs["time"])
+        trend = self._expand_steps(self.trend(t=inputs["time"]), steps)
         out = trend + additive_components + trend * multiplicative_components
         return out
 
+    def _expand_steps(self, value, steps):
+        """Expand a component of deduplicated timestamps to the steps of each sample.
+
+        Args:
+            value (torch tensor, float): component of the unique timestamps, dims: (1, n_unique, ...)
+            steps (torch tensor, long): index of the timestamp of each step, dims: (batch, n_forecasts)
+                None if the timestamps are not deduplicated
+
+        Returns:
+            component (torch tensor, float), dims: (batch, n_forecasts, ...)
+        """
+        if steps is None:
+            return value
+        return value[0][steps]
+
     def compute_components(self, inputs):
         """This method returns the values of each model component.
 
@@ -490,64 +960,108 @@ class TimeNet(nn.Module):
                     dims of each dict value: (batch, n_lags)
                 events (torch tensor, float): all event features
                     dims: (batch, n_forecasts, n_features)
+                or alternatively, packed as described by self.feature_schema.
         Returns:
             dict of forecast_component: value
                 with elements of dims (batch, n_forecasts)
         """
+        return self.forward_with_components(inputs)[1]
+
+    def forward_with_components(self, inputs):
+        """Compute the forecast together with the values of each model component.
+
+        Each component is computed once and the forecast is assembled from the components,
+        thus the forecast is consistent with its components by construction. The totals of the events
+        and regressors of a mode are the sums of their named components.
+        Args:
+            inputs (dict): identical to forward
+        Returns:
+            forecast of dims (batch, n_forecasts)
+            dict of forecast_component: value
+                with elements of dims (batch, n_forecasts)
+        """
+        steps = inputs.get("steps")
+        if "features" in inputs:
+            if steps is not None:
+                # trend, seasonalities and other per-step components are evaluated once per unique timestamp
+                inputs = dict(inputs, features=torch.unsqueeze(inputs["features"], dim=0))
+            inputs = self.feature_schema.unpack(inputs)
+        # sparse events are not in the deduplicated features
+        event_steps = None if self.sparse_events else steps
         components = {}
-        components["trend"] = self.trend(t=inputs["time"])
-        if self.config_trend is not None and "seasonalities" in inputs:
-            for name, features in inputs["seasonalities"].items():
-                components["season_{}".format(name)] = self.seasonality(features=features, name=name)
+        # components which add up to the additive and multiplicative parts of the forecast
+        additive = []
+        multiplicative = []
+        components["trend"] = self._expand_steps(self.trend(t=inputs["time"]), steps)
+        seasonalities = inputs.get("seasonalities")
+        if self.season_dims is not None and self.config_season.from_time:
+            seasonalities = self.seasonal_features_from_days(self.days_from_inputs(inputs))
+        if self.config_trend is not None and seasonalities is not None:
+            for name, season in self.all_seasonalities(s=seasonalities, per_season=True).items():
+                season = self._expand_steps(season, steps)
+                components["season_{}".format(name)] = season
+                if self.config_season.mode == "multiplicative":
+                    multiplicative.append(season)
+                else:
+                    additive.append(season)
         if self.n_lags > 0 and "lags" in inputs:
             components["ar"] = self.auto_regression(lags=inputs["lags"])
+            additive.append(components["ar"])
         if self.config_covar is not None and "covariates" in inputs:
-            for name, lags in inputs["covariates"].items():
-                components["lagged_regressor_{}".format(name)] = self.covariate(lags=lags, name=name)
-        if self.config_events is not None and "events" in inputs:
-            if "additive" in inputs["events"].keys():
-                components["events_additive"] = self.scalar_features_effects(
-                    features=inputs["events"]["additive"], params=self.event_params["additive"]
-                )
-            if "multiplicative" in inputs["events"].keys():
-                components["events_multiplicative"] = self.scalar_features_effects(
-                    features=inputs["events"]["multiplicative"], params=self.event_params["multiplicative"]
-                )
-            for event, configs in self.events_dims.items():
-                mode = configs["mode"]
-                indices = configs["event_indices"]
-                if mode == "additive":
-                    features = inputs["events"]["additive"]
-                    params = self.event_params["additive"]
+            for name, covariate in self.all_covariates(inputs["covariates"], per_covariate=True).items():
+                components["lagged_regressor_{}".format(name)] = covariate
+                additive.append(covariate)
+        if self.events_dims is not None and "events" in inputs:
+            effects, totals = self._attributed_components(
+                inputs["events"], self.event_params, self.event_segments, event_steps
+            )
+            for mode, total in totals.items():
+                components["events_{}".format(mode)] = total
+                if mode == "multiplicative":
+                    multiplicative.append(total)
                 else:
-                    features = inputs["events"]["multiplicative"]
-                    params = self.event_params["multiplicative"]
-                components["event_{}".format(event)] = self.scalar_features_effects(
-                    features=features, params=params, indices=indices
-                )
+                    additive.append(total)
+            for event in self.events_dims.keys():
+                components["event_{}".format(event)] = effects[event]
         if self.config_regressors is not None and "regressors" in inputs:
-            if "additive" in inputs["regressors"].keys():
-                components["future_regressors_additive"] = self.scalar_features_effects(
-                    features=inputs["regressors"]["additive"], params=self.regressor_params["additive"]
-                )
-            if "multiplicative" in inputs["regressors"].keys():
-                components["future_regressors_multiplicative"] = self.scalar_features_effects(
-                    features=inputs["regressors"]["multiplicative"], params=self.regressor_params["multiplicative"]
-                )
-            for regressor, configs in self.regressors_dims.items():
-                mode = configs["mode"]
-                index = []
-                index.append(configs["regressor_index"])
-                if mode == "additive":
-                    features = inputs["regressors"]["additive"]
-                    params = self.regressor_params["additive"]
+            effects, totals = self._attributed_components(
+                inputs["regressors"], self.regressor_params, self.regressor_segments, steps
+            )
+            for mode, total in totals.items():
+                components["future_regressors_{}".format(mode)] = total
+                if mode == "multiplicative":
+                    multiplicative.append(total)
                 else:
-                    features = inputs["regressors"]["multiplicative"]
-                    params = self.regressor_params["multiplicative"]
-                components["future_regressor_{}".format(regressor)] = self.scalar_features_effects(
-                    features=features, params=params, indices=index
-                )
-        return components
+                    additive.append(total)
+            for regressor in self.regressors_dims.keys():
+                components["future_regressor_{}".format(regressor)] = effects[regressor]
+        trend = components["trend"]
+        out = trend + sum(additive, torch.zeros_like(trend)) + trend * sum(multiplicative, torch.zeros_like(trend))
+        return out, components
+
+    def _attributed_components(self, features, params, segments, steps=None):
+        """Effects of each named event or regressor, see attributed_effects, and their sum per mode.
+
+        Args:
+            features (dict): additive and multiplicative features, as inputs["events"] or inputs["regressors"]
+            params (nn.ParameterDict): additive and multiplicative params
+            segments (OrderedDict): as from _component_segments
+            steps (torch tensor, long): if the features are of deduplicated timestamps, see _expand_steps
+
+        Returns:
+            OrderedDict of name: forecast component of dims (batch, n_forecasts)
+            OrderedDict of mode: sum of the components of this mode, of dims (batch, n_forecasts)
+        """
+        effects = OrderedDict({})
+        totals = OrderedDict({})
+        for mode, (names, segment_ids) in segments.items():
+            if len(names) > 0 and mode in features.keys():
+                values = self.attributed_effects(features[mode], params[mode], segment_ids, len(names))
+                values = self._expand_steps(values, steps)
+                effects.update(zip(names, torch.unbind(values, dim=-1)))
+                # each feature belongs to exactly one component, thus the components add up to the mode total
+                totals[mode] = torch.sum(values, dim=-1)
+        return effects, totals
 
 
 class FlatNet(nn.Module):
@@ -1,9 +1,11 @@
 import os
 import sys
+import json
 import math
+import tempfile
+import threading
 import numpy as np
 import pandas as pd
-import torch
 from attrdict import AttrDict
 from collections import OrderedDict
 from neuralprophet import hdays as hdays_part2
@@ -46,9 +48,9 @@ def reg_func_ar(weights):
         regularization loss, scalar
 
     """
-    abs_weights = torch.abs(weights.clone())
-    reg = torch.div(2.0, 1.0 + torch.exp(-3 * (1e-12 + abs_weights).pow(1 / 3.0))) - 1.0
-    reg = torch.mean(reg).squeeze()
+    abs_weights = weights.clone().abs()
+    reg = 2.0 / (1.0 + (-3 * (1e-12 + abs_weights).pow(1 / 3.0)).exp()) - 1.0
+    reg = reg.mean().squeeze()
     return reg
 
 
@@ -62,11 +64,11 @@ def reg_func_abs(weights, threshold=None):
     Returns:
         regularization loss, scalar
     """
-    abs_weights = torch.abs(weights.clone())
+    abs_weights = weights.clone().abs()
     if threshold is not None and not math.isclose(threshold, 0):
-        abs_weights = torch.clamp(abs_weights - threshold, min=0.0)
+        abs_weights = (abs_weights - threshold).clamp(min=0.0)
     reg = abs_weights
-    reg = torch.sum(reg).squeeze()
+    reg = reg.sum().squeeze()
     return reg
 
 
@@ -165,6 +167,128 @@ def season_config_to_model_dims(season_config):
     return seasonal_dims
 
 
+class HolidayCalendar:
+    """Process-wide cache of the holidays of each country and year.
+
+    Computing holidays can be expensive, particularly for lunar and Islamic calendars.
+    Holidays are thus computed once per (country, year) and shared by all models.
+    Optionally, the cache is persisted to a json file, from which other processes can start warm.
+    Lookups and insertions are guarded by a lock, so the calendar can be shared between threads.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # (country, year) -> (dates (np.array, datetime64[D]), names (list of str))
+        self.entries = {}
+        self.path = None
+
+    def get(self, country, years):
+        """Get the holidays of a country in the given years.
+
+        Args:
+            country (string): country name
+            years (iterable): years of which to get holidays
+
+        Returns:
+            dates (np.array, datetime64[D]): dates of the holidays
+            names (list of str): name of the holiday at each date
+        """
+        with self.lock:
+            missing = sorted({int(year) for year in years if (country, int(year)) not in self.entries})
+        # computed outside of the lock, a concurrent miss of the same year computes it again
+        computed = {}
+        for year in missing:
+            holidays = _country_holidays(country, year)
+            computed[(country, year)] = (
+                np.array(list(holidays.keys()), dtype="datetime64[D]"),
+                list(holidays.values()),
+            )
+        with self.lock:
+            self.entries.update(computed)
+            if len(computed) > 0 and self.path is not None:
+                self._save(self.path)
+            entries = [self.entries[(country, int(year))] for year in years]
+        if len(entries) == 0:
+            return np.array([], dtype="datetime64[D]"), []
+        dates = np.concatenate([dates for dates, _ in entries])
+        names = [name for _, year_names in entries for name in year_names]
+        return dates, names
+
+    def persist(self, path):
+        """Load holidays from a json file, and save all newly computed holidays to it.
+
+        Args:
+            path (str): location of json file, created if missing
+        """
+        with self.lock:
+            self.path = path
+        if os.path.exists(path):
+            self.load(path)
+
+    def load(self, path):
+        """Add holidays from a json file, as written by save.
+
+        Args:
+            path (str): location of json file
+        """
+        with open(path) as f:
+            data = json.load(f)
+        with self.lock:
+            for country, years in data.items():
+                for year, (dates, names) in years.items():
+                    self.entries[(country, int(year))] = (np.array(dates, dtype="datetime64[D]"), names)
+
+    def save(self, path):
+        """Write all cached holidays to a json file.
+
+        Args:
+            path (str): location of json file
+        """
+        with self.lock:
+            self._save(path)
+
+    def _save(self, path):
+        # requires self.lock
+        data = {}
+        for (country, year), (dates, names) in self.entries.items():
+            data.setdefault(country, {})[str(year)] = (dates.astype(str).tolist(), names)
+        # write to a temporary file first, so that other processes never read a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)))
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    def clear(self):
+        """Remove all cached holidays."""
+        with self.lock:
+            self.entries.clear()
+
+
+def _country_holidays(country, year):
+    """Compute the holidays of a country in a year.
+
+    Args:
+        country (string): country name
+        year (int): year of holidays
+
+    Returns:
+        holidays (dict): holiday name of each date
+    """
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            return dict(getattr(hdays_part2, country)(years=[year]))
+    except AttributeError:
+        try:
+            return dict(getattr(hdays_part1, country)(years=[year]))
+        except AttributeError:
+            raise AttributeError("Holidays in {} are not currently supported!".format(country))
+
+
+# process-wide holidays cache, shared by all models
+holiday_calendar = HolidayCalendar()
+
+
 def get_holidays_from_country(country, dates=None):
     """
     Return all possible holiday names of given country
@@ -180,16 +304,8 @@ def get_holidays_from_country(country, dates=None):
     if dates is None:
         years = np.arange(1995, 2045)
     else:
-        years = list({x.year for x in dates})
-    try:
-        with warnings.catch_warnings():
-            warnings.simplefilter("ignore")
-            holiday_names = getattr(hdays_part2, country)(years=years).values()
-    except AttributeError:
-        try:
-            holiday_names = getattr(hdays_part1, country)(years=years).values()
-        except AttributeError:
-            raise AttributeError("Holidays in {} are not currently supported!".format(country))
+        years = pd.DatetimeIndex(dates).year.unique()
+    _, holiday_names = holiday_calendar.get(country, years)
     return set(holiday_names)
 
 
@@ -323,6 +439,154 @@ def regressors_config_to_model_dims(regressors_config):
         return regressors_dims_dic
 
 
+class FeatureSchema:
+    """Column layout of model inputs packed into two arrays.
+
+    features: all per-step features (time, seasonalities, regressors, events),
+        concatenated along the last dimension. dims: (..., n_features)
+    lagged: all lagged series (lags, covariates), one channel each,
+        stacked along the last dimension. dims: (..., n_lags, n_lagged)
+    """
+
+    def __init__(self):
+        # (key, name) -> slice of columns in features
+        self.features = OrderedDict({})
+        # (key, name) -> (channel in lagged, number of last lags used as model inputs)
+        self.lagged = OrderedDict({})
+        self.n_features = 0
+        self.n_lagged = 0
+
+    def add_features(self, key, name=None, width=1):
+        """Append a component to the per-step features.
+
+        Args:
+            key (str): input type, e.g. 'seasonalities'
+            name (str): name within input type, e.g. 'yearly'. None for single inputs like 'time'
+            width (int): number of feature columns
+        """
+        self.features[(key, name)] = slice(self.n_features, self.n_features + width)
+        self.n_features += width
+
+    def add_lagged(self, key, name=None, n_inputs=1):
+        """Append a series to the lagged inputs.
+
+        Args:
+            key (str): input type, e.g. 'covariates'
+            name (str): name within input type. None for single inputs like 'lags'
+            n_inputs (int): number of most recent lags used as model inputs
+        """
+        self.lagged[(key, name)] = (self.n_lagged, n_inputs)
+        self.n_lagged += 1
+
+    def pack(self, inputs):
+        """Pack per-timestamp model inputs into 'features' and 'lagged'.
+
+        Args:
+            inputs (OrderedDict): per-timestamp inputs, nested like model inputs,
+                each np.array of dims (length, ...)
+
+        Returns:
+            packed (OrderedDict):
+                features (np.array, float32), dims: (length, n_features)
+                lagged (np.array, float32), dims: (length, n_lagged), only if lagged inputs are defined
+        """
+        length = inputs["time"].shape[0]
+        packed = OrderedDict({})
+        packed["features"] = np.zeros((length, self.n_features), dtype=np.float32)
+        for (key, name), columns in self.features.items():
+            if columns.stop > columns.start:
+                values = inputs[key] if name is None else inputs[key][name]
+                packed["features"][:, columns] = np.reshape(values, (length, -1))
+        if self.n_lagged > 0:
+            packed["lagged"] = np.zeros((length, self.n_lagged), dtype=np.float32)
+            for (key, name), (channel, n_inputs) in self.lagged.items():
+                packed["lagged"][:, channel] = inputs[key] if name is None else inputs[key][name]
+        return packed
+
+    def unpack(self, packed):
+        """Split packed model inputs into separate model inputs.
+
+        Args:
+            packed (dict): with
+                features (torch tensor, float), dims: (batch, n_forecasts, n_features)
+                lagged (torch tensor, float), dims: (batch, n_lags, n_lagged)
+                any other model inputs, which are passed through unchanged
+
+        Returns:
+            inputs (OrderedDict): model inputs, as views on the packed inputs.
+        """
+        inputs = OrderedDict({key: value for key, value in packed.items() if key not in ["features", "lagged"]})
+        for (key, name), columns in self.features.items():
+            if columns.stop == columns.start:
+                continue
+            if name is None:
+                inputs[key] = packed["features"][:, :, columns.start]
+            else:
+                if key not in inputs:
+                    inputs[key] = OrderedDict({})
+                inputs[key][name] = packed["features"][:, :, columns]
+        if "lagged" in packed:
+            for (key, name), (channel, n_inputs) in self.lagged.items():
+                lags = packed["lagged"][:, -n_inputs:, channel]
+                if name is None:
+                    inputs[key] = lags
+                else:
+                    if key not in inputs:
+                        inputs[key] = OrderedDict({})
+                    inputs[key][name] = lags
+        return inputs
+
+
+def feature_schema_from_configs(
+    season_config=None,
+    events_config=None,
+    country_holidays_config=None,
+    covar_config=None,
+    regressors_config=None,
+    n_lags=0,
+):
+    """Column layout of packed model inputs for the given NeuralProphet configuration.
+
+    Args:
+        season_config (configure.AllSeason): NeuralProphet seasonal model configuration
+        events_config (OrderedDict): Configurations (upper, lower windows, regularization) for user specified events
+        country_holidays_config (OrderedDict): Configurations (holiday_names, upper, lower windows, regularization)
+            for country specific holidays
+        covar_config (OrderedDict): Configurations for lagged regressors
+        regressors_config (OrderedDict): Configurations for user specified regressors
+        n_lags (int): number of lags of the auto-regression
+
+    Returns:
+        FeatureSchema
+    """
+    schema = FeatureSchema()
+    schema.add_features("time")
+    season_dims = season_config_to_model_dims(season_config)
+    if season_dims is not None and season_config.from_time:
+        # days since epoch, as float32 high and low parts, see tabular.tabularize_univariate_datetime
+        schema.add_features("days", "high")
+        schema.add_features("days", "low")
+    elif season_dims is not None:
+        for name, dim in season_dims.items():
+            schema.add_features("seasonalities", name, width=dim)
+    regressors_dims = regressors_config_to_model_dims(regressors_config)
+    if regressors_dims is not None:
+        for mode in ["additive", "multiplicative"]:
+            width = sum(configs["mode"] == mode for configs in regressors_dims.values())
+            schema.add_features("regressors", mode, width=width)
+    events_dims = events_config_to_model_dims(events_config, country_holidays_config)
+    if events_dims is not None:
+        for mode in ["additive", "multiplicative"]:
+            width = sum(len(configs["event_indices"]) for configs in events_dims.values() if configs["mode"] == mode)
+            schema.add_features("events", mode, width=width)
+    if n_lags > 0:
+        schema.add_lagged("lags", n_inputs=n_lags)
+        if covar_config is not None:
+            for name, configs in covar_config.items():
+                schema.add_lagged("covariates", name, n_inputs=1 if configs.as_scalar else n_lags)
+    return schema
+
+
 def set_auto_seasonalities(dates, season_config):
     """Set seasonalities that were left on auto or set by user.
 
@@ -473,5 +737,8 @@ def set_random_seed(seed=0):
     """Sets the random number generator to a fixed seed.
 
     Note: needs to be set each time before fitting the model."""
+    # imported on first use, such that the feature schema and holidays can be used without torch
+    import torch
+
     np.random.seed(seed)
     torch.manual_seed(seed)
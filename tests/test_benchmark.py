@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+
+import unittest
+from collections import OrderedDict
+import copy
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import pandas as pd
+import numpy as np
+import logging
+import torch
+from torch.utils.data import DataLoader
+from neuralprophet import NeuralProphet, df_utils, tabular, time_dataset, configure, utils, export, inference
+from test_unit import (
+    DIR,
+    PEYTON_FILE,
+    _prepare_dataset_args,
+    _make_timenet,
+    _tabularize_reference,
+    _fourier_series_reference,
+    _make_events_features_reference,
+    _trend_reference,
+    _loop_components,
+)
+
+log = logging.getLogger("nprophet.test.benchmark")
+log.setLevel("INFO")
+
+# the benchmarks only log timings and sizes, they run with NP_BENCHMARK=1 set
+BENCHMARK = os.environ.get("NP_BENCHMARK", "0") not in ["", "0"]
+
+
+def _time_per_call(fun, repeat=10, warmup=1):
+    """Mean wall time of calls of a function.
+
+    Args:
+        fun (callable): function without arguments
+        repeat (int): number of timed calls
+        warmup (int): number of calls before timing
+
+    Returns:
+        float: seconds per call
+    """
+    for _ in range(warmup):
+        fun()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fun()
+    return (time.perf_counter() - start) / repeat
+
+
+@unittest.skipUnless(BENCHMARK, "benchmarks run with NP_BENCHMARK=1")
+class BenchmarkTests(unittest.TestCase):
+    def test_tabularize_strided(self):
+        log.info("benchmark: Tabularize with strided windows")
+        df, kwargs = _prepare_dataset_args(n_lags=60, n_forecasts=30)
+        time_strided = _time_per_call(lambda: tabular.tabularize_univariate_datetime(df, **kwargs), repeat=3)
+        time_loop = _time_per_call(lambda: _tabularize_reference(df, kwargs), repeat=3)
+        log.info(
+            "Tabularize {} rows with 60 lags and 30 forecasts: strided {:.3f}s, python loop {:.3f}s".format(
+                len(df), time_strided, time_loop
+            )
+        )
+
+    def test_fourier_series(self):
+        log.info("benchmark: Fourier series recurrence at 10M timestamps")
+        # minutes since 2019, in days since epoch, computed in chunks to bound the memory of the reference
+        t = 17897.0 + np.arange(10000000) / 1440.0
+        chunk = 1000000
+        out = np.empty((chunk, 20), dtype=np.float32)
+        time_recurrence = _time_per_call(
+            lambda: [tabular.fourier_series_t(t[i : i + chunk], 365.25, 10, out=out) for i in range(0, len(t), chunk)],
+            repeat=1,
+        )
+        time_reference = _time_per_call(
+            lambda: [_fourier_series_reference(t[i : i + chunk], 365.25, 10) for i in range(0, len(t), chunk)],
+            repeat=1,
+        )
+        log.info(
+            "Fourier series of order 10 at {} timestamps/s, reference at {} timestamps/s".format(
+                int(len(t) / time_recurrence), int(len(t) / time_reference)
+            )
+        )
+
+    def test_make_events_features(self):
+        log.info("benchmark: Events features")
+        df, _ = _prepare_dataset_args(n_lags=1, n_forecasts=1)
+        m = NeuralProphet()
+        m = m.add_events("playoff", lower_window=-7, upper_window=7, mode="multiplicative")
+        m = m.add_events("superbowl", lower_window=-3, upper_window=0)
+        m = m.add_country_holidays("US", lower_window=-7, upper_window=7)
+        df["superbowl"] = 0.0
+        df.loc[5::365, "superbowl"] = 2.0
+        m.country_holidays_config["holiday_names"] = utils.get_holidays_from_country("US", df["ds"])
+        time_scatter = _time_per_call(
+            lambda: tabular.make_events_features(df, m.events_config, m.country_holidays_config), repeat=3
+        )
+        time_reference = _time_per_call(
+            lambda: _make_events_features_reference(df, m.events_config, m.country_holidays_config), repeat=3
+        )
+        log.info("Events features: scatter {:.3f}s, pandas {:.3f}s".format(time_scatter, time_reference))
+
+    def test_batch_loader(self):
+        log.info("benchmark: Epoch of a 100k-row series")
+        length = 100000
+        df = pd.DataFrame(
+            {"ds": pd.date_range(start="2000-01-01", periods=length, freq="H"), "y": np.sin(np.arange(length) / 24)}
+        )
+        data_params = df_utils.init_data_params(df, normalize="auto")
+        df = df_utils.normalize(df, data_params)
+        season_config = utils.set_auto_seasonalities(dates=df["ds"], season_config=configure.AllSeason())
+        dataset = time_dataset.TimeDataset(df, season_config=season_config, n_lags=24, n_forecasts=12)
+        batch_loader = time_dataset.make_loader(dataset, batch_size=128, shuffle=True)
+        sample_loader = DataLoader(dataset, batch_size=128, shuffle=True)
+        time_batch = _time_per_call(lambda: [batch for batch in batch_loader], repeat=1, warmup=0)
+        time_sample = _time_per_call(lambda: [batch for batch in sample_loader], repeat=1, warmup=0)
+        log.info(
+            "Epoch of {} samples: batch indexing {:.3f}s, per-sample indexing {:.3f}s".format(
+                len(dataset), time_batch, time_sample
+            )
+        )
+
+    def test_fused_seasonalities(self):
+        log.info("benchmark: Fused seasonalities")
+        df = pd.read_csv(PEYTON_FILE, nrows=512)
+        m = NeuralProphet(yearly_seasonality=True, daily_seasonality=True)
+        m = m.add_seasonality("monthly", period=30.5, fourier_order=5)
+        m = m.add_seasonality("quarterly", period=91.3, fourier_order=4)
+        df = df_utils.check_dataframe(df)
+        df = df_utils.normalize(df, df_utils.init_data_params(df, normalize="auto"))
+        season_config = utils.set_auto_seasonalities(dates=df["ds"].copy(deep=True), season_config=m.season_config)
+        model = _make_timenet(config_season=season_config)
+        dataset = time_dataset.TimeDataset(df, season_config=season_config)
+        s = dataset[torch.arange(len(dataset))][0]["seasonalities"]
+        time_separate = _time_per_call(
+            lambda: sum(model.seasonality(features, name) for name, features in s.items()), repeat=100
+        )
+        time_fused = _time_per_call(lambda: model.all_seasonalities(s), repeat=100)
+        log.info(
+            "Seasonalities fused in {:.4f}ms, separately in {:.4f}ms".format(1000 * time_fused, 1000 * time_separate)
+        )
+
+    def test_piecewise_trend(self):
+        log.info("benchmark: Bucketized piecewise linear trend")
+        torch.manual_seed(0)
+        model = _make_timenet(n_changepoints=200)
+        t = torch.rand(1024, 24)
+        time_reference = _time_per_call(lambda: _trend_reference(model, t), repeat=20)
+        time_bucketized = _time_per_call(lambda: model.trend(t), repeat=20)
+        log.info(
+            "Trend with 200 changepoints in {:.3f}ms, one-hot reference in {:.3f}ms".format(
+                1000 * time_bucketized, 1000 * time_reference
+            )
+        )
+
+    def test_batched_covariates(self):
+        log.info("benchmark: Batched lagged regressors")
+        n_lags, n_forecasts, batch = 14, 7, 256
+        config_covar = OrderedDict(
+            ("covar_{}".format(i), configure.Covar(reg_lambda=None, as_scalar=i % 5 == 0, normalize="auto"))
+            for i in range(50)
+        )
+        torch.manual_seed(0)
+        covariates = OrderedDict(
+            (name, torch.randn(batch, 1 if configs.as_scalar else n_lags)) for name, configs in config_covar.items()
+        )
+        model = _make_timenet(
+            n_changepoints=0, config_covar=config_covar, n_forecasts=n_forecasts, n_lags=n_lags, num_hidden_layers=2
+        )
+        time_separate = _time_per_call(
+            lambda: sum(model.covariate(lags, name) for name, lags in covariates.items()), repeat=20
+        )
+        time_batched = _time_per_call(lambda: model.all_covariates(covariates), repeat=20)
+        log.info(
+            "50 lagged regressors batched in {:.3f}ms, separately in {:.3f}ms".format(
+                1000 * time_batched, 1000 * time_separate
+            )
+        )
+
+    def test_dedup_steps(self):
+        log.info("benchmark: Deduplicated per-step features")
+        df, kwargs = _prepare_dataset_args(n_lags=14, n_forecasts=28, nrows=512)
+        torch.manual_seed(0)
+        model = _make_timenet(kwargs, sparse_events=True)
+        windowed = time_dataset.TimeDataset(df, packed=True, sparse_events=True, **kwargs)
+        dedup = time_dataset.TimeDataset(df, packed=True, sparse_events=True, dedup_steps=True, **kwargs)
+        stored = OrderedDict({})
+        for name, dataset in [("windowed", windowed), ("deduplicated", dedup)]:
+            source = dataset.sources[("features", None)]
+            stored[name] = source["windows"].array.nbytes if "windows" in source else source["base"].array.nbytes
+        inputs, _ = windowed[torch.arange(len(windowed))]
+        inputs_dedup, _ = dedup[torch.arange(len(dedup))]
+        with torch.no_grad():
+            time_windowed = _time_per_call(lambda: model.forward_with_components(inputs))
+            time_dedup = _time_per_call(lambda: model.forward_with_components(inputs_dedup))
+        log.info(
+            "Per-step features stored: {} bytes deduplicated, {} bytes windowed".format(
+                stored["deduplicated"], stored["windowed"]
+            )
+        )
+        log.info(
+            "Forward with components: deduplicated {:.3f}ms, windowed {:.3f}ms".format(
+                1000 * time_dedup, 1000 * time_windowed
+            )
+        )
+
+    def test_attributed_components(self):
+        log.info("benchmark: Attribution of event and regressor components")
+        n_forecasts, batch = 7, 256
+        m = NeuralProphet(n_forecasts=n_forecasts)
+        for i in range(100):
+            m = m.add_events(
+                "event_{}".format(i), lower_window=-2, upper_window=2, mode=["additive", "multiplicative"][i % 2]
+            )
+        for i in range(20):
+            m = m.add_future_regressor("regressor_{}".format(i), mode=["additive", "multiplicative"][i % 3 == 0])
+        model = _make_timenet(
+            n_changepoints=0,
+            config_events=m.events_config,
+            config_regressors=m.regressors_config,
+            n_forecasts=n_forecasts,
+        )
+        torch.manual_seed(0)
+        inputs = {"time": torch.rand(batch, n_forecasts), "events": {}, "regressors": {}}
+        for mode in ["additive", "multiplicative"]:
+            n_events = model.event_params[mode].shape[0]
+            inputs["events"][mode] = (torch.rand(batch, n_forecasts, n_events) < 0.02).float()
+            inputs["regressors"][mode] = torch.randn(batch, n_forecasts, model.regressor_params[mode].shape[0])
+        with torch.no_grad():
+            time_loop = _time_per_call(lambda: _loop_components(model, inputs))
+            time_attributed = _time_per_call(lambda: model.compute_components(inputs))
+        log.info(
+            "100 events and 20 regressors: attributed in {:.3f}ms, in a loop {:.3f}ms".format(
+                1000 * time_attributed, 1000 * time_loop
+            )
+        )
+
+    def test_torchscript(self):
+        log.info("benchmark: TorchScript export")
+        df, kwargs = _prepare_dataset_args(n_lags=14, n_forecasts=7, nrows=512)
+        torch.manual_seed(0)
+        model = _make_timenet(kwargs, sparse_events=True)
+        dataset = time_dataset.TimeDataset(df, packed=True, sparse_events=True, **kwargs)
+        scripted = export.to_torchscript(model)
+
+        # latency for single windows and batches of 1024
+        for batch_size in [1, 1024]:
+            inputs, _ = dataset[torch.arange(batch_size) % len(dataset)]
+            scripted_inputs = export.inference_inputs(model, inputs)
+            with torch.no_grad():
+                time_eager = _time_per_call(lambda: model.forward_with_components(inputs), repeat=50)
+                # the first calls of a scripted module profile and optimize it
+                time_scripted = _time_per_call(lambda: scripted(*scripted_inputs), repeat=50, warmup=3)
+            log.info(
+                "Batch of {}: TorchScript {:.3f}ms, eager {:.3f}ms".format(
+                    batch_size, 1000 * time_scripted, 1000 * time_eager
+                )
+            )
+
+    def test_numpy_inference(self):
+        log.info("benchmark: NumPy inference")
+        df, kwargs = _prepare_dataset_args(n_lags=14, n_forecasts=7, nrows=512)
+        kwargs["covar_config"]["B_lagged"] = configure.Covar(reg_lambda=None, as_scalar=True, normalize="auto")
+        df["B_lagged"] = df["B"]
+        torch.manual_seed(0)
+        model = _make_timenet(kwargs, sparse_events=True)
+        dataset = time_dataset.TimeDataset(df, packed=True, sparse_events=True, **kwargs)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "model.npz")
+            export.to_numpy(model, path)
+            net = inference.NumpyNet.load(path)
+
+        # latency for single windows and batches of 1024
+        for batch_size in [1, 1024]:
+            inputs, _ = dataset[torch.arange(batch_size) % len(dataset)]
+            numpy_inputs = [value.numpy() for value in export.inference_inputs(model, inputs)]
+            with torch.no_grad():
+                time_torch = _time_per_call(lambda: model.forward_with_components(inputs), repeat=50)
+            time_numpy = _time_per_call(lambda: net.forward(*numpy_inputs), repeat=50)
+            log.info(
+                "Batch of {}: NumPy {:.3f}ms, torch {:.3f}ms".format(batch_size, 1000 * time_numpy, 1000 * time_torch)
+            )
+
+        # startup of a fresh interpreter, importing the inference module does not load torch
+        times = OrderedDict({})
+        for name, statement in [
+            ("inference", "import neuralprophet.inference"),
+            ("forecaster", "from neuralprophet import NeuralProphet"),
+        ]:
+            script = "import sys; {}; print('torch' in sys.modules)".format(statement)
+            times[name] = _time_per_call(
+                lambda: subprocess.run([sys.executable, "-c", script], cwd=DIR, capture_output=True, check=True),
+                repeat=3,
+            )
+        log.info("Startup: NumPy inference {:.3f}s, NeuralProphet {:.3f}s".format(*times.values()))
+
+    def test_lagged_linear_components(self):
+        log.info("benchmark: Lagged components as FFT filters of a long series")
+        n_lags, n_forecasts, length = 2000, 1, 100000
+        model = _make_timenet(growth="off", n_changepoints=0, n_forecasts=n_forecasts, n_lags=n_lags)
+        lagged = np.random.randn(length, 1).astype(np.float32)
+        windows = torch.from_numpy(lagged[:, 0]).unfold(0, n_lags, 1)
+        with torch.no_grad():
+            time_windows = _time_per_call(
+                lambda: [model.auto_regression(windows[i : i + 1024]) for i in range(0, len(windows), 1024)], repeat=1
+            )
+        time_fft = _time_per_call(lambda: model.lagged_linear_components(lagged), repeat=1)
+        log.info(
+            "AR of {} windows of {} lags: FFT {:.3f}s, windows {:.3f}s".format(
+                len(windows), n_lags, time_fft, time_windows
+            )
+        )
+
+    def test_seasonality_from_time(self):
+        log.info("benchmark: Seasonal features computed from time")
+        df = pd.read_csv(PEYTON_FILE)
+        df = df_utils.check_dataframe(df)
+        df = df_utils.normalize(df, df_utils.init_data_params(df, normalize="auto"))
+        stored = OrderedDict({})
+        for from_time in [True, False]:
+            season_config = configure.AllSeason(from_time=from_time, daily_arg=True)
+            season_config.append(name="monthly", period=30.5, resolution=4, arg=True)
+            season_config = utils.set_auto_seasonalities(dates=df["ds"].copy(deep=True), season_config=season_config)
+            dataset = time_dataset.TimeDataset(
+                df, season_config=season_config, packed=True, n_lags=0, n_forecasts=1, predict_mode=True
+            )
+            stored[from_time] = dataset.sources[("features", None)]["base"].array.nbytes
+        log.info(
+            "Per-step features of {} timestamps: {:.1f}kB from time, {:.1f}kB with seasonal features".format(
+                len(df), stored[True] / 1024, stored[False] / 1024
+            )
+        )
+
+    def test_quantize(self):
+        log.info("benchmark: Quantized AR-Net and covariate nets")
+        df = pd.read_csv(PEYTON_FILE)
+        df["A"] = df["y"].rolling(7, min_periods=1).mean()
+        m = NeuralProphet(n_forecasts=7, n_lags=60, num_hidden_layers=2, d_hidden=64, epochs=2)
+        m = m.add_lagged_regressor(name="A")
+        m.fit(df, freq="D")
+        dense = copy.deepcopy(m.model)
+        m.quantize()
+        dataset = m._create_dataset(df_utils.normalize(df_utils.check_dataframe(df), m.data_params), False)
+        loader = time_dataset.make_loader(dataset, batch_size=len(dataset), shuffle=False, drop_last=False)
+        inputs, _ = next(iter(loader))
+        for name, model in [("dense", dense), ("quantized", m.model)]:
+            with torch.no_grad():
+                latency = _time_per_call(lambda: model(inputs))
+            size = 0
+            for net in [model.ar_net, model.covar_nets]:
+                buffer = io.BytesIO()
+                torch.save(net.state_dict(), buffer)
+                size += buffer.tell()
+            log.info(
+                "{}: batch of {} in {:.3f}ms, lagged nets {} bytes".format(name, len(dataset), 1000 * latency, size)
+            )
@@ -1,15 +1,28 @@
 #!/usr/bin/env python3
 
 import unittest
+import copy
+import io
 import os
 import pathlib
+import pickle
+import tempfile
+import tracemalloc
+from collections import OrderedDict
+from unittest import mock
 import pandas as pd
+import numpy as np
 import matplotlib.pyplot as plt
 import logging
-from neuralprophet import NeuralProphet, set_random_seed
+from neuralprophet import NeuralProphet, set_random_seed, df_utils, export, inference, tabular, time_dataset
 import math
 import torch
 
+try:
+    import onnxruntime
+except ImportError:
+    onnxruntime = None
+
 log = logging.getLogger("nprophet.test")
 log.setLevel("WARNING")
 log.parent.setLevel("WARNING")
@@ -312,6 +325,345 @@ class IntegrationTests(unittest.TestCase):
             m.plot_parameters()
             plt.show()
 
+    def test_predict_lazy_dataset(self):
+        log.info("testing: Predict with lazy dataset")
+        df = pd.read_csv(PEYTON_FILE, nrows=512)
+        forecasts = []
+        for lazy_dataset in [False, True]:
+            set_random_seed(0)
+            m = NeuralProphet(
+                n_forecasts=7,
+                n_lags=14,
+                epochs=2,
+            )
+            metrics_df = m.fit(df, freq="D", lazy_dataset=lazy_dataset)
+            future = m.make_future_dataframe(df, periods=None, n_historic_predictions=len(df) - m.n_lags)
+            forecasts.append(m.predict(future, lazy_dataset=lazy_dataset))
+        pd.testing.assert_frame_equal(forecasts[0], forecasts[1])
+
+    def test_dataset_cache(self):
+        log.info("testing: Fit and predict with dataset cache")
+        df = pd.read_csv(PEYTON_FILE, nrows=512)
+        forecasts = []
+        with tempfile.TemporaryDirectory() as cache_dir:
+            for dataset_cache_dir in [None, cache_dir, cache_dir]:
+                set_random_seed(0)
+                m = NeuralProphet(
+                    n_forecasts=7,
+                    n_lags=14,
+                    epochs=2,
+                    dataset_cache_dir=dataset_cache_dir,
+                )
+                metrics_df = m.fit(df, freq="D")
+                future = m.make_future_dataframe(df, periods=None, n_historic_predictions=len(df) - m.n_lags)
+                forecasts.append(m.predict(future))
+            # only the training dataset is cached
+            assert len(os.listdir(cache_dir)) == 1
+        pd.testing.assert_frame_equal(forecasts[0], forecasts[1])
+        pd.testing.assert_frame_equal(forecasts[0], forecasts[2])
+
+    def test_fit_append(self):
+        log.info("testing: Refit with appended observations")
+        df = pd.read_csv(PEYTON_FILE, nrows=512)
+        m = NeuralProphet(n_forecasts=7, n_lags=14, epochs=2)
+        m = m.add_country_holidays("US", lower_window=-1, upper_window=1)
+        m.fit(df.iloc[:400], freq="D")
+        assert m.train_dataset is None
+        with self.assertRaises(ValueError):
+            m.fit(df.iloc[400:], freq="D", append=True)
+        m.fit(df.iloc[:400], freq="D", keep_dataset=True)
+        m.fit(df.iloc[400:], freq="D", append=True)
+        full = m._create_dataset(df_utils.normalize(m._handle_missing_data(df), m.data_params), predict_mode=False)
+        assert len(m.train_dataset) == len(full)
+        inputs_f, targets_f = full[torch.arange(len(full))]
+        inputs_a, targets_a = m.train_dataset[torch.arange(len(full))]
+        assert torch.equal(targets_f, targets_a)
+        assert torch.equal(inputs_f["features"], inputs_a["features"])
+        assert torch.equal(inputs_f["lagged"], inputs_a["lagged"])
+        for mode, features in inputs_f["events"].items():
+            assert torch.equal(features.to_dense(), inputs_a["events"][mode].to_dense())
+        with self.assertRaises(ValueError):
+            m.fit(df.iloc[450:], freq="D", append=True)
+        # the kept dataset is not pickled
+        assert pickle.loads(pickle.dumps(m)).train_dataset is None
+        future = m.make_future_dataframe(df, periods=None, n_historic_predictions=10)
+        m.predict(future)
+
+    def test_predict_torchscript(self):
+        log.info("testing: Predict with TorchScript")
+        df = pd.read_csv(PEYTON_FILE, nrows=512)
+        df["A"] = df["y"].rolling(7, min_periods=1).mean()
+        m = NeuralProphet(n_forecasts=7, n_lags=14, epochs=2)
+        m = m.add_lagged_regressor(name="A")
+        m = m.add_country_holidays("US", mode="multiplicative")
+        m.fit(df, freq="D")
+        future = m.make_future_dataframe(df, periods=None, n_historic_predictions=len(df) - m.n_lags)
+        forecast = m.predict(future)
+        forecast_scripted = m.predict(future, torchscript=True)
+        pd.testing.assert_frame_equal(forecast, forecast_scripted, check_exact=False, rtol=1e-4, atol=1e-4)
+        # pickled without the compiled model, which is compiled again
+        m_loaded = pickle.loads(pickle.dumps(m))
+        assert m_loaded.scripted_model is None
+        forecast_loaded = m_loaded.predict(future, torchscript=True)
+        pd.testing.assert_frame_equal(forecast, forecast_loaded, check_exact=False, rtol=1e-4, atol=1e-4)
+
+    def test_predict_fft_lags(self):
+        log.info("testing: Predict with FFT filters of the lagged series")
+        df = pd.read_csv(PEYTON_FILE, nrows=1024)
+        df["A"] = df["y"].rolling(7, min_periods=1).mean()
+        m = NeuralProphet(n_forecasts=7, n_lags=500, epochs=2)
+        m = m.add_lagged_regressor(name="A")
+        m = m.add_country_holidays("US", mode="multiplicative")
+        m.fit(df, freq="D")
+        future = m.make_future_dataframe(df, periods=7, n_historic_predictions=True)
+        forecast = m.predict(future)
+        forecast_fft = m.predict(future, fft_lags=True)
+        pd.testing.assert_frame_equal(forecast, forecast_fft, check_exact=False, rtol=1e-4, atol=1e-4)
+        with self.assertRaises(ValueError):
+            m.predict(future, torchscript=True, fft_lags=True)
+
+        m = NeuralProphet(n_forecasts=7, n_lags=14, epochs=1, num_hidden_layers=1)
+        m.fit(df[["ds", "y"]], freq="D")
+        with self.assertRaises(ValueError):
+            m.predict(m.make_future_dataframe(df[["ds", "y"]]), fft_lags=True)
+
+    def test_quantize(self):
+        log.info("testing: Quantize AR-Net and covariate nets")
+        df = pd.read_csv(PEYTON_FILE)
+        df["A"] = df["y"].rolling(7, min_periods=1).mean()
+        df_train, df_test = df.iloc[:-400], df.iloc[-400:]
+        m = NeuralProphet(n_forecasts=7, n_lags=60, num_hidden_layers=2, d_hidden=64, epochs=EPOCHS)
+        m = m.add_lagged_regressor(name="A")
+        m.fit(df_train, freq="D")
+        metrics_dense = m.test(df_test)
+        dense = copy.deepcopy(m.model)
+        m.quantize()
+        metrics_quantized = m.test(df_test)
+        log.debug("Dense: {}".format(metrics_dense.to_dict("records")))
+        log.debug("Quantized: {}".format(metrics_quantized.to_dict("records")))
+        assert metrics_quantized["MAE"][0] < 1.05 * metrics_dense["MAE"][0]
+        with self.assertRaises(ValueError):
+            m.fit(df_train, freq="D")
+
+        future = m.make_future_dataframe(df_test, periods=None, n_historic_predictions=len(df_test) - m.n_lags)
+        forecast = m.predict(future)
+        assert not forecast["yhat1"].iloc[m.n_lags : -m.n_forecasts].isna().any()
+
+        # the quantized lagged nets are smaller
+        sizes = []
+        for model in [dense, m.model]:
+            buffer = io.BytesIO()
+            for net in [model.ar_net, model.covar_nets]:
+                torch.save(net.state_dict(), buffer)
+            sizes.append(buffer.tell())
+        log.debug("Lagged nets: {} bytes dense, {} bytes quantized".format(*sizes))
+        assert sizes[1] < sizes[0]
+
+    def test_prune_lags(self):
+        log.info("testing: Prune lags after training with ar_sparsity")
+        set_random_seed(0)
+        # AR process with two relevant lags
+        rng = np.random.RandomState(0)
+        y = np.zeros(2000)
+        for i in range(7, len(y)):
+            y[i] = 0.5 * y[i - 1] + 0.4 * y[i - 7] + rng.normal()
+        df = pd.DataFrame({"ds": pd.date_range("2000-01-01", periods=len(y), freq="D"), "y": y})
+        df_train, df_test = df.iloc[:-400], df.iloc[-400:]
+        m = NeuralProphet(
+            n_forecasts=1,
+            n_lags=100,
+            ar_sparsity=0.3,
+            n_changepoints=0,
+            yearly_seasonality=False,
+            weekly_seasonality=False,
+            epochs=20,
+        )
+        m.fit(df_train, freq="D")
+        metrics_dense = m.test(df_test)
+        m.prune_lags(threshold=1e-3)
+        metrics_pruned = m.test(df_test)
+        n_kept = m.model.ar_net[0].in_features
+        log.debug("Dense: {}".format(metrics_dense.to_dict("records")))
+        log.debug("Pruned to {} lags: {}".format(n_kept, metrics_pruned.to_dict("records")))
+        assert n_kept < m.n_lags
+        assert metrics_pruned["MAE"][0] < 1.05 * metrics_dense["MAE"][0]
+
+        future = m.make_future_dataframe(df_test, periods=None, n_historic_predictions=len(df_test) - m.n_lags)
+        forecast = m.predict(future)
+        forecast_scripted = m.predict(future, torchscript=True)
+        pd.testing.assert_frame_equal(forecast, forecast_scripted, check_exact=False, rtol=1e-4, atol=1e-4)
+
+    def test_predict_numpy(self):
+        log.info("testing: Predict with the NumPy inference module")
+        df = pd.read_csv(PEYTON_FILE, nrows=512)
+        # without missing dates, such that the future dataframe extends the original one
+        df["ds"] = pd.date_range(start=df["ds"][0], periods=len(df), freq="D")
+        df["A"] = df["y"].rolling(7, min_periods=1).mean()
+        m = NeuralProphet(n_forecasts=7, n_lags=14, epochs=2, num_hidden_layers=1, d_hidden=8)
+        m = m.add_lagged_regressor(name="A")
+        m = m.add_country_holidays("US")
+        m.fit(df, freq="D")
+        future = m.make_future_dataframe(df, periods=None, n_historic_predictions=len(df) - m.n_lags)
+        forecast = m.predict(future)
+
+        dataset = m._create_dataset(future, predict_mode=True)
+        loader = time_dataset.make_loader(dataset, batch_size=len(dataset), shuffle=False, drop_last=False)
+        inputs, _ = next(iter(loader))
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "model.npz")
+            export.to_numpy(m.model, path, data_params=m.data_params)
+            net = inference.NumpyNet.load(path)
+        predicted, components = net.predict(*[value.numpy() for value in export.inference_inputs(m.model, inputs)])
+        # built from the original dataframe, without the samples extending into the future
+        predicted_df, _ = net.predict_df(df)
+        np.testing.assert_allclose(predicted_df, predicted[: len(predicted_df)], rtol=1e-5, atol=1e-5)
+        for i in range(m.n_forecasts):
+            rows = slice(m.n_lags + i, m.n_lags + i + len(predicted))
+            np.testing.assert_allclose(
+                predicted[:, i], forecast["yhat{}".format(i + 1)].values[rows].astype(float), rtol=1e-4, atol=1e-4
+            )
+            np.testing.assert_allclose(
+                components["ar"][:, i], forecast["ar{}".format(i + 1)].values[rows].astype(float), rtol=1e-4, atol=1e-4
+            )
+        # other components, as forecast from the first sample and then by the last step of each sample
+        for name in ["trend", "season_weekly", "event_Christmas Day"]:
+            expected = forecast[name].values[m.n_lags :].astype(float)
+            value = np.concatenate((components[name][0, :], components[name][1:, -1]))
+            np.testing.assert_allclose(value, expected, rtol=1e-4, atol=1e-4)
+
+    @unittest.skipIf(onnxruntime is None, "onnxruntime not installed")
+    def test_predict_onnx(self):
+        log.info("testing: Predict with the ONNX export")
+        df = pd.read_csv(PEYTON_FILE, nrows=512)
+        df["A"] = df["y"].rolling(7, min_periods=1).mean()
+        m = NeuralProphet(n_forecasts=7, n_lags=14, epochs=2)
+        m = m.add_lagged_regressor(name="A")
+        m = m.add_country_holidays("US", mode="multiplicative")
+        m.fit(df, freq="D")
+        future = m.make_future_dataframe(df, periods=None, n_historic_predictions=len(df) - m.n_lags)
+        forecast = m.predict(future)
+
+        dataset = m._create_dataset(future, predict_mode=True)
+        loader = time_dataset.make_loader(dataset, batch_size=len(dataset), shuffle=False, drop_last=False)
+        inputs, _ = next(iter(loader))
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "model.onnx")
+            schema = export.to_onnx(m.model, path)
+            session = onnxruntime.InferenceSession(path, providers=["CPUExecutionProvider"])
+            outputs = session.run(None, export.onnx_inputs(m.model, inputs))
+        assert [output.name for output in session.get_outputs()] == schema["outputs"]
+        predicted = outputs[0] * m.data_params["y"].scale + m.data_params["y"].shift
+        for i in range(m.n_forecasts):
+            expected = (
+                forecast["yhat{}".format(i + 1)].values[m.n_lags + i : m.n_lags + i + len(predicted)].astype(float)
+            )
+            np.testing.assert_allclose(predicted[:, i], expected, rtol=1e-4, atol=1e-4)
+
+    def test_seasonality_from_time(self):
+        log.info("testing: Seasonality computed from time")
+        df = pd.read_csv(PEYTON_FILE, nrows=1000)
+        forecasts, seasonal = [], []
+        for seasonality_from_time in [False, True]:
+            set_random_seed(0)
+            m = NeuralProphet(n_forecasts=7, n_lags=14, epochs=2, seasonality_from_time=seasonality_from_time)
+            m.fit(df, freq="D")
+            future = m.make_future_dataframe(df, periods=7, n_historic_predictions=len(df) - m.n_lags)
+            forecasts.append(m.predict(future))
+            # seasonal components of dates alone, as plotted
+            seasonal.append(m.predict_seasonal_components(future[["ds"]]))
+        # time and the float32 high and low parts of the days since epoch
+        assert m.model.feature_schema.n_features == 3
+        # same fit up to float32 precision
+        for name in ["yhat1", "yhat7", "season_weekly", "season_yearly"]:
+            np.testing.assert_allclose(
+                forecasts[1][name].values.astype(float), forecasts[0][name].values.astype(float), atol=1e-3
+            )
+        for name in ["weekly", "yearly"]:
+            np.testing.assert_allclose(seasonal[1][name].values, seasonal[0][name].values, atol=1e-3)
+
+        dataset = m._create_dataset(future, predict_mode=True)
+        loader = time_dataset.make_loader(dataset, batch_size=len(dataset), shuffle=False, drop_last=False)
+        inputs, _ = next(iter(loader))
+        with torch.no_grad():
+            expected = m.model(inputs).numpy()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "model.npz")
+            export.to_numpy(m.model, path)
+            predicted, _ = inference.NumpyNet.load(path).forward(
+                *[value.numpy() for value in export.inference_inputs(m.model, inputs)]
+            )
+            np.testing.assert_allclose(predicted, expected, rtol=1e-4, atol=1e-4)
+            if onnxruntime is not None:
+                path = os.path.join(tmpdir, "model.onnx")
+                export.to_onnx(m.model, path)
+                session = onnxruntime.InferenceSession(path, providers=["CPUExecutionProvider"])
+                outputs = session.run(None, export.onnx_inputs(m.model, inputs))
+                np.testing.assert_allclose(outputs[0], expected, rtol=1e-4, atol=1e-4)
+
+    def test_fit_float32(self):
+        log.info("testing: Fit without float64 intermediates")
+        df = pd.read_csv(PEYTON_FILE)
+        n_lags = 100
+
+        def record(fun, outputs):
+            def wrapper(*args, **kwargs):
+                out = fun(*args, **kwargs)
+                outputs.append((args, out))
+                return out
+
+            return wrapper
+
+        def arrays(value):
+            if isinstance(value, dict):
+                return [array for item in value.values() for array in arrays(item)]
+            return [value] if isinstance(value, np.ndarray) else []
+
+        # the first fit imports modules, which is not part of the traced memory
+        NeuralProphet(n_lags=n_lags, n_forecasts=24, epochs=1).fit(df.iloc[:512], freq="D", use_tqdm=False)
+        for lazy_dataset in [False, True]:
+            m = NeuralProphet(n_lags=n_lags, n_forecasts=24, epochs=1)
+            tabular.fourier_cache.clear()
+            calls = OrderedDict((name, []) for name in ["normalize", "tabularize", "fourier_series_t", "dataset"])
+            with mock.patch.object(
+                df_utils, "normalize", new=record(df_utils.normalize, calls["normalize"])
+            ), mock.patch.object(
+                time_dataset,
+                "tabularize_univariate_datetime",
+                new=record(time_dataset.tabularize_univariate_datetime, calls["tabularize"]),
+            ), mock.patch.object(
+                tabular, "fourier_series_t", new=record(tabular.fourier_series_t, calls["fourier_series_t"])
+            ), mock.patch.object(
+                m, "_create_dataset", new=record(m._create_dataset, calls["dataset"])
+            ):
+                tracemalloc.start()
+                try:
+                    m.fit(df, freq="D", use_tqdm=False, lazy_dataset=lazy_dataset)
+                    peak = tracemalloc.get_traced_memory()[1]
+                finally:
+                    tracemalloc.stop()
+            assert all(len(value) > 0 for value in calls.values())
+            # windows of float64 would take at least 8 * n_lags bytes per row, the fit takes O(len(df)) memory
+            log.debug("Peak of traced memory during fit: {} bytes per row".format(peak // len(df)))
+            assert peak < 8 * n_lags * len(df)
+            for _, df_normalized in calls["normalize"]:
+                assert df_normalized["t"].dtype == np.float32 and df_normalized["y_scaled"].dtype == np.float32
+            for _, (inputs, targets) in calls["tabularize"]:
+                for array in arrays(inputs) + [targets]:
+                    assert array.dtype == np.float32
+            # the Fourier features are computed from the dates in float64, and stored in float32
+            for (t, *_), features in calls["fourier_series_t"]:
+                assert np.asarray(t).dtype == np.float64 and np.asarray(t).ndim == 1
+                assert features.dtype == np.float32
+            for _, dataset in calls["dataset"]:
+                for (key, name), source in dataset.sources.items():
+                    if "base" in source:
+                        assert source["base"].array.dtype == np.float32, (key, name)
+                assert dataset.targets.dtype == torch.float
+                for key, value in dataset.inputs.items():
+                    assert value.dtype == torch.float
+                    # lazy inputs and deduplicated per-step features wrap the per-timestamp arrays without copies
+                    assert (value.stride()[0] == value.stride()[1]) == (lazy_dataset or key == "features")
+
     def test_plot(self):
         log.info("testing: Plotting")
         df = pd.read_csv(PEYTON_FILE, nrows=512)
@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 
 import unittest
+from collections import OrderedDict
 import os
 import pathlib
 import math
@@ -8,11 +9,23 @@ import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import logging
+import subprocess
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+import torch
+from torch.utils.data import DataLoader
 from neuralprophet import (
     NeuralProphet,
     df_utils,
+    tabular,
     time_dataset,
+    time_net,
     configure,
+    utils,
+    export,
+    inference,
 )
 
 log = logging.getLogger("nprophet.test")
@@ -25,6 +38,219 @@ PEYTON_FILE = os.path.join(DATA_DIR, "wp_log_peyton_manning.csv")
 AIR_FILE = os.path.join(DATA_DIR, "air_passengers.csv")
 
 
+def _prepare_dataset_args(n_lags, n_forecasts, nrows=None):
+    """Normalized peyton manning df with lagged and future regressors, events and holidays.
+
+    Returns:
+        df (pd.DataFrame): normalized data
+        kwargs (dict): arguments for tabularize_univariate_datetime
+    """
+    df = pd.read_csv(PEYTON_FILE, nrows=nrows)
+    df["A"] = df["y"].rolling(7, min_periods=1).mean()
+    df["B"] = df["y"].rolling(30, min_periods=1).mean()
+    df["playoff"] = 0.0
+    df.loc[::97, "playoff"] = 1.0
+    m = NeuralProphet(n_lags=n_lags, n_forecasts=n_forecasts)
+    m = m.add_lagged_regressor(name="A")
+    m = m.add_future_regressor(name="B", mode="multiplicative")
+    m = m.add_events("playoff", lower_window=-1, upper_window=2)
+    m = m.add_country_holidays("US", mode="multiplicative")
+    df = df_utils.check_dataframe(df, covariates=m.config_covar, regressors=m.regressors_config, events=m.events_config)
+    data_params = df_utils.init_data_params(
+        df,
+        normalize="auto",
+        covariates_config=m.config_covar,
+        regressor_config=m.regressors_config,
+        events_config=m.events_config,
+    )
+    df = df_utils.normalize(df, data_params)
+    season_config = utils.set_auto_seasonalities(dates=df["ds"].copy(deep=True), season_config=m.season_config)
+    m.country_holidays_config["holiday_names"] = utils.get_holidays_from_country("US", df["ds"])
+    kwargs = dict(
+        season_config=season_config,
+        n_lags=n_lags,
+        n_forecasts=n_forecasts,
+        events_config=m.events_config,
+        country_holidays_config=m.country_holidays_config,
+        covar_config=m.config_covar,
+        regressors_config=m.regressors_config,
+    )
+    return df, kwargs
+
+
+def _make_timenet(kwargs=None, growth="linear", n_changepoints=5, trend_reg=0, **overrides):
+    """TimeNet with a trend, and with the configs of a dataset if given.
+
+    Args:
+        kwargs (dict): arguments for tabularize_univariate_datetime, as returned by _prepare_dataset_args
+        growth (str): growth of the trend
+        n_changepoints (int): number of changepoints of the trend
+        trend_reg (float): regularization of the trend
+        **overrides (): other arguments of TimeNet
+
+    Returns:
+        TimeNet
+    """
+    args = dict(
+        config_trend=configure.Trend(
+            growth=growth,
+            changepoints=None,
+            n_changepoints=n_changepoints,
+            changepoints_range=0.8,
+            trend_reg=trend_reg,
+            trend_reg_threshold=False,
+        )
+    )
+    if kwargs is not None:
+        args.update(
+            config_season=kwargs["season_config"],
+            config_covar=kwargs["covar_config"],
+            config_regressors=kwargs["regressors_config"],
+            config_events=kwargs["events_config"],
+            config_holidays=kwargs["country_holidays_config"],
+            n_forecasts=kwargs["n_forecasts"],
+            n_lags=kwargs["n_lags"],
+        )
+    args.update(overrides)
+    return time_net.TimeNet(**args)
+
+
+def _assert_inputs_equal(inputs, other):
+    """Assert that two batches of model inputs are identical, comparing sparse features densely.
+
+    Args:
+        inputs (dict): model inputs, nested like the inputs of TimeNet
+        other (dict): model inputs, nested like the inputs of TimeNet
+    """
+    assert inputs.keys() == other.keys()
+    for key, value in inputs.items():
+        if isinstance(value, dict):
+            assert value.keys() == other[key].keys(), key
+            for name, features in value.items():
+                other_features = other[key][name]
+                assert features.dtype == other_features.dtype, (key, name)
+                if features.is_sparse:
+                    features, other_features = features.to_dense(), other_features.to_dense()
+                assert torch.equal(features, other_features), (key, name)
+        else:
+            assert value.dtype == other[key].dtype, key
+            assert torch.equal(value, other[key]), key
+
+
+def _tabularize_reference(df, kwargs):
+    """Windows as built previously, with a python loop per sample and feature column.
+
+    Args:
+        df (pd.DataFrame): normalized data, as returned by _prepare_dataset_args
+        kwargs (dict): arguments for tabularize_univariate_datetime, as returned by _prepare_dataset_args
+
+    Returns:
+        OrderedDict of np.array windows, for the inputs, targets and each seasonality
+    """
+    n_lags, n_forecasts = kwargs["n_lags"], kwargs["n_forecasts"]
+    n_samples = len(df) - n_lags + 1 - n_forecasts
+
+    def _loop_windows(x, offset, size):
+        return np.array([x[offset + i : offset + i + size] for i in range(n_samples)])
+
+    def _loop_columns(x):
+        return np.dstack([_loop_windows(x[:, i], n_lags, n_forecasts) for i in range(x.shape[1])])
+
+    seasonalities = tabular.seasonal_features_from_dates(df["ds"], kwargs["season_config"])
+    additive_events, multiplicative_events = tabular.make_events_features(
+        df, kwargs["events_config"], kwargs["country_holidays_config"]
+    )
+    _, multiplicative_regressors = tabular.make_regressors_features(df, kwargs["regressors_config"])
+    expected = OrderedDict(
+        {
+            "time": _loop_windows(df["t"].values, n_lags, n_forecasts),
+            "lags": _loop_windows(df["y_scaled"].values, 0, n_lags),
+            "targets": _loop_windows(df["y_scaled"].values, n_lags, n_forecasts),
+            "covariates": _loop_windows(df["A"].values, 0, n_lags),
+            "additive_events": _loop_columns(additive_events),
+            "multiplicative_events": _loop_columns(multiplicative_events),
+            "multiplicative_regressors": _loop_columns(multiplicative_regressors),
+        }
+    )
+    for name, features in seasonalities.items():
+        expected[name] = _loop_windows(features, n_lags, n_forecasts)
+    return expected
+
+
+def _fourier_series_reference(t, period, series_order):
+    """Fourier series evaluated with sin and cos of each order, as computed previously."""
+    return np.column_stack(
+        [fun((2.0 * (i + 1) * np.pi * t / period)) for i in range(series_order) for fun in (np.sin, np.cos)]
+    )
+
+
+def _make_events_features_reference(df, events_config=None, country_holidays_config=None):
+    """Events features as built previously, with pandas per event and offset."""
+    additive_events = pd.DataFrame()
+    multiplicative_events = pd.DataFrame()
+    features = []
+    if events_config is not None:
+        for event, configs in events_config.items():
+            for offset in range(configs.lower_window, configs.upper_window + 1):
+                features.append((event, configs["mode"], offset, df[event]))
+    if country_holidays_config is not None:
+        year_list = list({x.year for x in df.ds})
+        holidays_dict = tabular.make_country_specific_holidays_df(year_list, country_holidays_config["country"])
+        for holiday in country_holidays_config["holiday_names"]:
+            feature = pd.Series([0.0] * df.shape[0])
+            if holiday in holidays_dict.keys():
+                feature[df.ds.isin(holidays_dict[holiday])] = 1.0
+            for offset in range(country_holidays_config["lower_window"], country_holidays_config["upper_window"] + 1):
+                features.append((holiday, country_holidays_config["mode"], offset, feature))
+    for name, mode, offset, feature in features:
+        key = utils.create_event_names_for_offsets(name, offset)
+        offset_feature = feature.shift(periods=offset, fill_value=0)
+        if mode == "additive":
+            additive_events[key] = offset_feature
+        else:
+            multiplicative_events[key] = offset_feature
+    additive_events = additive_events[sorted(additive_events.columns.tolist())].values
+    multiplicative_events = multiplicative_events[sorted(multiplicative_events.columns.tolist())].values
+    return additive_events, multiplicative_events
+
+
+def _trend_reference(model, t):
+    """Piecewise linear trend of a TimeNet, with a one-hot evaluation over all changepoints."""
+    past_next_changepoint = t.unsqueeze(2) >= torch.unsqueeze(model.trend_changepoints_t[1:], dim=0)
+    segment_id = torch.sum(past_next_changepoint, dim=2)
+    current_segment = torch.nn.functional.one_hot(segment_id, num_classes=model.config_trend.n_changepoints + 1)
+    k_t = torch.sum(current_segment * torch.unsqueeze(model.trend_deltas, dim=0), dim=2)
+    if not model.segmentwise_trend:
+        k_t = k_t + torch.sum(past_next_changepoint * torch.unsqueeze(model.trend_deltas[:-1], dim=0), dim=2)
+    if model.config_trend.growth != "discontinuous":
+        if model.segmentwise_trend:
+            deltas = model.trend_deltas[:] - torch.cat((model.trend_k0, model.trend_deltas[0:-1]))
+        else:
+            deltas = model.trend_deltas
+        m_t = torch.sum(past_next_changepoint * (-model.trend_changepoints_t[1:] * deltas[1:]), dim=2)
+        if not model.segmentwise_trend:
+            m_t = m_t.detach()
+    else:
+        m_t = torch.sum(current_segment * torch.unsqueeze(model.trend_m, dim=0), dim=2)
+    return model.bias + (model.trend_k0 + k_t) * t + m_t
+
+
+def _loop_components(model, inputs):
+    """Components of each event and future regressor of a TimeNet, computed one at a time."""
+    components = OrderedDict({})
+    for event, configs in model.events_dims.items():
+        mode = configs["mode"]
+        components["event_{}".format(event)] = model.scalar_features_effects(
+            inputs["events"][mode], model.event_params[mode], indices=configs["event_indices"]
+        )
+    for regressor, configs in model.regressors_dims.items():
+        mode = configs["mode"]
+        components["future_regressor_{}".format(regressor)] = model.scalar_features_effects(
+            inputs["regressors"][mode], model.regressor_params[mode], indices=[configs["regressor_index"]]
+        )
+    return components
+
+
 class UnitTests(unittest.TestCase):
     plot = False
 
@@ -84,7 +310,7 @@ class UnitTests(unittest.TestCase):
         df = df_utils.check_dataframe(df_train)
         data_params = df_utils.init_data_params(df, normalize="minmax")
         df = df_utils.normalize(df, data_params)
-        inputs, targets = time_dataset.tabularize_univariate_datetime(
+        inputs, targets = tabular.tabularize_univariate_datetime(
             df,
             n_lags=n_lags,
             n_forecasts=n_forecasts,
@@ -164,3 +390,822 @@ class UnitTests(unittest.TestCase):
             assert c.batch_size == batch
             assert c.epochs == epoch
             assert math.isclose(c.learning_rate, lr)
+
+    def test_tabularize_strided(self):
+        log.info("testing: Tabularize with strided windows")
+        n_lags = 60
+        n_forecasts = 30
+        df, kwargs = _prepare_dataset_args(n_lags=n_lags, n_forecasts=n_forecasts)
+        inputs, targets = tabular.tabularize_univariate_datetime(df, **kwargs)
+
+        expected = _tabularize_reference(df, kwargs)
+
+        assert np.array_equal(inputs["time"], expected["time"])
+        assert np.array_equal(inputs["lags"], expected["lags"])
+        assert np.array_equal(targets, expected["targets"])
+        assert np.array_equal(inputs["covariates"]["A"], expected["covariates"])
+        assert np.array_equal(inputs["events"]["additive"], expected["additive_events"])
+        assert np.array_equal(inputs["events"]["multiplicative"], expected["multiplicative_events"])
+        assert np.array_equal(inputs["regressors"]["multiplicative"], expected["multiplicative_regressors"])
+        for name, features in inputs["seasonalities"].items():
+            assert np.array_equal(features, expected[name])
+        # windows are views on the feature columns, not copies
+        assert not inputs["lags"].flags.writeable
+        assert np.shares_memory(inputs["lags"], df["y_scaled"].values)
+
+    def test_time_dataset_lazy(self):
+        log.info("testing: Lazy TimeDataset")
+        df, kwargs = _prepare_dataset_args(n_lags=14, n_forecasts=7, nrows=512)
+        for predict_mode in [False, True]:
+            eager = time_dataset.TimeDataset(df, predict_mode=predict_mode, **kwargs)
+            lazy = time_dataset.TimeDataset(df, predict_mode=predict_mode, lazy=True, **kwargs)
+            assert len(eager) == len(lazy)
+            # lazy inputs are views on the per-timestamp features
+            assert lazy.inputs["lags"].stride()[0] == lazy.inputs["lags"].stride()[1]
+            eager_loader = DataLoader(eager, batch_size=32, shuffle=False)
+            lazy_loader = DataLoader(lazy, batch_size=32, shuffle=False)
+            for (inputs_e, targets_e), (inputs_l, targets_l) in zip(eager_loader, lazy_loader):
+                if not predict_mode:
+                    assert torch.equal(targets_e, targets_l)
+                _assert_inputs_equal(inputs_e, inputs_l)
+
+    def test_time_dataset_cache(self):
+        log.info("testing: TimeDataset cache")
+        df, kwargs = _prepare_dataset_args(n_lags=14, n_forecasts=7, nrows=512)
+        with tempfile.TemporaryDirectory() as cache_dir:
+            for layout in [dict(packed=False), dict(packed=True), dict(packed=True, sparse_events=True)]:
+                eager = time_dataset.TimeDataset(df, **layout, **kwargs)
+                first = time_dataset.TimeDataset(df, cache_dir=cache_dir, **layout, **kwargs)
+                with mock.patch.object(
+                    time_dataset, "tabularize_univariate_datetime", wraps=time_dataset.tabularize_univariate_datetime
+                ) as tabularize:
+                    cached = time_dataset.TimeDataset(df, cache_dir=cache_dir, **layout, **kwargs)
+                    assert tabularize.call_count == 0
+                for dataset in [first, cached]:
+                    assert len(dataset) == len(eager)
+                    inputs_e, targets_e = eager[torch.arange(len(eager))]
+                    inputs_c, targets_c = dataset[torch.arange(len(dataset))]
+                    assert torch.equal(targets_e, targets_c)
+                    _assert_inputs_equal(inputs_e, inputs_c)
+            assert len(os.listdir(cache_dir)) == 3
+            # any change of data or configs creates a new entry
+            time_dataset.TimeDataset(df, packed=True, cache_dir=cache_dir, **dict(kwargs, n_forecasts=3))
+            df.loc[0, "y_scaled"] += 1.0
+            time_dataset.TimeDataset(df, packed=True, cache_dir=cache_dir, **kwargs)
+            assert len(os.listdir(cache_dir)) == 5
+            # and so does another version of the holiday definitions
+            with mock.patch.object(utils.hdays_part1, "__version__", "0.0"):
+                time_dataset.TimeDataset(df, packed=True, cache_dir=cache_dir, **kwargs)
+            assert len(os.listdir(cache_dir)) == 6
+            # the least recently used entries are removed, loading an entry marks it as used
+            time_dataset.TimeDataset(df, packed=False, cache_dir=cache_dir, **kwargs)
+            entries = sorted(os.listdir(cache_dir), key=lambda name: os.path.getmtime(os.path.join(cache_dir, name)))
+            time_dataset.tabularize_cached(cache_dir, df, max_entries=3, **dict(kwargs, n_forecasts=2))
+            assert len(os.listdir(cache_dir)) == 3
+            assert set(entries[-2:]) < set(os.listdir(cache_dir))
+            time_dataset.prune_cache(cache_dir)
+            assert len(os.listdir(cache_dir)) == 0
+
+    def test_time_dataset_append(self):
+        log.info("testing: TimeDataset append")
+        df, kwargs = _prepare_dataset_args(n_lags=14, n_forecasts=7, nrows=512)
+        # the first appended row is a playoff, whose lower window changes the preceding row
+        n_rows = 3 * 97
+        with tempfile.TemporaryDirectory() as cache_dir:
+            for layout in [dict(packed=False), dict(packed=True, sparse_events=True), dict(cache_dir=cache_dir)]:
+                for lazy in [False, True]:
+                    full = time_dataset.TimeDataset(df, lazy=lazy, **layout, **kwargs)
+                    dataset = time_dataset.TimeDataset(df[:n_rows], lazy=lazy, **layout, **kwargs)
+                    for start, end in [(n_rows, n_rows + 1), (n_rows + 1, 400), (400, len(df))]:
+                        dataset.append(df[start:end].reset_index(drop=True))
+                    assert len(dataset) == len(full)
+                    inputs_f, targets_f = full[torch.arange(len(full))]
+                    inputs_a, targets_a = dataset[torch.arange(len(dataset))]
+                    assert torch.equal(targets_f, targets_a)
+                    _assert_inputs_equal(inputs_f, inputs_a)
+        # appending tabularizes only the new rows and the context needed for their windows
+        dataset = time_dataset.TimeDataset(df[:n_rows], packed=True, **kwargs)
+        with mock.patch.object(
+            time_dataset, "tabularize_univariate_datetime", wraps=time_dataset.tabularize_univariate_datetime
+        ) as tabularize:
+            dataset.append(df[n_rows : n_rows + 5].reset_index(drop=True))
+            assert len(tabularize.call_args[0][0]) == 5 + 14 + 7 + 1 + 2
+
+    def test_fourier_cache(self):
+        log.info("testing: Fourier cache")
+        dates = pd.Series(pd.date_range(start="2019-01-01", periods=1000, freq="H"))
+        cache = tabular.FourierCache(max_bytes=1000 * 6 * 4 * 2)
+        features = cache.get(dates, period=7, series_order=3)
+        assert not features.flags.writeable
+        assert cache.info()["misses"] == 1
+        # overlapping ranges are sliced from the cached matrix
+        for subset in [dates, dates[100:300], dates[999:]]:
+            subset = subset.reset_index(drop=True)
+            cached = cache.get(subset, period=7, series_order=3)
+            assert np.shares_memory(cached, features)
+            assert np.array_equal(cached, tabular._fourier_series(subset, period=7, series_order=3))
+        assert cache.info()["hits"] == 3
+        # misaligned dates, other periods and irregular dates miss
+        cache.get(pd.Series(dates + pd.Timedelta(minutes=30)), period=7, series_order=3)
+        cache.get(dates, period=365.25, series_order=3)
+        cache.get(pd.Series(dates[[0, 1, 5]].values), period=7, series_order=3)
+        info = cache.info()
+        assert info["misses"] == 4 and info["hits"] == 3
+        assert info["entries"] == 2 and info["evictions"] == 1
+        assert info["bytes"] <= info["max_bytes"]
+        # shared between threads
+        cache.clear()
+        starts = [i % 7 * 50 for i in range(64)]
+
+        def get(start):
+            subset = dates[start : start + 500].reset_index(drop=True)
+            return np.array_equal(cache.get(subset, period=7, series_order=3), features[start : start + 500])
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            assert all(executor.map(get, starts))
+        info = cache.info()
+        assert info["hits"] + info["misses"] == len(starts)
+        assert info["bytes"] == sum(entry.nbytes for entry in cache.entries.values()) <= info["max_bytes"]
+        # seasonal features are cached process-wide
+        season_config = utils.set_auto_seasonalities(dates=dates, season_config=configure.AllSeason())
+        tabular.fourier_cache.clear()
+        seasonalities = tabular.seasonal_features_from_dates(dates, season_config)
+        assert tabular.fourier_cache.info()["misses"] == len(seasonalities)
+        tabular.seasonal_features_from_dates(dates[24:], season_config)
+        assert tabular.fourier_cache.info()["hits"] == len(seasonalities)
+
+    def test_fourier_series_recurrence(self):
+        log.info("testing: Fourier series recurrence")
+
+        # minutes since 2019, in days since epoch
+        t = 17897.0 + np.arange(100000) / 1440.0
+        for period, series_order in [(365.25, 30), (7, 3), (1, 6), (1.0 / 24, 2)]:
+            features = tabular.fourier_series_t(t, period, series_order)
+            assert features.dtype == np.float32
+            assert features.shape == (len(t), 2 * series_order)
+            reference = _fourier_series_reference(t, period, series_order)
+            assert np.abs(features - reference).max() < 1e-6
+        out = np.empty((len(t), 6), dtype=np.float32)
+        assert tabular.fourier_series_t(t, 7, 3, out=out) is out
+
+    def test_make_events_features(self):
+        log.info("testing: Events features")
+
+        df, _ = _prepare_dataset_args(n_lags=1, n_forecasts=1)
+        m = NeuralProphet()
+        m = m.add_events("playoff", lower_window=-7, upper_window=7, mode="multiplicative")
+        m = m.add_events("superbowl", lower_window=-3, upper_window=0)
+        m = m.add_country_holidays("US", lower_window=-7, upper_window=7)
+        df["superbowl"] = 0.0
+        df.loc[5::365, "superbowl"] = 2.0
+        m.country_holidays_config["holiday_names"] = utils.get_holidays_from_country("US", df["ds"])
+        events = tabular.make_events_features(df, m.events_config, m.country_holidays_config)
+        expected = _make_events_features_reference(df, m.events_config, m.country_holidays_config)
+        for features, expected_features in zip(events, expected):
+            assert np.array_equal(features, expected_features)
+
+    def test_holiday_calendar(self):
+        log.info("testing: Holiday calendar")
+        calendar = utils.holiday_calendar
+        calendar.clear()
+        df = pd.read_csv(PEYTON_FILE)
+        df["ds"] = pd.to_datetime(df["ds"])
+        years = sorted(df["ds"].dt.year.unique())
+        names = utils.get_holidays_from_country("US", df["ds"])
+        assert set(calendar.entries.keys()) == {("US", year) for year in years}
+        holidays = utils.hdays_part1.US(years=years)
+        assert names == set(holidays.values())
+        holidays_dict = tabular.make_country_specific_holidays_df(years, "US")
+        for name in names:
+            expected = sorted(pd.to_datetime(date) for date, holiday in holidays.items() if holiday == name)
+            assert sorted(holidays_dict[name]) == expected
+        # cached years are not computed again
+        with mock.patch.object(utils, "_country_holidays", side_effect=AssertionError):
+            utils.get_holidays_from_country("US", df["ds"])
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "holidays.json")
+            calendar.persist(path)
+            try:
+                utils.get_holidays_from_country("BR", df["ds"])
+            finally:
+                calendar.path = None
+            # a new process starts warm from the file
+            warm_calendar = utils.HolidayCalendar()
+            warm_calendar.persist(path)
+            with mock.patch.object(utils, "_country_holidays", side_effect=AssertionError):
+                for country in ["US", "BR"]:
+                    dates, names = warm_calendar.get(country, years)
+                    expected_dates, expected_names = calendar.get(country, years)
+                    assert np.array_equal(dates, expected_dates)
+                    assert names == expected_names
+            # shared between threads, which persist all computed holidays
+            shared_calendar = utils.HolidayCalendar()
+            shared_path = os.path.join(tmp_dir, "shared_holidays.json")
+            shared_calendar.persist(shared_path)
+            requests = [(["US", "BR"][i % 2], years[i % 3 :]) for i in range(32)]
+
+            def get(request):
+                country, request_years = request
+                dates, names = shared_calendar.get(country, request_years)
+                expected_dates, expected_names = calendar.get(country, request_years)
+                return np.array_equal(dates, expected_dates) and names == expected_names
+
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                assert all(executor.map(get, requests))
+            assert set(shared_calendar.entries.keys()) == {
+                (country, year) for country in ["US", "BR"] for year in years
+            }
+            loaded_calendar = utils.HolidayCalendar()
+            loaded_calendar.load(shared_path)
+            assert loaded_calendar.entries.keys() == shared_calendar.entries.keys()
+
+    def test_batch_loader(self):
+        log.info("testing: Batch Loader")
+        length = 100000
+        df = pd.DataFrame(
+            {"ds": pd.date_range(start="2000-01-01", periods=length, freq="H"), "y": np.sin(np.arange(length) / 24)}
+        )
+        data_params = df_utils.init_data_params(df, normalize="auto")
+        df = df_utils.normalize(df, data_params)
+        season_config = utils.set_auto_seasonalities(dates=df["ds"], season_config=configure.AllSeason())
+        dataset = time_dataset.TimeDataset(df, season_config=season_config, n_lags=24, n_forecasts=12)
+
+        batch_loader = time_dataset.make_loader(dataset, batch_size=128, shuffle=False)
+        sample_loader = DataLoader(dataset, batch_size=128, shuffle=False)
+        assert len(batch_loader) == len(sample_loader)
+        for (inputs_b, targets_b), (inputs_s, targets_s) in zip(batch_loader, sample_loader):
+            assert torch.equal(targets_b, targets_s)
+            _assert_inputs_equal(inputs_b, inputs_s)
+
+        shuffled = time_dataset.make_loader(dataset, batch_size=1000, shuffle=True, drop_last=True)
+        indices = torch.cat([batch for batch in shuffled.sampler])
+        assert len(shuffled) == len(dataset) // 1000
+        assert len(indices) == len(torch.unique(indices)) == 1000 * len(shuffled)
+
+    def test_packed_inputs(self):
+        log.info("testing: Packed inputs")
+        df, kwargs = _prepare_dataset_args(n_lags=14, n_forecasts=7, nrows=512)
+        kwargs["covar_config"]["A"].as_scalar = True
+        model = _make_timenet(kwargs)
+        schema = utils.feature_schema_from_configs(
+            season_config=kwargs["season_config"],
+            events_config=kwargs["events_config"],
+            country_holidays_config=kwargs["country_holidays_config"],
+            covar_config=kwargs["covar_config"],
+            regressors_config=kwargs["regressors_config"],
+            n_lags=kwargs["n_lags"],
+        )
+        assert schema.features == model.feature_schema.features
+        assert schema.lagged == model.feature_schema.lagged
+
+        dataset = time_dataset.TimeDataset(df, **kwargs)
+        packed_dataset = time_dataset.TimeDataset(df, packed=True, **kwargs)
+        assert list(packed_dataset.inputs.keys()) == ["features", "lagged"]
+        index = torch.arange(len(dataset))
+        inputs, targets = dataset[index]
+        packed_inputs, packed_targets = packed_dataset[index]
+        assert torch.equal(targets, packed_targets)
+
+        # unpacking restores the separate inputs
+        _assert_inputs_equal(inputs, model.feature_schema.unpack(packed_inputs))
+
+        predicted = model.forward(inputs)
+        packed_predicted = model.forward(packed_inputs)
+        assert torch.allclose(predicted, packed_predicted, atol=1e-5)
+        components = model.compute_components(inputs)
+        packed_components = model.compute_components(packed_inputs)
+        for name, value in components.items():
+            assert torch.allclose(value, packed_components[name], atol=1e-5)
+
+        # gradients of the single matmul match the separate evaluation
+        grads = []
+        for model_inputs in [inputs, packed_inputs]:
+            model.zero_grad()
+            model.forward(model_inputs).sum().backward()
+            grads.append(
+                {name: param.grad.clone() for name, param in model.named_parameters() if param.grad is not None}
+            )
+        for name, grad in grads[0].items():
+            assert torch.allclose(grad, grads[1][name], rtol=1e-4, atol=1e-3), name
+
+    def test_fused_seasonalities(self):
+        log.info("testing: Fused seasonalities")
+        df = pd.read_csv(PEYTON_FILE, nrows=512)
+        m = NeuralProphet(yearly_seasonality=True, daily_seasonality=True)
+        m = m.add_seasonality("monthly", period=30.5, fourier_order=5)
+        m = m.add_seasonality("quarterly", period=91.3, fourier_order=4)
+        df = df_utils.check_dataframe(df)
+        df = df_utils.normalize(df, df_utils.init_data_params(df, normalize="auto"))
+        season_config = utils.set_auto_seasonalities(dates=df["ds"].copy(deep=True), season_config=m.season_config)
+        model = _make_timenet(config_season=season_config)
+        dataset = time_dataset.TimeDataset(df, season_config=season_config)
+        inputs, _ = dataset[torch.arange(len(dataset))]
+        s = inputs["seasonalities"]
+        assert list(s.keys()) == ["yearly", "weekly", "daily", "monthly", "quarterly"]
+        separate = OrderedDict((name, model.seasonality(features, name)) for name, features in s.items())
+        fused = model.all_seasonalities(s)
+        assert torch.allclose(fused, sum(separate.values()), atol=1e-5)
+        per_season = model.all_seasonalities(s, per_season=True)
+        assert list(per_season.keys()) == list(separate.keys())
+        for name, component in separate.items():
+            assert torch.allclose(per_season[name], component, atol=1e-6)
+
+        # gradients match the separate evaluation
+        grads = []
+        for fun in [
+            lambda: sum(model.seasonality(features, name) for name, features in s.items()),
+            lambda: model.all_seasonalities(s),
+        ]:
+            model.zero_grad()
+            fun().sum().backward()
+            grads.append({name: param.grad.clone() for name, param in model.season_params.items()})
+        for name, grad in grads[0].items():
+            assert torch.allclose(grad, grads[1][name], rtol=1e-4, atol=1e-4), name
+
+    def test_piecewise_trend(self):
+        log.info("testing: Bucketized piecewise linear trend")
+
+        for growth, trend_reg, n_changepoints in [
+            ("linear", 0, 10),
+            ("linear", 1.0, 10),
+            ("discontinuous", 0, 10),
+            ("discontinuous", 1.0, 10),
+            ("linear", 0, 200),
+        ]:
+            torch.manual_seed(0)
+            model = _make_timenet(growth=growth, n_changepoints=n_changepoints, trend_reg=trend_reg)
+            # includes times before zero, beyond the last changepoint and exactly at changepoints
+            t = torch.cat([torch.linspace(-0.1, 1.2, 700), model.trend_changepoints_t]).view(1, -1)
+            outputs, grads = [], []
+            for fun in [_trend_reference, lambda model, t: model.trend(t)]:
+                model.zero_grad()
+                out = fun(model, t)
+                out.sum().backward()
+                outputs.append(out.detach())
+                grads.append({name: param.grad.clone() for name, param in model.named_parameters()})
+            assert torch.allclose(outputs[0], outputs[1], atol=1e-5)
+            for name, grad in grads[0].items():
+                assert torch.allclose(grad, grads[1][name], rtol=1e-4, atol=1e-4), name
+
+    def test_batched_covariates(self):
+        log.info("testing: Batched lagged regressors")
+        n_lags, n_forecasts, batch = 14, 7, 256
+        config_covar = OrderedDict(
+            ("covar_{}".format(i), configure.Covar(reg_lambda=None, as_scalar=i % 5 == 0, normalize="auto"))
+            for i in range(50)
+        )
+        torch.manual_seed(0)
+        covariates = OrderedDict(
+            (name, torch.randn(batch, 1 if configs.as_scalar else n_lags)) for name, configs in config_covar.items()
+        )
+        for num_hidden_layers in [0, 2]:
+            model = _make_timenet(
+                n_changepoints=0,
+                config_covar=config_covar,
+                n_forecasts=n_forecasts,
+                n_lags=n_lags,
+                num_hidden_layers=num_hidden_layers,
+            )
+            separate = OrderedDict((name, model.covariate(lags, name)) for name, lags in covariates.items())
+            per_covariate = model.all_covariates(covariates, per_covariate=True)
+            assert list(per_covariate.keys()) == list(covariates.keys())
+            for name, component in separate.items():
+                assert torch.allclose(per_covariate[name], component, atol=1e-5)
+
+            grads = []
+            for fun in [lambda: sum(separate.values()), lambda: model.all_covariates(covariates)]:
+                model.zero_grad()
+                out = fun()
+                out.sum().backward(retain_graph=True)
+                grads.append({name: param.grad.clone() for name, param in model.covar_nets.named_parameters()})
+            assert torch.allclose(sum(separate.values()), model.all_covariates(covariates), atol=1e-4)
+            for name, grad in grads[0].items():
+                assert torch.allclose(grad, grads[1][name], rtol=1e-4, atol=1e-4), name
+            assert model.get_covar_weights("covar_1") is model.covar_nets["covar_1"][0].weight
+
+    def test_prune_lags(self):
+        log.info("testing: Prune lags of AR-Net and covariate nets")
+        n_lags, n_forecasts, batch = 100, 7, 256
+        config_covar = OrderedDict(
+            ("covar_{}".format(i), configure.Covar(reg_lambda=None, as_scalar=i == 0, normalize="auto"))
+            for i in range(3)
+        )
+        torch.manual_seed(0)
+        inputs = {
+            "time": torch.rand(batch, n_forecasts),
+            "lags": torch.randn(batch, n_lags),
+            "covariates": OrderedDict(
+                (name, torch.randn(batch, 1 if configs.as_scalar else n_lags)) for name, configs in config_covar.items()
+            ),
+        }
+        threshold = 1e-3
+        for num_hidden_layers in [0, 2]:
+            model = _make_timenet(
+                n_changepoints=0,
+                config_covar=config_covar,
+                n_forecasts=n_forecasts,
+                n_lags=n_lags,
+                num_hidden_layers=num_hidden_layers,
+            )
+            nets = [model.ar_net] + list(model.covar_nets.values())
+            with torch.no_grad():
+                for net in nets:
+                    # a few relevant lags, the others with weights near zero
+                    relevant = torch.rand(net[0].in_features) < 0.1
+                    relevant[0] = True
+                    noise = 1e-4 * torch.randn_like(net[0].weight)
+                    net[0].weight.copy_(torch.where(relevant, net[0].weight, noise))
+                    net[0].weight[:, 0] = 1e-4
+            # the dense model, with weights below threshold set to zero
+            with torch.no_grad():
+                for net in nets:
+                    net[0].weight.masked_fill_(torch.abs(net[0].weight) < threshold, 0.0)
+                expected = model(inputs)
+            ar_weights = model.ar_weights.clone()
+            n_relevant = int(torch.sum(torch.sum(torch.abs(ar_weights), dim=0) > 0))
+
+            n_kept = model.prune_lags(threshold)
+            assert list(n_kept.keys()) == ["ar"] + list(config_covar.keys())
+            assert n_kept["ar"] == n_relevant < n_lags
+            assert model.ar_net[0].weight.shape == (model.ar_net[0].out_features, n_relevant)
+            assert torch.equal(model.ar_weights, ar_weights)
+            assert model.get_covar_weights("covar_0").shape[1] == 1
+            with torch.no_grad():
+                assert torch.allclose(model(inputs), expected, atol=1e-5)
+                per_covariate = model.all_covariates(inputs["covariates"], per_covariate=True)
+                for name, lags in inputs["covariates"].items():
+                    assert torch.allclose(per_covariate[name], model.covariate(lags, name), atol=1e-5)
+            # pruning again keeps the same lags
+            assert model.prune_lags(threshold) == n_kept
+            assert torch.equal(model.ar_weights, ar_weights)
+
+            # the kept lags are saved with the state_dict, and restored in a new model
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                path = os.path.join(tmp_dir, "model.pt")
+                torch.save(model.state_dict(), path)
+                loaded = _make_timenet(
+                    n_changepoints=0,
+                    config_covar=config_covar,
+                    n_forecasts=n_forecasts,
+                    n_lags=n_lags,
+                    num_hidden_layers=num_hidden_layers,
+                )
+                loaded.load_state_dict(torch.load(path))
+            assert torch.equal(loaded.ar_lag_indices, model.ar_lag_indices)
+            assert loaded.covar_lag_indices.keys() == model.covar_lag_indices.keys()
+            for name, lag_indices in model.covar_lag_indices.items():
+                assert torch.equal(loaded.covar_lag_indices[name], lag_indices)
+                assert loaded.covar_nets[name][0].in_features == len(lag_indices)
+            with torch.no_grad():
+                assert torch.equal(loaded(inputs), model(inputs))
+
+    def test_forward_with_components(self):
+        log.info("testing: Forward with components")
+        df, kwargs = _prepare_dataset_args(n_lags=14, n_forecasts=7, nrows=512)
+        for sparse_events in [False, True]:
+            torch.manual_seed(0)
+            model = _make_timenet(kwargs, sparse_events=sparse_events)
+            for packed in [False, True]:
+                if sparse_events and not packed:
+                    continue
+                dataset = time_dataset.TimeDataset(df, packed=packed, sparse_events=sparse_events, **kwargs)
+                inputs, _ = dataset[torch.arange(len(dataset))]
+                predicted, components = model.forward_with_components(inputs)
+                assert torch.allclose(predicted, model.forward(inputs), atol=1e-5)
+                reference = model.compute_components(inputs)
+                assert components.keys() == reference.keys()
+                for name, value in reference.items():
+                    assert torch.equal(value, components[name])
+                trend = components["trend"]
+                seasons = [value for name, value in components.items() if name.startswith("season_")]
+                additive = sum(seasons) + components["ar"] + components["lagged_regressor_A"]
+                additive = additive + components["events_additive"]
+                multiplicative = components["events_multiplicative"] + components["future_regressors_multiplicative"]
+                assert torch.allclose(predicted, trend + additive + trend * multiplicative, atol=1e-5)
+                # the totals of a mode, summed from the named components, match the effects of all its features
+                unpacked = model.feature_schema.unpack(inputs) if packed else inputs
+                for key, params in [("events", model.event_params), ("regressors", model.regressor_params)]:
+                    for mode, features in unpacked[key].items():
+                        name = "{}_{}".format(key if key == "events" else "future_regressors", mode)
+                        expected = model.scalar_features_effects(features, params[mode])
+                        assert torch.allclose(components[name], expected, atol=1e-5), name
+
+    def test_dedup_steps(self):
+        log.info("testing: Deduplicated per-step features")
+        df, kwargs = _prepare_dataset_args(n_lags=14, n_forecasts=28, nrows=512)
+        for sparse_events in [False, True]:
+            torch.manual_seed(0)
+            model = _make_timenet(kwargs, sparse_events=sparse_events)
+            windowed = time_dataset.TimeDataset(df, packed=True, sparse_events=sparse_events, **kwargs)
+            dedup = time_dataset.TimeDataset(df, packed=True, sparse_events=sparse_events, dedup_steps=True, **kwargs)
+            assert "windows" not in dedup.sources[("features", None)]
+            for index in [torch.arange(100, 356), torch.randperm(len(dedup))[:64], 7]:
+                inputs, targets = windowed[index]
+                inputs_dedup, targets_dedup = dedup[index]
+                assert torch.equal(targets, targets_dedup)
+                assert torch.equal(inputs_dedup["features"][inputs_dedup["steps"]], inputs["features"])
+                if not isinstance(index, int):
+                    with torch.no_grad():
+                        assert torch.allclose(model(inputs_dedup), model(inputs), atol=1e-5)
+                        predicted, components = model.forward_with_components(inputs)
+                        predicted_dedup, components_dedup = model.forward_with_components(inputs_dedup)
+                    assert torch.allclose(predicted_dedup, predicted, atol=1e-5)
+                    assert components_dedup.keys() == components.keys()
+                    for name, value in components.items():
+                        assert torch.allclose(components_dedup[name], value, atol=1e-5), name
+            # a contiguous batch has each timestamp once
+            inputs_dedup, _ = dedup[torch.arange(100, 356)]
+            assert inputs_dedup["features"].shape[0] == 256 + kwargs["n_forecasts"] - 1
+
+        # appended rows extend the per-timestamp features
+        appended = time_dataset.TimeDataset(df.iloc[:-10], packed=True, sparse_events=True, dedup_steps=True, **kwargs)
+        appended.append(df.iloc[-10:])
+        index = torch.arange(len(dedup))
+        assert len(appended) == len(dedup)
+        assert torch.equal(appended[index][0]["features"], dedup[index][0]["features"])
+
+    def test_attributed_components(self):
+        log.info("testing: Attribution of event and regressor components")
+        n_forecasts, batch = 7, 256
+        m = NeuralProphet(n_forecasts=n_forecasts)
+        for i in range(100):
+            m = m.add_events(
+                "event_{}".format(i), lower_window=-2, upper_window=2, mode=["additive", "multiplicative"][i % 2]
+            )
+        for i in range(20):
+            m = m.add_future_regressor("regressor_{}".format(i), mode=["additive", "multiplicative"][i % 3 == 0])
+        model = _make_timenet(
+            n_changepoints=0,
+            config_events=m.events_config,
+            config_regressors=m.regressors_config,
+            n_forecasts=n_forecasts,
+        )
+        torch.manual_seed(0)
+        inputs = {"time": torch.rand(batch, n_forecasts), "events": {}, "regressors": {}}
+        for mode in ["additive", "multiplicative"]:
+            n_events = model.event_params[mode].shape[0]
+            inputs["events"][mode] = (torch.rand(batch, n_forecasts, n_events) < 0.02).float()
+            inputs["regressors"][mode] = torch.randn(batch, n_forecasts, model.regressor_params[mode].shape[0])
+
+        expected = _loop_components(model, inputs)
+        for sparse in [False, True]:
+            if sparse:
+                inputs["events"] = {mode: value.to_sparse() for mode, value in inputs["events"].items()}
+            components = model.compute_components(inputs)
+            named = [
+                name for name in components.keys() if name.startswith("event_") or name.startswith("future_regressor_")
+            ]
+            assert named == list(expected.keys())
+            for name, value in expected.items():
+                assert torch.allclose(components[name], value, atol=1e-5), name
+
+        # gradients of the params reach each event
+        model.zero_grad()
+        sum(value.sum() for value in model.compute_components(inputs).values()).backward()
+        assert torch.all(model.event_params["additive"].grad != 0)
+
+    def test_torchscript(self):
+        log.info("testing: TorchScript export")
+        df, kwargs = _prepare_dataset_args(n_lags=14, n_forecasts=7, nrows=512)
+        kwargs["covar_config"]["B_lagged"] = configure.Covar(reg_lambda=None, as_scalar=True, normalize="auto")
+        df["B_lagged"] = df["B"]
+        # the regressors of df are normalized already
+        data_params = df_utils.init_data_params(df[["ds", "y"]].copy(), normalize="auto")
+        for name in ["A", "B", "B_lagged", "playoff"]:
+            data_params[name] = df_utils.ShiftScale()
+        for growth, num_hidden_layers, sparse_events in [
+            ("off", 0, False),
+            ("discontinuous", 2, True),
+            ("linear", 0, True),
+        ]:
+            torch.manual_seed(0)
+            model = _make_timenet(
+                kwargs, growth=growth, num_hidden_layers=num_hidden_layers, sparse_events=sparse_events
+            )
+            dataset = time_dataset.TimeDataset(df, packed=True, sparse_events=sparse_events, **kwargs)
+            inputs, _ = dataset[torch.arange(len(dataset))]
+            scripted = export.to_torchscript(model)
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                path = os.path.join(tmp_dir, "model.pt")
+                torch.jit.save(scripted, path)
+                scripted = torch.jit.load(path)
+            with torch.no_grad():
+                predicted, components = model.forward_with_components(inputs)
+                predicted_s, components_s = scripted(*export.inference_inputs(model, inputs))
+            assert torch.allclose(predicted, predicted_s, atol=1e-5)
+            assert components.keys() == components_s.keys()
+            for name, value in components.items():
+                assert torch.allclose(value, components_s[name], atol=1e-5), name
+
+    def test_numpy_inference(self):
+        log.info("testing: NumPy inference")
+        df, kwargs = _prepare_dataset_args(n_lags=14, n_forecasts=7, nrows=512)
+        kwargs["covar_config"]["B_lagged"] = configure.Covar(reg_lambda=None, as_scalar=True, normalize="auto")
+        df["B_lagged"] = df["B"]
+        # the regressors of df are normalized already
+        data_params = df_utils.init_data_params(df[["ds", "y"]].copy(), normalize="auto")
+        for name in ["A", "B", "B_lagged", "playoff"]:
+            data_params[name] = df_utils.ShiftScale()
+        for growth, num_hidden_layers, sparse_events in [
+            ("off", 0, False),
+            ("discontinuous", 2, True),
+            ("linear", 0, True),
+        ]:
+            torch.manual_seed(0)
+            model = _make_timenet(
+                kwargs, growth=growth, num_hidden_layers=num_hidden_layers, sparse_events=sparse_events
+            )
+            dataset = time_dataset.TimeDataset(df, packed=True, sparse_events=sparse_events, **kwargs)
+            inputs, _ = dataset[torch.arange(len(dataset))]
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                path = os.path.join(tmp_dir, "model.npz")
+                export.to_numpy(model, path)
+                net = inference.NumpyNet.load(path)
+                export.to_numpy(model, path, data_params=data_params)
+                net_scaled = inference.NumpyNet.load(path)
+            with torch.no_grad():
+                predicted, components = model.forward_with_components(inputs)
+            numpy_inputs = [value.numpy() for value in export.inference_inputs(model, inputs)]
+            predicted_np, components_np = net.forward(*numpy_inputs)
+            assert np.allclose(predicted.numpy(), predicted_np, atol=1e-5)
+            assert components.keys() == components_np.keys()
+            for name, value in components.items():
+                assert np.allclose(value.numpy(), components_np[name], atol=1e-5), name
+            with self.assertRaises(ValueError):
+                # no data_params exported
+                net.predict(*numpy_inputs)
+            with self.assertRaises(ValueError):
+                net.predict_df(df)
+            # inputs built from the dataframe without torch, events are dense
+            predicted_np, components_np = net_scaled.predict(*numpy_inputs)
+            predicted_df, components_df = net_scaled.predict_df(df)
+            assert np.allclose(predicted_np, predicted_df, atol=1e-5)
+            assert components_np.keys() == components_df.keys()
+            for name, value in components_np.items():
+                assert np.allclose(value, components_df[name], atol=1e-5), name
+
+        # in a fresh interpreter, importing the inference module does not load torch
+        for name, statement in [
+            ("inference", "import neuralprophet.inference"),
+            ("forecaster", "from neuralprophet import NeuralProphet"),
+        ]:
+            script = "import sys; {}; print('torch' in sys.modules)".format(statement)
+            output = subprocess.run([sys.executable, "-c", script], cwd=DIR, capture_output=True, check=True)
+            assert output.stdout.decode().strip() == str(name == "forecaster")
+
+        # forecasting a dataframe does not load torch either
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            paths = [os.path.join(tmp_dir, name) for name in ["model.npz", "df.csv", "predicted.npy"]]
+            export.to_numpy(model, paths[0], data_params=data_params)
+            df.to_csv(paths[1], index=False)
+            script = (
+                "import sys; import numpy as np; import pandas as pd; from neuralprophet import inference; "
+                "predicted, _ = inference.NumpyNet.load({!r}).predict_df(pd.read_csv({!r})); "
+                "np.save({!r}, predicted); print('torch' in sys.modules)"
+            ).format(*paths)
+            output = subprocess.run([sys.executable, "-c", script], cwd=DIR, capture_output=True, check=True)
+            assert output.stdout.decode().strip() == "False"
+            predicted_df = np.load(paths[2])
+        assert np.allclose(net_scaled.predict_df(df)[0], predicted_df, atol=1e-5)
+
+    def test_lagged_linear_components(self):
+        log.info("testing: Lagged components as FFT filters of the series")
+        x = np.random.randn(1000)
+        weight, bias = np.random.randn(3, 50), np.random.randn(3)
+        windows = np.stack([x[i : i + 50] for i in range(len(x) - 50 + 1)])
+        assert np.allclose(time_net.lagged_linear_filter(x, weight, bias), windows @ weight.T + bias)
+
+        df, kwargs = _prepare_dataset_args(n_lags=100, n_forecasts=7, nrows=1024)
+        kwargs["covar_config"]["B_lagged"] = configure.Covar(reg_lambda=None, as_scalar=True, normalize="auto")
+        df["B_lagged"] = df["B"]
+        for num_hidden_layers in [0, 1]:
+            torch.manual_seed(0)
+            model = _make_timenet(kwargs, num_hidden_layers=num_hidden_layers, sparse_events=True)
+            dataset = time_dataset.TimeDataset(df, packed=True, sparse_events=True, lazy=True, **kwargs)
+            inputs, _ = dataset[torch.arange(len(dataset))]
+            lagged = dataset.pop_lagged()
+            assert "lagged" not in dataset[torch.arange(2)][0]
+            assert lagged.shape == (len(dataset) + kwargs["n_lags"] - 1, model.feature_schema.n_lagged)
+            if num_hidden_layers > 0:
+                with self.assertRaises(ValueError):
+                    model.lagged_linear_components(lagged)
+                continue
+            for variant in ["dense", "pruned", "quantized"]:
+                if variant == "pruned":
+                    model.prune_lags(float(torch.median(torch.abs(model.ar_weights))))
+                elif variant == "quantized":
+                    model.quantize()
+                with torch.no_grad():
+                    _, components = model.forward_with_components(inputs)
+                lagged_components = model.lagged_linear_components(lagged)
+                assert list(lagged_components.keys()) == ["ar", "lagged_regressor_A", "lagged_regressor_B_lagged"]
+                # quantized nets also quantize their inputs, the filters only use the dequantized weights
+                atol = 5e-2 if variant == "quantized" else 1e-5
+                for name, value in lagged_components.items():
+                    assert value.shape == (len(dataset), kwargs["n_forecasts"])
+                    assert torch.allclose(value, components[name], atol=atol), (variant, name)
+
+        # long lag windows
+        n_lags, n_forecasts, length = 2000, 1, 10000
+        model = _make_timenet(growth="off", n_changepoints=0, n_forecasts=n_forecasts, n_lags=n_lags)
+        lagged = np.random.randn(length, 1).astype(np.float32)
+        windows = torch.from_numpy(lagged[:, 0]).unfold(0, n_lags, 1)
+        with torch.no_grad():
+            expected = model.auto_regression(windows)
+        assert torch.allclose(model.lagged_linear_components(lagged)["ar"], expected, atol=1e-4)
+
+    def test_seasonality_from_time(self):
+        log.info("testing: Seasonal features computed from time")
+        df = pd.read_csv(PEYTON_FILE)
+        df = df_utils.check_dataframe(df)
+        data_params = df_utils.init_data_params(df, normalize="auto")
+        df = df_utils.normalize(df, data_params)
+        season_config = configure.AllSeason(from_time=True, daily_arg=True)
+        season_config.append(name="monthly", period=30.5, resolution=4, arg=True)
+        season_config = utils.set_auto_seasonalities(dates=df["ds"].copy(deep=True), season_config=season_config)
+        kwargs = dict(n_lags=0, n_forecasts=1, predict_mode=True)
+        torch.manual_seed(0)
+        model = _make_timenet(config_season=season_config, n_forecasts=1)
+
+        # identical to the features of the dates, for all periods
+        dataset = time_dataset.TimeDataset(df, season_config=season_config, **kwargs)
+        inputs, _ = dataset[torch.arange(len(dataset))]
+        days = model.days_from_inputs(inputs)
+        assert days.dtype == torch.float64
+        assert np.array_equal(days[:, 0].numpy(), tabular.days_since_epoch(df["ds"]))
+        features = model.seasonal_features_from_days(days)
+        expected = tabular.seasonal_features_from_dates(df["ds"], season_config)
+        assert list(features.keys()) == list(expected.keys()) == ["yearly", "weekly", "daily", "monthly"]
+        for name, value in expected.items():
+            assert features[name].shape == (len(df), 1, value.shape[1])
+            assert np.allclose(features[name][:, 0, :].numpy(), value, atol=1e-5), name
+        # no loss of precision with the length of the history, for minutes over a century
+        dates = pd.Series(pd.Timestamp("1970-01-01") + pd.to_timedelta(np.arange(0, 100 * 525960, 7919), unit="m"))
+        days = torch.from_numpy(tabular.days_since_epoch(dates)).unsqueeze(dim=1)
+        features = model.seasonal_features_from_days(days)
+        for name, value in tabular.seasonal_features_from_dates(dates, season_config).items():
+            assert np.allclose(features[name][:, 0, :].numpy(), value, atol=1e-5), name
+
+        # the dataset has no seasonal features, the model computes the same forecast
+        features_config = configure.AllSeason(daily_arg=True)
+        features_config.append(name="monthly", period=30.5, resolution=4, arg=True)
+        features_config = utils.set_auto_seasonalities(dates=df["ds"].copy(deep=True), season_config=features_config)
+        torch.manual_seed(0)
+        features_model = _make_timenet(config_season=features_config, n_forecasts=1)
+        for packed in [False, True]:
+            dataset = time_dataset.TimeDataset(df, season_config=season_config, packed=packed, **kwargs)
+            features_dataset = time_dataset.TimeDataset(df, season_config=features_config, packed=packed, **kwargs)
+            index = torch.arange(len(dataset))
+            inputs, _ = dataset[index]
+            features_inputs, _ = features_dataset[index]
+            assert "seasonalities" not in inputs
+            with torch.no_grad():
+                assert torch.allclose(model(inputs), features_model(features_inputs), atol=1e-5)
+                _, components = model.forward_with_components(inputs)
+                _, features_components = features_model.forward_with_components(features_inputs)
+            for name in ["season_yearly", "season_weekly", "season_daily", "season_monthly"]:
+                assert torch.allclose(components[name], features_components[name], atol=1e-5), name
+
+    def test_sparse_events(self):
+        log.info("testing: Sparse events")
+        df, kwargs = _prepare_dataset_args(n_lags=14, n_forecasts=7, nrows=512)
+        models = []
+        for sparse_events in [False, True]:
+            torch.manual_seed(0)
+            models.append(_make_timenet(kwargs, sparse_events=sparse_events))
+        model, sparse_model = models
+        model.load_state_dict(sparse_model.state_dict())
+        assert not any(key == "events" for key, _ in sparse_model.feature_schema.features.keys())
+
+        dataset = time_dataset.TimeDataset(df, packed=True, **kwargs)
+        sparse_dataset = time_dataset.TimeDataset(df, packed=True, sparse_events=True, **kwargs)
+        dense_events = time_dataset.TimeDataset(df, **kwargs).inputs["events"]
+        events = tabular.make_events_features(df, kwargs["events_config"], kwargs["country_holidays_config"])
+        for (mode, features), per_step_events in zip(sparse_dataset.inputs["events"].items(), events):
+            assert isinstance(features, tabular.SparseWindows)
+            assert np.array_equal(features.to_dense(), dense_events[mode].numpy())
+            # storage scales with the number of active events
+            assert features.values.shape[0] == np.count_nonzero(per_step_events)
+        # single samples and batches
+        inputs, _ = sparse_dataset[3]
+        assert inputs["events"]["multiplicative"].is_sparse
+        assert torch.equal(inputs["events"]["multiplicative"].to_dense(), dense_events["multiplicative"][3])
+
+        index = torch.arange(len(dataset))
+        inputs, targets = dataset[index]
+        sparse_inputs, sparse_targets = sparse_dataset[index]
+        assert torch.equal(targets, sparse_targets)
+        assert torch.allclose(model.forward(inputs), sparse_model.forward(sparse_inputs), atol=1e-5)
+        components = model.compute_components(inputs)
+        sparse_components = sparse_model.compute_components(sparse_inputs)
+        assert components.keys() == sparse_components.keys()
+        for name, value in components.items():
+            assert torch.allclose(value, sparse_components[name], atol=1e-5), name
+
+        grads = []
+        for m, model_inputs in [(model, inputs), (sparse_model, sparse_inputs)]:
+            m.zero_grad()
+            m.forward(model_inputs).sum().backward()
+            grads.append({name: param.grad.clone() for name, param in m.named_parameters() if param.grad is not None})
+        for name, grad in grads[0].items():
+            assert torch.allclose(grad, grads[1][name], rtol=1e-4, atol=1e-3), name